@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import secrets
 
 class Settings(BaseSettings):
@@ -8,11 +8,139 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Password hashing: stored hashes with a different cost are rehashed on login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 0  # Hashing threads; 0 for one per CPU core
+    # Authenticated principals are cached per process, keyed by token subject
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
     DB_NAME: str = "textsummarization"
     ENVIRONMENT: str = "development"
     HUGGINGFACE_API_URL: str = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8000"]
-    
+
+    # Prometheus metrics on GET /metrics; collection size gauges are refreshed at most this often
+    METRICS_ENABLED: bool = True
+    METRICS_COLLECTION_STATS_TTL_SECONDS: int = 60
+
+    # Tracing: per-request spans in a Server-Timing response header
+    SERVER_TIMING_ENABLED: bool = True
+    # Profiling: requests from ADMIN_EMAILS with "X-Profile: 1", plus a random
+    # PROFILE_SAMPLE_RATE fraction of all requests, are captured with cProfile
+    ADMIN_EMAILS: List[str] = []
+    PROFILING_ENABLED: bool = False
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_RETENTION_HOURS: int = 24
+
+    # Summarization backend: "huggingface" (remote API), "local" or "extractive"
+    SUMMARY_BACKEND: str = "huggingface"
+    # Local engine: model directory loadable by transformers.pipeline
+    LOCAL_MODEL_DIR: Optional[str] = None
+    LOCAL_MODEL_WORKERS: int = 0  # Worker processes; 0 for one per CPU core
+    LOCAL_MODEL_WARMUP: bool = True
+    # Concurrent requests with the same parameters are sent to the backend as one batch
+    INFERENCE_BATCH_MAX_ITEMS: int = 8  # 1 disables batching
+    INFERENCE_BATCH_MAX_WAIT_MS: float = 10.0
+
+    # Inference HTTP client (timeouts in seconds)
+    HF_REQUEST_TIMEOUT: float = 30.0
+    HF_CONNECT_TIMEOUT: float = 5.0
+    HF_POOL_TIMEOUT: float = 10.0
+    HF_MAX_CONNECTIONS: int = 20
+    HF_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HF_KEEPALIVE_EXPIRY: float = 30.0
+
+    # Inference resilience: calls failing in a way a repeat may not (timeouts, 5xx,
+    # 429, model loading) are retried with jittered exponential backoff, waiting at
+    # least the upstream's Retry-After or estimated_time. A call asked to wait longer
+    # than INFERENCE_RETRY_MAX_DELAY_SECONDS fails at once with that Retry-After.
+    INFERENCE_RETRY_MAX_ATTEMPTS: int = 3  # 1 disables retries
+    INFERENCE_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    INFERENCE_RETRY_MAX_DELAY_SECONDS: float = 20.0
+    # Send a second identical request when the first has not answered after this; 0 disables
+    INFERENCE_HEDGE_AFTER_MS: float = 0
+    # After this many consecutive upstream failures calls fail fast for
+    # INFERENCE_BREAKER_RESET_SECONDS, then one trial call decides; 0 disables
+    INFERENCE_BREAKER_FAILURE_THRESHOLD: int = 5
+    INFERENCE_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Admission control for inference endpoints. Each user has a bucket of
+    # ADMISSION_USER_BURST_TOKENS, refilled at ADMISSION_USER_TOKENS_PER_SECOND; a
+    # request takes its estimated input tokens (at least ADMISSION_MIN_REQUEST_TOKENS).
+    # Buckets are "memory" (per process), "mongo" (shared by all workers) or "none"
+    ADMISSION_RATE_BACKEND: str = "memory"
+    ADMISSION_USER_TOKENS_PER_SECOND: float = 200.0
+    ADMISSION_USER_BURST_TOKENS: int = 20000
+    ADMISSION_MIN_REQUEST_TOKENS: int = 100
+    # At most ADMISSION_MAX_IN_FLIGHT inference requests run at once per process; up
+    # to ADMISSION_MAX_QUEUED more wait ADMISSION_QUEUE_TIMEOUT_SECONDS for a slot,
+    # and the rest get 429 at once. 0 in-flight disables the limit
+    ADMISSION_MAX_IN_FLIGHT: int = 32
+    ADMISSION_MAX_QUEUED: int = 64
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 10.0
+
+    # Summary cache: "memory", "mongo" or "none"
+    SUMMARY_CACHE_BACKEND: str = "memory"
+    SUMMARY_CACHE_MAX_ENTRIES: int = 1024
+    SUMMARY_CACHE_TTL_SECONDS: int = 24 * 60 * 60
+
+    # Long-document map-reduce (token counts are estimates)
+    CHUNK_MAX_TOKENS: int = 900
+    CHUNK_OVERLAP_TOKENS: int = 64
+    CHUNK_MAX_CONCURRENCY: int = 4
+    CHUNK_MAX_REDUCE_ROUNDS: int = 3
+    # Chunk summaries are capped at CHUNK_MAX_TOKENS / CHUNK_REDUCE_FAN_IN tokens, so
+    # each reduce round shrinks the text about that many times
+    CHUNK_REDUCE_FAN_IN: int = 4
+    # Extractive pre-compression (per request via parameters.compression_ratio)
+    # is skipped for inputs shorter than this
+    PRECOMPRESS_MIN_TOKENS: int = 200
+
+    # Near-duplicate reuse: "reuse" answers texts nearly identical to an earlier one
+    # (same parameters) with its stored summary; "off" always calls the model.
+    # Scope is "user" or "global" (any user's summaries).
+    NEAR_DUP_MODE: str = "reuse"
+    NEAR_DUP_SCOPE: str = "user"
+    NEAR_DUP_THRESHOLD: float = 0.9  # Jaccard similarity of word 3-grams
+    NEAR_DUP_MAX_CANDIDATES: int = 20
+
+    # Batch summarization
+    BATCH_MAX_ITEMS: int = 100
+    BATCH_MAX_CONCURRENCY: int = 4
+
+    # Regenerating or restoring a summary keeps its previous state; 0 keeps none
+    SUMMARY_MAX_VERSIONS: int = 5
+
+    # Original texts are stored once per distinct content, zlib-compressed; texts
+    # that compress to more than TEXT_STORE_GRIDFS_THRESHOLD_BYTES go to GridFS
+    TEXT_STORE_COMPRESSION_LEVEL: int = 6
+    TEXT_STORE_GRIDFS_THRESHOLD_BYTES: int = 1024 * 1024
+
+    # Background summarization jobs: queue backend is "mongo" or "memory" (single process)
+    JOB_QUEUE_BACKEND: str = "mongo"
+    JOB_WORKERS: int = 2  # Workers started with the API; 0 to run them separately
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_MAX_RUNNING_PER_USER: int = 2
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_LEASE_SECONDS: int = 300
+    JOB_RETRY_BACKOFF_SECONDS: float = 2.0
+    JOB_RETENTION_HOURS: int = 24  # Finished jobs, with their text and result, are kept this long
+
+    # Hierarchical meta-summary: summaries are reduced in groups of META_GROUP_SIZE,
+    # and groups of groups, with the intermediate reductions stored per session
+    META_GROUP_SIZE: int = 8
+    META_GROUP_MIN_LENGTH: int = 60
+    META_GROUP_MAX_LENGTH: int = 200
+    META_MAX_CONCURRENCY: int = 4
+
+    # Search: keyword search uses Mongo text indexes; semantic search stores a
+    # hashed bag-of-words vector per summary and session when enabled
+    SEARCH_EMBEDDINGS_ENABLED: bool = True
+    SEARCH_EMBEDDING_DIMENSIONS: int = 256  # Changing it requires scripts.backfill_search_embeddings --all
+    SEARCH_EMBEDDING_CACHE_USERS: int = 256  # Users whose vector matrix is kept in memory
+    SEARCH_MAX_RESULTS: int = 200  # Deepest offset + limit a search can page to
+    SEARCH_TERMS_MAX_WORDS: int = 5000  # Distinct words of an original text kept for keyword search
+
     class Config:
         env_file = ".env"
         case_sensitive = True
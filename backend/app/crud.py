@@ -1,135 +1,545 @@
-from app.models import User, SummaryItem, ChatSession
+from app.models import User, Principal, SummaryItem, SummaryVersion, ChatSession, ChatSessionListing, MetaSummaryNode, RequestProfile, RequestProfileListing, SummaryJob
+from app.services.principal_cache import principal_cache
+from app.services.near_duplicates import TextFingerprint
+from app.services.search import embedding_index, original_search_terms, session_search_text, summary_search_text
+from app.services.text_store import text_store
+from app.config import settings
+from app.services.metrics import CRUD_SECONDS
+from app.services.tracing import traced_operation
 from beanie import PydanticObjectId
-from typing import Optional, List, Dict
+from pymongo import DESCENDING, ReturnDocument
+from typing import Optional, List, Dict, Tuple, Iterable, Union
+from collections import Counter
 from datetime import datetime
 
+@traced_operation(CRUD_SECONDS)
 async def get_user_by_email(email: str):
     return await User.find_one(User.email == email)
 
+@traced_operation(CRUD_SECONDS)
 async def create_user(email: str, hashed_password: str):
     user = User(email=email, hashed_password=hashed_password)
     await user.insert()
     return user
 
+@traced_operation(CRUD_SECONDS)
 async def delete_user(user: User) -> bool:
+    # Jobs go first, cancelled before they are removed so no worker claims one in
+    # between; a worker already running one finds it gone when it reports back
+    jobs = SummaryJob.get_motor_collection()
+    await jobs.update_many(
+        {"user_id": user.id, "status": {"$in": ["queued", "running"]}},
+        {"$set": {"status": "failed", "error": "Job was cancelled", "finished_at": datetime.utcnow()}}
+    )
+    await SummaryJob.find(SummaryJob.user_id == user.id).delete()
+    await _delete_summaries({"user_id": user.id})
+    await MetaSummaryNode.find(MetaSummaryNode.user_id == user.id).delete()
+    await ChatSession.find(ChatSession.user_id == user.id).delete()
+    if embedding_index is not None:
+        await embedding_index.remove_user(user.id)
     await user.delete()
+    principal_cache.invalidate(user.email)
     return True
 
+@traced_operation(CRUD_SECONDS)
 async def update_user(user: User, update_data: dict) -> User:
+    # $set only the changed fields rather than replacing the whole document
+    await User.find_one(User.id == user.id).update({"$set": update_data})
+    # Covers email and password changes: the old subject must re-authenticate
+    principal_cache.invalidate(user.email)
     for field, value in update_data.items():
         setattr(user, field, value)
-    await user.save()
     return user
 
 # Chat session operations
-async def create_chat_session(user: User, title: str) -> int:
+@traced_operation(CRUD_SECONDS)
+async def create_chat_session(user: Principal, title: str) -> PydanticObjectId:
+    now = datetime.utcnow()
     session = ChatSession(
+        user_id=user.id,
         title=title,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        created_at=now,
+        updated_at=now
+    )
+    await session.insert()
+    await _index_session(user.id, session.id, title, None)
+    return session.id
+
+@traced_operation(CRUD_SECONDS)
+async def get_chat_sessions(user: Principal) -> List[ChatSession]:
+    return await ChatSession.find(ChatSession.user_id == user.id).sort(+ChatSession.created_at).to_list()
+
+@traced_operation(CRUD_SECONDS)
+async def get_chat_session_page(
+    user: Principal,
+    limit: int,
+    before: Optional[Tuple[datetime, PydanticObjectId]] = None
+) -> Tuple[List[ChatSessionListing], bool]:
+    """Most recently updated sessions first, starting after the (updated_at, id) cursor.
+    Returns the page and whether more sessions follow."""
+    criteria = {"user_id": user.id}
+    if before is not None:
+        updated_at, session_id = before
+        criteria["$or"] = [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "_id": {"$lt": session_id}}
+        ]
+    sessions = await ChatSession.find(criteria).sort(
+        [("updated_at", DESCENDING), ("_id", DESCENDING)]
+    ).limit(limit + 1).project(ChatSessionListing).to_list()
+    return sessions[:limit], len(sessions) > limit
+
+@traced_operation(CRUD_SECONDS)
+async def get_chat_session(user: Principal, session_id: PydanticObjectId) -> Optional[ChatSession]:
+    return await ChatSession.find_one(ChatSession.id == session_id, ChatSession.user_id == user.id)
+
+@traced_operation(CRUD_SECONDS)
+async def get_session_summaries(user: Principal, session_id: PydanticObjectId) -> List[SummaryItem]:
+    return await SummaryItem.find(
+        SummaryItem.session_id == session_id,
+        SummaryItem.user_id == user.id
+    ).sort(+SummaryItem.created_at, +SummaryItem.id).to_list()
+
+@traced_operation(CRUD_SECONDS)
+async def update_chat_session_title(user: Principal, session_id: PydanticObjectId, title: str) -> bool:
+    updated = await ChatSession.get_motor_collection().find_one_and_update(
+        {"_id": session_id, "user_id": user.id},
+        {"$set": {"title": title, "updated_at": datetime.utcnow()}, "$inc": {"revision": 1}},
+        projection={"meta_summary": 1}
+    )
+    if updated is None:
+        return False
+    await _index_session(user.id, session_id, title, updated.get("meta_summary"))
+    return True
+
+@traced_operation(CRUD_SECONDS)
+async def delete_chat_session(user: Principal, session_id: PydanticObjectId) -> bool:
+    result = await ChatSession.find_one(
+        ChatSession.id == session_id,
+        ChatSession.user_id == user.id
+    ).delete()
+    if not result or result.deleted_count == 0:
+        return False
+    await _delete_summaries({"session_id": session_id})
+    await MetaSummaryNode.find(MetaSummaryNode.session_id == session_id).delete()
+    if embedding_index is not None:
+        await embedding_index.remove_session(session_id)
+    return True
+
+# Search embeddings are written after the document they describe
+async def _index_session(
+    user_id: PydanticObjectId,
+    session_id: PydanticObjectId,
+    title: str,
+    meta_summary: Optional[str]
+) -> None:
+    if embedding_index is not None:
+        await embedding_index.index(user_id, "session", session_id, session_id, session_search_text(title, meta_summary))
+
+async def _index_summary(summary: Dict, original_text: str) -> None:
+    if embedding_index is not None:
+        await embedding_index.index(
+            summary["user_id"], "summary", summary["_id"], summary["session_id"],
+            summary_search_text(summary["summary_text"], original_text)
+        )
+
+# Original texts: summaries and their versions each hold a text store reference
+def _text_references(summary: Dict) -> List[str]:
+    """Text store hashes a raw summary document references, one per reference"""
+    hashes = [summary.get("text_hash")]
+    hashes.extend(version.get("text_hash") for version in summary.get("versions") or [])
+    return [digest for digest in hashes if digest]
+
+_TEXT_REFERENCE_FIELDS = {"text_hash": 1, "versions.text_hash": 1}
+
+async def _delete_summaries(criteria: Dict) -> None:
+    summaries = SummaryItem.get_motor_collection()
+    references = []
+    async for raw in summaries.find(criteria, projection=_TEXT_REFERENCE_FIELDS):
+        references.extend(_text_references(raw))
+    await summaries.delete_many(criteria)
+    await text_store.release(references)
+
+@traced_operation(CRUD_SECONDS)
+async def get_original_texts(items: Iterable[Union[SummaryItem, SummaryVersion]]) -> List[str]:
+    """Original texts of summaries or summary versions, in order, loaded from the
+    text store in one query"""
+    items = list(items)
+    stored = await text_store.get_many(item.text_hash for item in items if item.original_text is None)
+    return [
+        item.original_text if item.original_text is not None else stored.get(item.text_hash, "")
+        for item in items
+    ]
+
+async def _touch_session(
+    user: Principal,
+    session_id: PydanticObjectId,
+    summary_count_delta: int = 0
+) -> bool:
+    increments = {"revision": 1}
+    if summary_count_delta:
+        increments["summary_count"] = summary_count_delta
+    result = await ChatSession.find_one(
+        ChatSession.id == session_id,
+        ChatSession.user_id == user.id
+    ).update({"$set": {"updated_at": datetime.utcnow()}, "$inc": increments})
+    return result.matched_count == 1
+
+async def _reserve_summary_seq(
+    user: Principal,
+    session_id: PydanticObjectId,
+    count: int
+) -> Optional[int]:
+    """Claim `count` consecutive summary sequence numbers in the session and return
+    the first one, or None if the session does not belong to the user. Numbers
+    claimed by a write that then fails are skipped, never reused; summary_count
+    is left to the caller, once the summaries exist."""
+    session = await ChatSession.get_motor_collection().find_one_and_update(
+        {"_id": session_id, "user_id": user.id},
+        {"$inc": {"summary_seq": count}},
+        projection={"summary_seq": 1},
+        return_document=ReturnDocument.AFTER
     )
-    
-    user.chat_sessions.append(session)
-    await user.save()
-    return len(user.chat_sessions) - 1  # Return the index of the new session
-
-async def get_chat_sessions(user: User) -> List[ChatSession]:
-    return user.chat_sessions
-
-async def get_chat_session(user: User, session_id: int) -> Optional[ChatSession]:
-    if 0 <= session_id < len(user.chat_sessions):
-        return user.chat_sessions[session_id]
-    return None
-
-async def update_chat_session_title(user: User, session_id: int, title: str) -> bool:
-    if 0 <= session_id < len(user.chat_sessions):
-        user.chat_sessions[session_id].title = title
-        user.chat_sessions[session_id].updated_at = datetime.utcnow()
-        await user.save()
-        return True
-    return False
-
-async def delete_chat_session(user: User, session_id: int) -> bool:
-    if 0 <= session_id < len(user.chat_sessions):
-        user.chat_sessions.pop(session_id)
-        await user.save()
-        return True
-    return False
+    if session is None:
+        return None
+    return session["summary_seq"] - count
+
+def _meta_group(seq: int) -> int:
+    return seq // settings.META_GROUP_SIZE
+
+async def _mark_meta_groups_dirty(
+    user_id: PydanticObjectId,
+    session_id: PydanticObjectId,
+    groups: Iterable[int]
+) -> None:
+    # A single write touches one group, a batch only a few consecutive ones
+    nodes = MetaSummaryNode.get_motor_collection()
+    for group in sorted(set(groups)):
+        await nodes.update_one(
+            {"session_id": session_id, "level": 0, "index": group},
+            {
+                "$set": {"dirty": True, "updated_at": datetime.utcnow()},
+                "$inc": {"version": 1},
+                "$setOnInsert": {"user_id": user_id, "summary_text": None, "source_hash": None}
+            },
+            upsert=True
+        )
 
 # Summary operations within chat sessions
+@traced_operation(CRUD_SECONDS)
 async def add_summary_to_chat(
-    user: User, 
-    session_id: int, 
-    original_text: str, 
-    summary_text: str, 
-    parameters: Dict
-) -> Optional[int]:
-    if 0 <= session_id < len(user.chat_sessions):
-        summary = SummaryItem(
-            original_text=original_text,
+    user: Principal,
+    session_id: PydanticObjectId,
+    original_text: str,
+    summary_text: str,
+    parameters: Dict,
+    lsh_bands: Optional[List[int]] = None
+) -> Optional[PydanticObjectId]:
+    """lsh_bands may be passed in when the caller already fingerprinted the text"""
+    # Reserving the sequence number first doubles as the ownership check
+    seq = await _reserve_summary_seq(user, session_id, 1)
+    if seq is None:
+        return None
+
+    summary = SummaryItem(
+        user_id=user.id,
+        session_id=session_id,
+        text_hash=await text_store.put(original_text),
+        text_length=len(original_text),
+        search_terms=original_search_terms(original_text),
+        summary_text=summary_text,
+        parameters=parameters,
+        created_at=datetime.utcnow(),
+        meta_group=_meta_group(seq),
+        lsh_bands=lsh_bands if lsh_bands is not None else TextFingerprint(original_text).bands
+    )
+    try:
+        await summary.insert()
+    except BaseException:
+        await text_store.release([summary.text_hash])
+        raise
+    await _touch_session(user, session_id, summary_count_delta=1)
+    await _mark_meta_groups_dirty(user.id, session_id, [summary.meta_group])
+    await _index_summary({"_id": summary.id, **summary.dict(exclude={"id"})}, original_text)
+    return summary.id
+
+@traced_operation(CRUD_SECONDS)
+async def add_summaries_to_chat(
+    user: Principal,
+    session_id: PydanticObjectId,
+    items: List[Tuple[str, str, Dict]]
+) -> Optional[List[PydanticObjectId]]:
+    """Bulk variant of add_summary_to_chat for (original_text, summary_text, parameters)
+    tuples: two session updates and one insert_many, whatever the batch size."""
+    first_seq = await _reserve_summary_seq(user, session_id, len(items))
+    if first_seq is None:
+        return None
+    if not items:
+        return []
+
+    # One store round trip per distinct text, plus one for its extra references
+    hashes = {}
+    for original_text, _, _ in items:
+        if original_text not in hashes:
+            hashes[original_text] = await text_store.put(original_text)
+    repeats = Counter(original_text for original_text, _, _ in items)
+    await text_store.adjust({hashes[text]: count - 1 for text, count in repeats.items()})
+
+    now = datetime.utcnow()
+    summaries = [
+        SummaryItem(
+            user_id=user.id,
+            session_id=session_id,
+            text_hash=hashes[original_text],
+            text_length=len(original_text),
+            search_terms=original_search_terms(original_text),
             summary_text=summary_text,
             parameters=parameters,
-            created_at=datetime.utcnow()
+            created_at=now,
+            meta_group=_meta_group(first_seq + offset),
+            lsh_bands=TextFingerprint(original_text).bands
         )
-        user.chat_sessions[session_id].summaries.append(summary)
-        user.chat_sessions[session_id].updated_at = datetime.utcnow()
-        await user.save()
-        return len(user.chat_sessions[session_id].summaries) - 1  # Return index of new summary
-    return None
+        for offset, (original_text, summary_text, parameters) in enumerate(items)
+    ]
+    try:
+        result = await SummaryItem.insert_many(summaries)
+    except BaseException:
+        await text_store.release(summary.text_hash for summary in summaries)
+        raise
+    await _touch_session(user, session_id, summary_count_delta=len(summaries))
+    await _mark_meta_groups_dirty(user.id, session_id, [summary.meta_group for summary in summaries])
+    summary_ids = [PydanticObjectId(inserted_id) for inserted_id in result.inserted_ids]
+    for summary_id, summary, (original_text, _, _) in zip(summary_ids, summaries, items):
+        await _index_summary({"_id": summary_id, **summary.dict(exclude={"id"})}, original_text)
+    return summary_ids
 
+@traced_operation(CRUD_SECONDS)
 async def get_summary_from_chat(
-    user: User, 
-    session_id: int, 
-    summary_index: int
+    user: Principal,
+    session_id: PydanticObjectId,
+    summary_id: PydanticObjectId
 ) -> Optional[SummaryItem]:
-    if (0 <= session_id < len(user.chat_sessions) and 
-        0 <= summary_index < len(user.chat_sessions[session_id].summaries)):
-        return user.chat_sessions[session_id].summaries[summary_index]
-    return None
+    return await SummaryItem.find_one(
+        SummaryItem.id == summary_id,
+        SummaryItem.session_id == session_id,
+        SummaryItem.user_id == user.id
+    )
 
+@traced_operation(CRUD_SECONDS)
 async def update_summary_in_chat(
-    user: User,
-    session_id: int,
-    summary_index: int,
+    user: Principal,
+    session_id: PydanticObjectId,
+    summary_id: PydanticObjectId,
     original_text: Optional[str] = None,
     summary_text: Optional[str] = None,
-    parameters: Optional[Dict] = None
+    parameters: Optional[Dict] = None,
+    expected_revision: Optional[int] = None,
+    versions: Optional[List[SummaryVersion]] = None
 ) -> bool:
-    if (0 <= session_id < len(user.chat_sessions) and 
-        0 <= summary_index < len(user.chat_sessions[session_id].summaries)):
-        summary = user.chat_sessions[session_id].summaries[summary_index]
-        if original_text is not None:
-            summary.original_text = original_text
-        if summary_text is not None:
-            summary.summary_text = summary_text
-        if parameters is not None:
-            summary.parameters = parameters
-        user.chat_sessions[session_id].updated_at = datetime.utcnow()
-        await user.save()
-        return True
-    return False
+    """Update a summary in place. With expected_revision the write only applies if
+    nobody else has changed the summary since it was read at that revision.
+    versions replaces the stored version history in the same write."""
+    fields = {}
+    update = {"$inc": {"revision": 1}}
+    new_hash = None
+    if original_text is not None:
+        new_hash = await text_store.put(original_text)
+        fields.update({
+            "text_hash": new_hash,
+            "text_length": len(original_text),
+            "search_terms": original_search_terms(original_text),
+            "lsh_bands": TextFingerprint(original_text).bands
+        })
+        update["$unset"] = {"original_text": ""}
+    if summary_text is not None:
+        fields["summary_text"] = summary_text
+    if parameters is not None:
+        fields["parameters"] = parameters
+    if versions is not None:
+        fields["versions"] = [version.dict() for version in versions]
+    if fields:
+        update["$set"] = fields
+
+    criteria = {"_id": summary_id, "session_id": session_id, "user_id": user.id}
+    if expected_revision is not None:
+        criteria["revision"] = expected_revision
+
+    # The state before the write tells which text references were dropped
+    previous = await SummaryItem.get_motor_collection().find_one_and_update(
+        criteria,
+        update,
+        projection={
+            **_TEXT_REFERENCE_FIELDS, "meta_group": 1, "user_id": 1, "session_id": 1,
+            "summary_text": 1, "original_text": 1
+        },
+        return_document=ReturnDocument.BEFORE
+    )
+    if previous is None:
+        await text_store.release([new_hash])
+        return False
+
+    released = Counter()
+    if new_hash is not None and previous.get("text_hash"):
+        released[previous["text_hash"]] += 1
+    if versions is not None:
+        released.update(_text_references({"versions": previous.get("versions")}))
+        released.subtract(version.text_hash for version in versions if version.text_hash)
+    await text_store.adjust({digest: -count for digest, count in released.items()})
 
+    await _touch_session(user, session_id)
+    if summary_text is not None and previous.get("meta_group") is not None:
+        await _mark_meta_groups_dirty(user.id, session_id, [previous["meta_group"]])
+    if original_text is not None or summary_text is not None:
+        if original_text is None:
+            original_text = previous.get("original_text")
+            if original_text is None:
+                original_text = await text_store.get(previous["text_hash"]) or ""
+        current = {**previous, "summary_text": summary_text if summary_text is not None else previous["summary_text"]}
+        await _index_summary(current, original_text)
+    return True
+
+@traced_operation(CRUD_SECONDS)
 async def delete_summary_from_chat(
-    user: User,
-    session_id: int,
-    summary_index: int
+    user: Principal,
+    session_id: PydanticObjectId,
+    summary_id: PydanticObjectId
 ) -> bool:
-    if (0 <= session_id < len(user.chat_sessions) and 
-        0 <= summary_index < len(user.chat_sessions[session_id].summaries)):
-        user.chat_sessions[session_id].summaries.pop(summary_index)
-        user.chat_sessions[session_id].updated_at = datetime.utcnow()
-        await user.save()
-        return True
-    return False
+    deleted = await SummaryItem.get_motor_collection().find_one_and_delete(
+        {"_id": summary_id, "session_id": session_id, "user_id": user.id},
+        projection={**_TEXT_REFERENCE_FIELDS, "meta_group": 1}
+    )
+    if deleted is None:
+        return False
+    await text_store.release(_text_references(deleted))
 
+    await _touch_session(user, session_id, summary_count_delta=-1)
+    if deleted.get("meta_group") is not None:
+        await _mark_meta_groups_dirty(user.id, session_id, [deleted["meta_group"]])
+    if embedding_index is not None:
+        await embedding_index.remove(summary_id)
+    return True
+
+@traced_operation(CRUD_SECONDS)
 async def update_chat_meta_summary(
-    user: User,
-    session_id: int,
-    meta_summary: str
+    user: Principal,
+    session_id: PydanticObjectId,
+    meta_summary: str,
+    expected_revision: Optional[int] = None
 ) -> bool:
-    if 0 <= session_id < len(user.chat_sessions):
-        user.chat_sessions[session_id].meta_summary = meta_summary
-        user.chat_sessions[session_id].updated_at = datetime.utcnow()
-        await user.save()
-        return True
-    return False
\ No newline at end of file
+    criteria = {"_id": session_id, "user_id": user.id}
+    if expected_revision is not None:
+        criteria["revision"] = expected_revision
+
+    updated = await ChatSession.get_motor_collection().find_one_and_update(
+        criteria,
+        {"$set": {"meta_summary": meta_summary, "updated_at": datetime.utcnow()}, "$inc": {"revision": 1}},
+        projection={"title": 1}
+    )
+    if updated is None:
+        return False
+    await _index_session(user.id, session_id, updated["title"], meta_summary)
+    return True
+
+# Stored meta-summary reductions
+@traced_operation(CRUD_SECONDS)
+async def assign_meta_groups(user: Principal, session_id: PydanticObjectId) -> int:
+    """Give summaries created before meta-summary groups existed a group, in creation
+    order, and mark those groups dirty. Returns how many summaries were assigned."""
+    unassigned = await SummaryItem.find(
+        SummaryItem.session_id == session_id,
+        SummaryItem.user_id == user.id,
+        SummaryItem.meta_group == None  # also matches documents without the field
+    ).sort(+SummaryItem.created_at, +SummaryItem.id).to_list()
+    if not unassigned:
+        return 0
+
+    first_seq = await _reserve_summary_seq(user, session_id, len(unassigned))
+    if first_seq is None:
+        return 0
+
+    by_group: Dict[int, List[PydanticObjectId]] = {}
+    for offset, summary in enumerate(unassigned):
+        by_group.setdefault(_meta_group(first_seq + offset), []).append(summary.id)
+    for group, ids in by_group.items():
+        await SummaryItem.get_motor_collection().update_many(
+            {"_id": {"$in": ids}, "meta_group": None},
+            {"$set": {"meta_group": group}}
+        )
+    await _mark_meta_groups_dirty(user.id, session_id, by_group.keys())
+    return len(unassigned)
+
+@traced_operation(CRUD_SECONDS)
+async def get_meta_nodes(session_id: PydanticObjectId, level: int) -> List[MetaSummaryNode]:
+    return await MetaSummaryNode.find(
+        MetaSummaryNode.session_id == session_id,
+        MetaSummaryNode.level == level
+    ).sort(+MetaSummaryNode.index).to_list()
+
+@traced_operation(CRUD_SECONDS)
+async def get_meta_group_summaries(
+    user: Principal,
+    session_id: PydanticObjectId,
+    groups: List[int]
+) -> List[SummaryItem]:
+    return await SummaryItem.find(
+        SummaryItem.session_id == session_id,
+        SummaryItem.user_id == user.id,
+        {"meta_group": {"$in": groups}}
+    ).sort(+SummaryItem.created_at, +SummaryItem.id).to_list()
+
+@traced_operation(CRUD_SECONDS)
+async def save_meta_node(
+    user: Principal,
+    session_id: PydanticObjectId,
+    level: int,
+    index: int,
+    summary_text: str,
+    source_hash: Optional[str] = None,
+    expected_version: Optional[int] = None
+) -> bool:
+    """Store a clean reduction. With expected_version the node is only updated if it
+    has not been marked dirty again since it was read; otherwise it is upserted."""
+    criteria = {"session_id": session_id, "level": level, "index": index}
+    if expected_version is not None:
+        criteria["version"] = expected_version
+    result = await MetaSummaryNode.get_motor_collection().update_one(
+        criteria,
+        {
+            "$set": {
+                "summary_text": summary_text,
+                "source_hash": source_hash,
+                "dirty": False,
+                "updated_at": datetime.utcnow()
+            },
+            "$setOnInsert": {"user_id": user.id, "version": 0}
+        },
+        upsert=expected_version is None
+    )
+    return result.matched_count == 1 or result.upserted_id is not None
+
+@traced_operation(CRUD_SECONDS)
+async def delete_meta_nodes(
+    session_id: PydanticObjectId,
+    level: int,
+    indexes: Optional[List[int]] = None,
+    expected_version: Optional[int] = None
+) -> None:
+    """Delete nodes at `level` (only the given indexes if set), or at every level
+    above it as well when indexes is None."""
+    if indexes is None:
+        criteria = {"session_id": session_id, "level": {"$gte": level}}
+    else:
+        criteria = {"session_id": session_id, "level": level, "index": {"$in": indexes}}
+    if expected_version is not None:
+        criteria["version"] = expected_version
+    await MetaSummaryNode.get_motor_collection().delete_many(criteria)
+
+# Request profiles (not traced: they are written after the profiled request)
+async def save_request_profile(profile: RequestProfile) -> None:
+    await profile.insert()
+
+async def get_request_profiles(limit: int) -> List[RequestProfileListing]:
+    return await RequestProfile.find_all().sort(-RequestProfile.created_at).limit(limit).project(RequestProfileListing).to_list()
+
+async def get_request_profile(profile_id: PydanticObjectId) -> Optional[RequestProfile]:
+    return await RequestProfile.get(profile_id)
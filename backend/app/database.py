@@ -1,14 +1,42 @@
 import dns.resolver
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
-from app.models import User
+from pymongo import IndexModel
+from app.models import User, ChatSession, SummaryItem, StoredText, MetaSummaryNode, SearchEmbedding, SummaryJob, SummaryCacheEntry, RateLimitBucket, RequestProfile
 from app.config import settings
+from app.services.metrics import MongoCommandMetrics
 import asyncio
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DOCUMENT_MODELS = [
+    User, ChatSession, SummaryItem, StoredText, MetaSummaryNode, SearchEmbedding, SummaryJob, SummaryCacheEntry, RateLimitBucket, RequestProfile
+]
+
+async def drop_changed_text_indexes(database) -> None:
+    """A collection can only have one text index, so one whose fields or weights
+    changed is dropped here; init_beanie then builds it again from the model"""
+    for model in DOCUMENT_MODELS:
+        wanted = [
+            index.document for index in getattr(model.Settings, "indexes", [])
+            if isinstance(index, IndexModel) and "weights" in index.document
+        ]
+        if not wanted:
+            continue
+        collection = database[model.Settings.name]
+        existing = await collection.index_information()
+        for index in wanted:
+            current = existing.get(index["name"])
+            if current is None or "weights" not in current:
+                continue
+            # Mongo lists every text field's weight, including the default of 1
+            weights = {field: index["weights"].get(field, 1) for field, kind in index["key"].items() if kind == "text"}
+            if dict(current["weights"]) != weights:
+                logger.warning(f"Dropping text index {index['name']} of {model.Settings.name} to rebuild it")
+                await collection.drop_index(index["name"])
+
 async def init_db():
     try:
         # Configure DNS resolver with Google's DNS
@@ -22,7 +50,8 @@ async def init_db():
             connectTimeoutMS=30000,
             socketTimeoutMS=30000,
             maxIdleTimeMS=30000,
-            retryWrites=True
+            retryWrites=True,
+            event_listeners=[MongoCommandMetrics()] if settings.METRICS_ENABLED else []
         )
         
         # Test connection
@@ -33,10 +62,10 @@ async def init_db():
             logger.error(f"Failed to ping MongoDB cluster: {str(e)}")
             raise
 
-        # Initialize beanie with only User model
+        await drop_changed_text_indexes(client[settings.DB_NAME])
         await init_beanie(
             database=client[settings.DB_NAME],
-            document_models=[User]
+            document_models=DOCUMENT_MODELS
         )
         
         logger.info("Successfully initialized database connection")
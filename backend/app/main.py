@@ -1,11 +1,22 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 import logging
 
 from app.database import init_db
 from app.config import settings
-from app.routers import auth_router, chat_router
+from app.routers import auth_router, chat_router, admin_router
+from app.services.summarization_backends import summarization_backend
+from app.services.inference_scheduler import inference_scheduler
+from app.services.summary_cache import summary_cache
+from app.services.job_queue import job_queue
+from app.services.password_hasher import password_hasher
+from app.services.metrics import MetricsMiddleware, metrics, refresh_collection_stats
+from app.services.tracing import TracingMiddleware
+from app.services.profiling import ProfilingMiddleware
+from app.models import User, Principal
+from app.utils import get_admin_principal
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,9 +38,18 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Middleware added last runs first: metrics wrap the trace, which wraps the profile
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(TracingMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(chat_router)
+app.include_router(admin_router)
 
 @app.on_event("startup")
 async def startup_event():
@@ -40,6 +60,36 @@ async def startup_event():
         logger.error(f"Failed to initialize database: {str(e)}")
         raise
 
+    await summarization_backend.start()
+    job_queue.start_workers(settings.JOB_WORKERS)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_queue.stop_workers()
+    await summarization_backend.close()
+    password_hasher.close()
+
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "timestamp": datetime.utcnow()}
\ No newline at end of file
+    return {"status": "ok", "timestamp": datetime.utcnow()}
+
+@app.get("/cache/stats")
+async def cache_stats(admin: Principal = Depends(get_admin_principal)):
+    """Summary cache hit rates; admins (ADMIN_EMAILS) only"""
+    return summary_cache.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint. Not authenticated: restrict it at the proxy."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    try:
+        await refresh_collection_stats(User.get_motor_collection().database, settings.METRICS_COLLECTION_STATS_TTL_SECONDS)
+    except Exception as e:
+        logger.debug(f"Collection stats unavailable: {str(e)}")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/inference/stats")
+async def inference_stats(admin: Principal = Depends(get_admin_principal)):
+    """Inference batching and queueing statistics; admins (ADMIN_EMAILS) only"""
+    return inference_scheduler.stats()
@@ -1,32 +1,256 @@
-from beanie import Document
+from beanie import Document, Indexed, PydanticObjectId
+from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT
 from pydantic import BaseModel, Field, EmailStr, validator
 from datetime import datetime
 from typing import Optional, List
 
-class SummaryItem(BaseModel):
-    original_text: str
+class StoredText(Document):
+    """An original text stored once per distinct content, shared by every summary
+    and summary version that references it. The zlib-compressed text is held inline,
+    or in the "text_blobs" GridFS bucket when large."""
+    text_hash: Indexed(str, unique=True)  # SHA-256 of the UTF-8 text
+    length: int  # Characters
+    compressed_size: int
+    data: Optional[bytes] = None
+    gridfs_id: Optional[PydanticObjectId] = None
+    # Summaries and versions referencing the text; removed when it drops to 0
+    refcount: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "texts"
+
+class SummaryVersion(BaseModel):
+    """An earlier state of a summary, kept when it is regenerated or restored"""
+    revision: int  # The summary's revision while this was its current state
+    text_hash: Optional[str] = None
+    text_length: int = 0
+    # Only on versions of summaries stored before the text store
+    original_text: Optional[str] = None
+    summary_text: str
+    parameters: dict
+    replaced_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SummaryItem(Document):
+    user_id: PydanticObjectId
+    session_id: PydanticObjectId
+    # The original text lives in the text store (app.services.text_store) and is
+    # only loaded by endpoints that return it
+    text_hash: Optional[str] = None
+    text_length: int = 0
+    # Inline text of summaries stored before the text store, until migrated
+    original_text: Optional[str] = None
+    # Distinct words of the original text, for keyword search without loading it
+    search_terms: Optional[str] = None
     summary_text: str
     parameters: dict
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped by every update, for optimistic concurrency checks
+    revision: int = 0
+    # Meta-summary group this summary is reduced in; None for summaries created
+    # before groups existed, which are assigned one on the next meta-summary
+    meta_group: Optional[int] = None
+    # MinHash LSH band keys of original_text, for near-duplicate lookups
+    lsh_bands: Optional[List[int]] = None
+    # Earlier states, oldest first, at most SUMMARY_MAX_VERSIONS of them
+    versions: List[SummaryVersion] = Field(default_factory=list)
+
+    class Settings:
+        name = "summaries"
+        indexes = [
+            IndexModel([("session_id", ASCENDING), ("created_at", ASCENDING)]),
+            IndexModel([("session_id", ASCENDING), ("meta_group", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("lsh_bands", ASCENDING)]),
+            IndexModel([("lsh_bands", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING)]),
+            # Keyword search; the user_id prefix keeps each search within one user's entries.
+            # Original texts are matched through search_terms, or through original_text
+            # on summaries not yet moved to the text store.
+            IndexModel(
+                [("user_id", ASCENDING), ("summary_text", TEXT), ("original_text", TEXT), ("search_terms", TEXT)],
+                weights={"summary_text": 3, "original_text": 1, "search_terms": 1},
+                name="summary_text_search"
+            )
+        ]
 
-class ChatSession(BaseModel):
+class ChatSession(Document):
+    user_id: PydanticObjectId
     title: str
-    summaries: List[SummaryItem] = Field(default_factory=list)
+    summary_count: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     meta_summary: Optional[str] = None  # Summary of all summaries in the chat
+    # Bumped by every update, for optimistic concurrency checks
+    revision: int = 0
+    # Number of summaries ever added; assigns each new summary its meta-summary group
+    summary_seq: int = 0
+
+    class Settings:
+        name = "chat_sessions"
+        indexes = [
+            IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+            IndexModel(
+                [("user_id", ASCENDING), ("title", TEXT), ("meta_summary", TEXT)],
+                weights={"title": 5, "meta_summary": 2},
+                name="session_text_search"
+            )
+        ]
+
+class ChatSessionListing(BaseModel):
+    """Projection of ChatSession used for listings; never loads summaries"""
+    id: PydanticObjectId = Field(alias="_id")
+    title: str
+    summary_count: int = 0
+    created_at: datetime
+    updated_at: datetime
+    meta_summary: Optional[str] = None
 
 class User(Document):
     email: EmailStr = Field(unique=True)
     hashed_password: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = Field(default=True)
-    chat_sessions: List[ChatSession] = Field(default_factory=list)
 
     class Settings:
         name = "users"
         use_state_management = True
 
+class MetaSummaryNode(Document):
+    """A stored intermediate reduction of a session's meta-summary tree.
+
+    Level 0 nodes reduce the summaries of one meta_group; a node at level n
+    reduces the level n-1 nodes whose index // META_GROUP_SIZE equals its own.
+    """
+    user_id: PydanticObjectId
+    session_id: PydanticObjectId
+    level: int
+    index: int
+    summary_text: Optional[str] = None
+    # Level 0: set when a summary in the group changes. Higher levels compare
+    # source_hash against their children instead.
+    dirty: bool = True
+    source_hash: Optional[str] = None
+    # Bumped whenever the node is marked dirty, so a reduction computed from
+    # older summaries is never stored as clean
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "meta_summary_nodes"
+        indexes = [
+            IndexModel(
+                [("session_id", ASCENDING), ("level", ASCENDING), ("index", ASCENDING)],
+                unique=True
+            )
+        ]
+
+class SearchEmbedding(Document):
+    """Embedding of a summary (summary and original text) or a session (title and
+    meta-summary) for semantic search"""
+    user_id: PydanticObjectId
+    kind: str  # "summary" or "session"
+    ref_id: PydanticObjectId  # The summary or session id
+    session_id: PydanticObjectId
+    vector: bytes  # float32, L2-normalized
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "search_embeddings"
+        indexes = [
+            IndexModel([("ref_id", ASCENDING)], unique=True),
+            IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING)]),
+            IndexModel([("session_id", ASCENDING)])
+        ]
+
+class SummaryJob(Document):
+    """A queued summarization request, processed by the background worker pool"""
+    user_id: PydanticObjectId
+    session_id: PydanticObjectId
+    text: str
+    parameters: dict
+    priority: int = 0  # Higher runs first
+    status: str = "queued"  # queued, running, succeeded or failed
+    attempts: int = 0
+    max_attempts: int = 3
+    error: Optional[str] = None
+    summary_id: Optional[PydanticObjectId] = None
+    summary_text: Optional[str] = None
+    worker_id: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Not claimable before this time; pushed back between retries
+    available_at: datetime = Field(default_factory=datetime.utcnow)
+    # A running job whose lease has expired is assumed abandoned and requeued
+    lease_expires_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Set when the job finishes; Mongo removes it JOB_RETENTION_HOURS later
+    expires_at: Optional[datetime] = None
+
+    class Settings:
+        name = "summary_jobs"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+            IndexModel([("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("user_id", ASCENDING)]),
+            IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        ]
+
+class SummaryCacheEntry(Document):
+    key: Indexed(str, unique=True)
+    summary_text: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+    class Settings:
+        name = "summary_cache"
+        # Mongo removes entries once expires_at has passed
+        indexes = [IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)]
+
+class RateLimitBucket(Document):
+    """A user's admission-control token bucket, shared by all workers"""
+    key: Indexed(str, unique=True)
+    tokens: float
+    updated_at: float  # Unix time of the last refill
+    taken: bool = True  # Whether the last request could take its tokens
+    expires_at: datetime
+
+    class Settings:
+        name = "rate_limit_buckets"
+        # Buckets idle long enough to be full again are removed
+        indexes = [IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)]
+
+class RequestProfile(Document):
+    """cProfile capture of one request, downloadable by admins until it expires"""
+    method: str
+    path: str
+    status_code: int
+    duration_ms: float
+    reason: str  # "requested" (admin X-Profile header) or "sampled"
+    user_email: Optional[str] = None
+    stats: bytes  # marshalled pstats data, as written by cProfile's dump_stats
+    summary: str  # Top functions by cumulative time
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+    class Settings:
+        name = "request_profiles"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+            IndexModel([("created_at", DESCENDING)])
+        ]
+
+class RequestProfileListing(BaseModel):
+    """Projection of RequestProfile without the profile data"""
+    id: PydanticObjectId = Field(alias="_id")
+    method: str
+    path: str
+    status_code: int
+    duration_ms: float
+    reason: str
+    user_email: Optional[str] = None
+    created_at: datetime
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -34,6 +258,15 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     email: Optional[str] = None
 
+class Principal(BaseModel):
+    """The authenticated caller, without the rest of the user document"""
+    id: PydanticObjectId = Field(alias="_id")
+    email: EmailStr
+    is_active: bool = True
+
+    class Config:
+        populate_by_name = True
+
 class SummaryParameters(BaseModel):
     min_length: int = Field(50, ge=10, le=1000)
     max_length: int = Field(250, ge=50, le=1000)
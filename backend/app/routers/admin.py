@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, Response
+from beanie import PydanticObjectId
+from app.schemas.admin import RequestProfileItem, RequestProfileList
+from app.models import Principal
+from app.crud import get_request_profiles, get_request_profile
+from app.services.tracing import TracedRoute
+from app.utils import get_admin_principal
+
+router = APIRouter(prefix="/admin", tags=["Admin"], route_class=TracedRoute)
+
+@router.get("/profiles", response_model=RequestProfileList)
+async def list_request_profiles(
+    limit: int = Query(50, ge=1, le=200),
+    admin: Principal = Depends(get_admin_principal)
+):
+    """Stored request profiles, newest first"""
+    profiles = await get_request_profiles(limit)
+    return RequestProfileList(items=[
+        RequestProfileItem(
+            profile_id=str(profile.id),
+            method=profile.method,
+            path=profile.path,
+            status_code=profile.status_code,
+            duration_ms=profile.duration_ms,
+            reason=profile.reason,
+            user_email=profile.user_email,
+            created_at=profile.created_at
+        )
+        for profile in profiles
+    ])
+
+@router.get("/profiles/{profile_id}")
+async def download_request_profile(
+    profile_id: PydanticObjectId,
+    format: str = Query("pstats", description="pstats (for snakeviz, pstats.Stats) or text"),
+    admin: Principal = Depends(get_admin_principal)
+):
+    profile = await get_request_profile(profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    if format == "text":
+        return PlainTextResponse(profile.summary)
+    if format != "pstats":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be pstats or text"
+        )
+    return Response(
+        content=profile.stats,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'}
+    )
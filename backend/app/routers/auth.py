@@ -3,10 +3,11 @@ from typing import Optional
 from app.schemas import UserCreate, UserResponse, LoginRequest, UserUpdate
 from app.services.auth_service import AuthService
 from app.config import settings
-from app.utils import get_current_user, get_password_hash
+from app.utils import get_current_user, get_current_principal, get_password_hash
 from app.crud import delete_user, update_user
+from app.services.tracing import TracedRoute
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=TracedRoute)
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(response: Response, user: UserCreate):
@@ -50,7 +51,7 @@ async def logout(response: Response):
     return {"message": "Logged out successfully"}
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user = Depends(get_current_user)):
+async def get_current_user_info(current_user = Depends(get_current_principal)):
     return UserResponse(
         email=current_user.email,
         message="User information retrieved successfully"
@@ -78,7 +79,7 @@ async def update_current_user(
         )
     
     if "password" in update_dict:
-        update_dict["hashed_password"] = get_password_hash(update_dict.pop("password"))
+        update_dict["hashed_password"] = await get_password_hash(update_dict.pop("password"))
     
     updated_user = await update_user(current_user, update_dict)
     return UserResponse(
@@ -1,71 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional, Dict
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import AsyncIterator, Optional, Dict
+import asyncio
 from pydantic import BaseModel, Field
 from app.schemas.chat import (
     ChatSessionCreate,
     ChatSessionResponse,
+    ChatSessionPage,
     SummaryRequest, 
     SummaryResponse,
+    SummaryVersionList,
+    BatchSummaryRequest,
+    BatchSummaryResponse,
+    SummaryJobRequest,
+    SummaryJobResponse,
+    NearDuplicateRequest,
+    NearDuplicateResponse,
+    SearchResponse,
     MetaSummaryRequest,
-    MetaSummaryResponse,
-    SummaryItemSchema
+    MetaSummaryResponse
 )
 from app.services.chat_service import ChatService
-from app.utils import get_current_user
-from app.models import User
+from app.services.admission import AdmissionTicket, admission_control, META_TOKENS_PER_SUMMARY
+from app.services.serialization import (
+    FastJSONResponse,
+    batch_response,
+    dumps,
+    meta_summary_response,
+    near_duplicate_response,
+    search_response,
+    session_detail,
+    session_list_item,
+    stored_summary_response,
+    summary_job,
+    summary_versions,
+    summary_response
+)
+from app.services.search import SearchService
+from app.services.tracing import TracedRoute
+from app.services.job_queue import job_queue, FINISHED_STATUSES
+from app.config import settings
+from app.utils import get_current_principal, encode_cursor, decode_cursor
+from app.models import Principal
 from app.crud import (
-    get_chat_sessions,
+    get_chat_session_page,
     get_chat_session,
+    get_session_summaries,
     delete_chat_session,
     update_chat_session_title,
     get_summary_from_chat,
-    update_summary_in_chat,
+    get_original_texts,
     delete_summary_from_chat
 )
+from beanie import PydanticObjectId
 from datetime import datetime
 
-router = APIRouter(prefix="/chat", tags=["Chat"])
+# Handlers on hot paths return a FastJSONResponse built by the converters in
+# app.services.serialization; response_model then only documents the shape
+router = APIRouter(
+    prefix="/chat",
+    tags=["Chat"],
+    route_class=TracedRoute,
+    default_response_class=FastJSONResponse
+)
 
 @router.post("/sessions", response_model=dict, status_code=status.HTTP_201_CREATED)
 async def create_chat_session(
     request: ChatSessionCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     session_id = await ChatService.create_session(
         current_user, 
         request.title
     )
     return {
-        "session_id": session_id,
+        "session_id": str(session_id),
         "message": "Chat session created successfully"
     }
 
-@router.get("/sessions", response_model=List[ChatSessionResponse])
-async def get_all_chat_sessions(current_user: User = Depends(get_current_user)):
-    sessions = await get_chat_sessions(current_user)
-    return [
-        ChatSessionResponse(
-            id=i,
-            title=session.title,
-            summaries=[
-                SummaryItemSchema(
-                    original_text=summary.original_text,
-                    summary_text=summary.summary_text,
-                    parameters=summary.parameters,
-                    created_at=summary.created_at
-                ) for summary in session.summaries
-            ],
-            created_at=session.created_at,
-            updated_at=session.updated_at,
-            meta_summary=session.meta_summary
-        ) 
-        for i, session in enumerate(sessions)
-    ]
+@router.get("/sessions", response_model=ChatSessionPage)
+async def get_all_chat_sessions(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Lightweight session listing, most recently updated first.
+    Fetch a session's summaries with GET /chat/sessions/{session_id}."""
+    before = decode_cursor(cursor) if cursor else None
+    sessions, has_more = await get_chat_session_page(current_user, limit, before)
+    
+    next_cursor = None
+    if has_more:
+        last = sessions[-1]
+        next_cursor = encode_cursor(last.updated_at, last.id)
+    
+    return FastJSONResponse({
+        "items": [session_list_item(session) for session in sessions],
+        "next_cursor": next_cursor
+    })
 
 @router.get("/sessions/{session_id}", response_model=ChatSessionResponse)
 async def get_chat_session_by_id(
-    session_id: int,
-    current_user: User = Depends(get_current_user)
+    session_id: PydanticObjectId,
+    current_user: Principal = Depends(get_current_principal)
 ):
     session = await get_chat_session(current_user, session_id)
     if not session:
@@ -74,174 +112,325 @@ async def get_chat_session_by_id(
             detail="Chat session not found"
         )
     
-    return ChatSessionResponse(
-        id=session_id,
-        title=session.title,
-        summaries=[
-            SummaryItemSchema(
-                original_text=summary.original_text,
-                summary_text=summary.summary_text,
-                parameters=summary.parameters,
-                created_at=summary.created_at
-            ) for summary in session.summaries
-        ],
-        created_at=session.created_at,
-        updated_at=session.updated_at,
-        meta_summary=session.meta_summary
-    )
+    summaries = await get_session_summaries(current_user, session_id)
+    original_texts = await get_original_texts(summaries)
+    return FastJSONResponse(session_detail(session, summaries, original_texts))
 
 @router.patch("/sessions/{session_id}", response_model=ChatSessionResponse)
 async def update_chat_session_title_endpoint(
-    session_id: int,
+    session_id: PydanticObjectId,
     title: str = Query(..., min_length=1),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    session = await get_chat_session(current_user, session_id)
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chat session not found"
-        )
-    
     success = await update_chat_session_title(current_user, session_id, title)
     if not success:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update chat session title"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found"
         )
     
     # Get updated session
     updated_session = await get_chat_session(current_user, session_id)
-    
-    return ChatSessionResponse(
-        id=session_id,
-        title=updated_session.title,
-        summaries=[
-            SummaryItemSchema(
-                original_text=summary.original_text,
-                summary_text=summary.summary_text,
-                parameters=summary.parameters,
-                created_at=summary.created_at
-            ) for summary in updated_session.summaries
-        ],
-        created_at=updated_session.created_at,
-        updated_at=updated_session.updated_at,
-        meta_summary=updated_session.meta_summary
-    )
+    summaries = await get_session_summaries(current_user, session_id)
+    original_texts = await get_original_texts(summaries)
+    return FastJSONResponse(session_detail(updated_session, summaries, original_texts))
 
 @router.post("/summarize", response_model=SummaryResponse, status_code=status.HTTP_201_CREATED)
 async def add_summary_to_chat_session(
     request: SummaryRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
+):
+    ticket = await admission_control.admit(current_user, admission_control.cost([request.text]))
+    async with ticket:
+        summary_id, result = await ChatService.add_summary(
+            current_user,
+            request.session_id,
+            request.text,
+            request.parameters
+        )
+    
+    return FastJSONResponse(
+        summary_response(
+            request.session_id, summary_id, request.text, result.summary_text,
+            request.parameters, datetime.utcnow(), result
+        ),
+        status_code=status.HTTP_201_CREATED
+    )
+
+def _sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+@router.post("/summarize/stream")
+async def stream_summary_to_chat_session(
+    request: SummaryRequest,
+    http_request: Request,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Same as POST /chat/summarize, but streams progress as Server-Sent Events:
+    queued, near_duplicate or compressed, chunked, chunk (one per summarized
+    chunk), reduce, summarized, then completed (the persisted summary) or error.
+    Disconnecting cancels the in-flight inference."""
+    # Admitted before streaming starts, so an overloaded server answers 429
+    ticket = await admission_control.admit(current_user, admission_control.cost([request.text]))
+
+    async def event_stream() -> AsyncIterator[str]:
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def on_progress(event: str, data: Dict) -> None:
+            await events.put((event, data))
+
+        task = asyncio.create_task(ChatService.add_summary(
+            current_user,
+            request.session_id,
+            request.text,
+            request.parameters,
+            on_progress=on_progress
+        ))
+        try:
+            yield _sse_event("queued", {"session_id": str(request.session_id)})
+
+            while True:
+                next_event = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait(
+                    {next_event, task}, timeout=1.0, return_when=asyncio.FIRST_COMPLETED
+                )
+                if next_event in done:
+                    yield _sse_event(*next_event.result())
+                    continue
+                next_event.cancel()
+                if task.done():
+                    break
+                if await http_request.is_disconnected():
+                    return
+
+            while not events.empty():
+                yield _sse_event(*events.get_nowait())
+
+            try:
+                summary_id, result = task.result()
+            except HTTPException as e:
+                yield _sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+                return
+
+            yield _sse_event("completed", summary_response(
+                request.session_id, summary_id, request.text, result.summary_text,
+                request.parameters, datetime.utcnow(), result
+            ))
+        finally:
+            # Abandoned streams must not keep consuming inference capacity
+            if not task.done():
+                task.cancel()
+            ticket.release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also frees the slot if the stream never started
+        background=BackgroundTask(ticket.release)
+    )
+
+@router.post("/sessions/{session_id}/summarize-batch", response_model=BatchSummaryResponse)
+async def summarize_batch(
+    session_id: PydanticObjectId,
+    request: BatchSummaryRequest,
+    current_user: Principal = Depends(get_current_principal)
+):
+    items = [
+        (item.text, item.parameters if item.parameters is not None else request.parameters)
+        for item in request.items
+    ]
+    async def admit(text: str) -> AdmissionTicket:
+        # One slot per item actually sent to the model, held only while it runs
+        return await admission_control.admit(current_user, admission_control.cost([text]))
+
+    outcomes = await ChatService.add_summaries_batch(current_user, session_id, items, admit=admit)
+    return FastJSONResponse(batch_response(session_id, items, outcomes))
+
+@router.post("/near-duplicates", response_model=NearDuplicateResponse)
+async def find_near_duplicate_summary(
+    request: NearDuplicateRequest,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Look up an existing summary of nearly the same text without calling the
+    model, so a client can offer it before submitting the text for summarization"""
+    match = await ChatService.find_near_duplicate(current_user, request.text, request.parameters)
+    return FastJSONResponse(near_duplicate_response(match))
+
+@router.get("/search", response_model=SearchResponse)
+async def search_summaries(
+    q: str = Query(..., min_length=1, max_length=500),
+    mode: str = Query("keyword", description="keyword, semantic or hybrid"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Search the user's summaries (original and summary text) and sessions
+    (title and meta-summary). Results are ranked best first; pass next_offset
+    as offset to get the following page."""
+    page = await SearchService.search(current_user, q, mode, limit, offset)
+    return FastJSONResponse(search_response(q, mode, page, offset + limit if page.has_more else None))
+
+@router.post("/jobs", response_model=SummaryJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_summary_job(
+    request: SummaryJobRequest,
+    current_user: Principal = Depends(get_current_principal)
 ):
-    summary_index, summary_text = await ChatService.add_summary(
+    """Queue a summary for background processing and return immediately.
+    Poll GET /chat/jobs/{job_id} or listen on GET /chat/jobs/{job_id}/events."""
+    session = await get_chat_session(current_user, request.session_id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found"
+        )
+    # Jobs run on the job workers' own capacity, but still count against the user's rate
+    await admission_control.check_rate(current_user, admission_control.cost([request.text]))
+    
+    job = await job_queue.submit(
         current_user,
         request.session_id,
         request.text,
-        request.parameters
+        request.parameters,
+        priority=request.priority
     )
-    
-    return SummaryResponse(
-        session_id=request.session_id,
-        summary_index=summary_index,
-        original_text=request.text,
-        summary_text=summary_text,
-        parameters=request.parameters,
-        created_at=datetime.utcnow()
+    return FastJSONResponse(summary_job(job), status_code=status.HTTP_202_ACCEPTED)
+
+@router.get("/jobs/{job_id}", response_model=SummaryJobResponse)
+async def get_summary_job(
+    job_id: PydanticObjectId,
+    current_user: Principal = Depends(get_current_principal)
+):
+    job = await job_queue.get(job_id, current_user)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return FastJSONResponse(summary_job(job))
+
+@router.get("/jobs/{job_id}/events")
+async def stream_summary_job_events(
+    job_id: PydanticObjectId,
+    http_request: Request,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Server-Sent Events: one "status" event per job state change, ending
+    once the job has succeeded or failed."""
+    job = await job_queue.get(job_id, current_user)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    async def event_stream() -> AsyncIterator[str]:
+        updates = job_queue.notifier.subscribe(job_id)
+        try:
+            current = await job_queue.get(job_id, current_user)
+            last_state = None
+            while current is not None:
+                state = (current.status, current.attempts)
+                if state != last_state:
+                    yield _sse_event("status", summary_job(current))
+                    last_state = state
+                if current.status in FINISHED_STATUSES:
+                    return
+                try:
+                    current = await asyncio.wait_for(updates.get(), settings.JOB_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    # The job may be running in another process; re-read it
+                    if await http_request.is_disconnected():
+                        return
+                    current = await job_queue.get(job_id, current_user)
+        finally:
+            job_queue.notifier.unsubscribe(job_id, updates)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
-@router.get("/sessions/{session_id}/summaries/{summary_index}", response_model=SummaryResponse)
-async def get_summary_by_index(
-    session_id: int,
-    summary_index: int,
-    current_user: User = Depends(get_current_user)
+@router.get("/sessions/{session_id}/summaries/{summary_id}", response_model=SummaryResponse)
+async def get_summary_by_id(
+    session_id: PydanticObjectId,
+    summary_id: PydanticObjectId,
+    current_user: Principal = Depends(get_current_principal)
 ):
-    summary = await get_summary_from_chat(current_user, session_id, summary_index)
+    summary = await get_summary_from_chat(current_user, session_id, summary_id)
     if not summary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Summary not found"
         )
     
-    return SummaryResponse(
-        session_id=session_id,
-        summary_index=summary_index,
-        original_text=summary.original_text,
-        summary_text=summary.summary_text,
-        parameters=summary.parameters,
-        created_at=summary.created_at
-    )
+    original_text = (await get_original_texts([summary]))[0]
+    return FastJSONResponse(stored_summary_response(session_id, summary, original_text))
 
 class PartialSummaryRequest(BaseModel):
     text: Optional[str] = Field(None, min_length=100, example="Long text to summarize...")
     parameters: Optional[Dict] = Field(None, example={"min_length": 50, "max_length": 200, "do_sample": False})
 
-@router.patch("/sessions/{session_id}/summaries/{summary_index}", response_model=SummaryResponse)
+@router.patch("/sessions/{session_id}/summaries/{summary_id}", response_model=SummaryResponse)
 async def update_summary(
-    session_id: int,
-    summary_index: int,
+    session_id: PydanticObjectId,
+    summary_id: PydanticObjectId,
     request: PartialSummaryRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    # Get existing summary
-    existing_summary = await get_summary_from_chat(current_user, session_id, summary_index)
-    if not existing_summary:
+    """Regenerate a summary with new text and/or parameters. The previous state is
+    kept in the summary's version history; an unchanged request is a no-op."""
+    async def admit(text: str) -> AdmissionTicket:
+        # Only called when the model will run, so repeated no-op PATCHes cost nothing
+        return await admission_control.admit(current_user, admission_control.cost([text]))
+
+    summary, original_text, result = await ChatService.regenerate_summary(
+        current_user,
+        session_id,
+        summary_id,
+        text=request.text,
+        parameters=request.parameters,
+        admit=admit
+    )
+
+    return FastJSONResponse(stored_summary_response(session_id, summary, original_text, result))
+
+@router.get("/sessions/{session_id}/summaries/{summary_id}/versions", response_model=SummaryVersionList)
+async def list_summary_versions(
+    session_id: PydanticObjectId,
+    summary_id: PydanticObjectId,
+    current_user: Principal = Depends(get_current_principal)
+):
+    summary = await get_summary_from_chat(current_user, session_id, summary_id)
+    if not summary:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Summary not found"
         )
 
-    # Determine what to update
-    text_to_use = request.text if request.text is not None else existing_summary.original_text
-    parameters_to_use = request.parameters if request.parameters is not None else existing_summary.parameters
+    versions = list(reversed(summary.versions))
+    original_texts = await get_original_texts(versions)
+    return FastJSONResponse(summary_versions(session_id, summary, versions, original_texts))
 
-    # Generate new summary if either text or parameters changed
-    if request.text is not None or request.parameters is not None:
-        summary_index_new, summary_text = await ChatService.add_summary(
-            current_user,
-            session_id,
-            text_to_use,
-            parameters_to_use
-        )
-        
-        # Update the existing summary with new content
-        success = await update_summary_in_chat(
-            current_user,
-            session_id,
-            summary_index,
-            original_text=text_to_use,
-            summary_text=summary_text,
-            parameters=parameters_to_use
-        )
-        
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to update summary"
-            )
-        
-        # Delete the temporary summary we created
-        await delete_summary_from_chat(current_user, session_id, summary_index_new)
-    
-    # Get updated summary
-    updated_summary = await get_summary_from_chat(current_user, session_id, summary_index)
-    
-    return SummaryResponse(
-        session_id=session_id,
-        summary_index=summary_index,
-        original_text=updated_summary.original_text,
-        summary_text=updated_summary.summary_text,
-        parameters=updated_summary.parameters,
-        created_at=updated_summary.created_at
-    )
+@router.post("/sessions/{session_id}/summaries/{summary_id}/versions/{revision}/restore", response_model=SummaryResponse)
+async def restore_summary_version(
+    session_id: PydanticObjectId,
+    summary_id: PydanticObjectId,
+    revision: int,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Make an earlier version of a summary current again, without calling the model"""
+    summary, original_text = await ChatService.restore_summary_version(current_user, session_id, summary_id, revision)
+    return FastJSONResponse(stored_summary_response(session_id, summary, original_text))
 
-@router.delete("/sessions/{session_id}/summaries/{summary_index}")
+@router.delete("/sessions/{session_id}/summaries/{summary_id}")
 async def delete_summary(
-    session_id: int,
-    summary_index: int,
-    current_user: User = Depends(get_current_user)
+    session_id: PydanticObjectId,
+    summary_id: PydanticObjectId,
+    current_user: Principal = Depends(get_current_principal)
 ):
-    success = await delete_summary_from_chat(current_user, session_id, summary_index)
+    success = await delete_summary_from_chat(current_user, session_id, summary_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -253,7 +442,7 @@ async def delete_summary(
 @router.post("/meta-summarize", response_model=MetaSummaryResponse)
 async def generate_meta_summary(
     request: MetaSummaryRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     session = await get_chat_session(current_user, request.session_id)
     if not session:
@@ -262,23 +451,20 @@ async def generate_meta_summary(
             detail="Chat session not found"
         )
     
-    meta_summary = await ChatService.generate_meta_summary(
-        current_user,
-        request.session_id,
-        request.parameters
-    )
+    ticket = await admission_control.admit(current_user, session.summary_count * META_TOKENS_PER_SUMMARY)
+    async with ticket:
+        meta_summary = await ChatService.generate_meta_summary(
+            current_user,
+            request.session_id,
+            request.parameters
+        )
     
-    return MetaSummaryResponse(
-        session_id=request.session_id,
-        title=session.title,
-        meta_summary=meta_summary,
-        created_at=datetime.utcnow()
-    )
+    return FastJSONResponse(meta_summary_response(session, meta_summary, datetime.utcnow()))
 
 @router.delete("/sessions/{session_id}")
 async def delete_session(
-    session_id: int,
-    current_user: User = Depends(get_current_user)
+    session_id: PydanticObjectId,
+    current_user: Principal = Depends(get_current_principal)
 ):
     success = await delete_chat_session(current_user, session_id)
     if not success:
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class RequestProfileItem(BaseModel):
+    profile_id: str
+    method: str
+    path: str
+    status_code: int
+    duration_ms: float
+    reason: str  # requested or sampled
+    user_email: Optional[str] = None
+    created_at: datetime
+
+class RequestProfileList(BaseModel):
+    items: List[RequestProfileItem]
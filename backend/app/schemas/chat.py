@@ -1,8 +1,11 @@
 from pydantic import BaseModel, Field, validator
+from beanie import PydanticObjectId
 from typing import List, Optional, Dict
 from datetime import datetime
+from app.config import settings
 
 class SummaryItemSchema(BaseModel):
+    id: str
     original_text: str
     summary_text: str
     parameters: Dict
@@ -12,16 +15,29 @@ class ChatSessionCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=100, example="Research on AI Ethics")
 
 class ChatSessionResponse(BaseModel):
-    id: int
+    id: str
     title: str
     summaries: List[SummaryItemSchema]
     created_at: datetime
     updated_at: datetime
     meta_summary: Optional[str] = None
 
+class ChatSessionListItem(BaseModel):
+    id: str
+    title: str
+    summary_count: int
+    created_at: datetime
+    updated_at: datetime
+    meta_summary_preview: Optional[str] = None
+
+class ChatSessionPage(BaseModel):
+    items: List[ChatSessionListItem]
+    # Pass as ?cursor= to fetch the next page; null on the last page
+    next_cursor: Optional[str] = None
+
 class SummaryRequest(BaseModel):
     text: str = Field(..., min_length=100, example="Long text to summarize...")
-    session_id: int = Field(..., ge=0, example=1)
+    session_id: PydanticObjectId = Field(..., example="65f1c0c2a1b2c3d4e5f60718")
     parameters: Dict = Field(..., example={"min_length": 50, "max_length": 200, "do_sample": False})
     
     @validator('text')
@@ -31,19 +47,114 @@ class SummaryRequest(BaseModel):
         return v.strip()
 
 class SummaryResponse(BaseModel):
-    session_id: int
-    summary_index: int
+    session_id: str
+    summary_id: str
     original_text: str
     summary_text: str
     parameters: Dict
     created_at: datetime
+    # Only set when the summary was generated by this request
+    chunk_count: Optional[int] = None
+    compression_ratio: Optional[float] = None
+    near_duplicate_of: Optional[str] = None
+    similarity: Optional[float] = None
+    timings: Optional[Dict[str, float]] = None
+
+class SummaryVersionItem(BaseModel):
+    revision: int
+    original_text: str
+    summary_text: str
+    parameters: Dict
+    replaced_at: datetime
+
+class SummaryVersionList(BaseModel):
+    session_id: str
+    summary_id: str
+    revision: int  # Revision of the current state
+    versions: List[SummaryVersionItem]  # Newest first
+
+class BatchSummaryItem(BaseModel):
+    # Length is checked per item so one short text does not reject the whole batch
+    text: str = Field(..., example="Long text to summarize...")
+    parameters: Optional[Dict] = Field(None, example={"min_length": 50, "max_length": 200, "do_sample": False})
+
+class BatchSummaryRequest(BaseModel):
+    items: List[BatchSummaryItem] = Field(..., min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+    # Used for items that do not set their own parameters
+    parameters: Dict = Field(
+        default_factory=lambda: {"min_length": 50, "max_length": 250, "do_sample": False},
+        example={"min_length": 50, "max_length": 200, "do_sample": False}
+    )
+
+class BatchSummaryItemResult(BaseModel):
+    index: int
+    status: str  # "succeeded" or "failed"
+    summary_id: Optional[str] = None
+    summary_text: Optional[str] = None
+    parameters: Dict
+    chunk_count: Optional[int] = None
+    compression_ratio: Optional[float] = None
+    near_duplicate_of: Optional[str] = None
+    similarity: Optional[float] = None
+    timings: Optional[Dict[str, float]] = None
+    error: Optional[str] = None
+
+class BatchSummaryResponse(BaseModel):
+    session_id: str
+    succeeded: int
+    failed: int
+    results: List[BatchSummaryItemResult]
+
+class NearDuplicateRequest(BaseModel):
+    text: str = Field(..., min_length=1, example="Long text to summarize...")
+    parameters: Dict = Field(..., example={"min_length": 50, "max_length": 200, "do_sample": False})
+
+class NearDuplicateMatch(BaseModel):
+    summary_id: str
+    session_id: str
+    summary_text: str
+    similarity: float
+
+class NearDuplicateResponse(BaseModel):
+    match: Optional[NearDuplicateMatch] = None
+
+class SearchResult(BaseModel):
+    kind: str  # "summary" or "session"
+    session_id: str
+    session_title: Optional[str] = None
+    summary_id: Optional[str] = None
+    score: float
+    field: str  # summary_text, original_text, title or meta_summary
+    snippet: str
+
+class SearchResponse(BaseModel):
+    query: str
+    mode: str
+    results: List[SearchResult]
+    next_offset: Optional[int] = None
+
+class SummaryJobRequest(SummaryRequest):
+    priority: int = Field(0, ge=-10, le=10, description="Higher priority jobs run first")
+
+class SummaryJobResponse(BaseModel):
+    job_id: str
+    session_id: str
+    status: str  # queued, running, succeeded or failed
+    priority: int
+    attempts: int
+    error: Optional[str] = None
+    summary_id: Optional[str] = None
+    summary_text: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 class MetaSummaryRequest(BaseModel):
-    session_id: int = Field(..., ge=0, example=1)
+    session_id: PydanticObjectId = Field(..., example="65f1c0c2a1b2c3d4e5f60718")
     parameters: Optional[Dict] = Field(None, example={"min_length": 100, "max_length": 300})
 
 class MetaSummaryResponse(BaseModel):
-    session_id: int
+    session_id: str
     title: str
     meta_summary: str
     created_at: datetime 
\ No newline at end of file
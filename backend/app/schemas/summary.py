@@ -6,6 +6,13 @@ class SummaryParameters(BaseModel):
     min_length: int = Field(50, ge=10, le=1000)
     max_length: int = Field(250, ge=50, le=1000)
     do_sample: bool = False
+    # Keep roughly this fraction of the input's tokens, chosen by extractive
+    # sentence scoring, before the model sees it. None sends the full text.
+    compression_ratio: Optional[float] = Field(None, gt=0, le=1)
+
+    def generation_parameters(self) -> Dict:
+        """The parameters the model itself receives"""
+        return {"min_length": self.min_length, "max_length": self.max_length, "do_sample": self.do_sample}
 
 class SummaryRequest(BaseModel):
     text: str = Field(..., min_length=100, example="Long text to summarize...")
@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Deque, Iterable, Optional, Tuple
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from app.config import settings
+from app.models import Principal, RateLimitBucket
+from app.services.chunking import estimate_tokens
+from app.services.metrics import metrics
+from app.services.tracing import span
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_DECISIONS = metrics.counter(
+    "admission_decisions_total", "Inference requests admitted or rejected, by outcome", ("outcome",)
+)
+ADMISSION_QUEUE_WAIT = metrics.histogram(
+    "admission_queue_wait_seconds", "Time admitted requests waited for an in-flight slot"
+)
+
+# Buckets kept per process by the memory backend; the least recently used are
+# dropped first, which only makes their users' next request cheaper
+MAX_MEMORY_BUCKETS = 100000
+# Meta-summaries read every summary of the session; tokens charged per summary
+META_TOKENS_PER_SUMMARY = 64
+
+class AdmissionRejected(HTTPException):
+    """429 with the seconds to wait before trying again as Retry-After"""
+
+    def __init__(self, reason: str, detail: str, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+        self.reason = reason
+
+class TokenBucketStore:
+    async def take(self, key: str, cost: float, capacity: float, rate: float) -> float:
+        """Take cost tokens from the bucket if it holds that many. Returns 0 when
+        taken, otherwise the seconds until the bucket will hold enough."""
+        raise NotImplementedError
+
+    async def refund(self, key: str, cost: float, capacity: float) -> None:
+        """Put back tokens taken for a request that was turned away before running"""
+        raise NotImplementedError
+
+class InMemoryTokenBuckets(TokenBucketStore):
+    """Per-process buckets; with several workers each user gets the limit per worker"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, cost: float, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def refund(self, key: str, cost: float, capacity: float) -> None:
+        if key in self._buckets:
+            tokens, updated_at = self._buckets[key]
+            self._buckets[key] = (min(capacity, tokens + cost), updated_at)
+
+class MongoTokenBuckets(TokenBucketStore):
+    """Buckets shared by all workers, refilled and taken from in one atomic update"""
+
+    async def take(self, key: str, cost: float, capacity: float, rate: float) -> float:
+        now = time.time()
+        # Idle buckets are removed once they would have refilled completely
+        expires_at = datetime.utcnow() + timedelta(seconds=capacity / rate + 60)
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [{"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]}, rate]}
+        ]}]}
+        bucket = await RateLimitBucket.get_motor_collection().find_one_and_update(
+            {"key": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now, "expires_at": expires_at}},
+                {"$set": {"taken": {"$gte": ["$tokens", cost]}}},
+                {"$set": {"tokens": {"$cond": ["$taken", {"$subtract": ["$tokens", cost]}, "$tokens"]}}}
+            ],
+            projection={"tokens": 1, "taken": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["taken"]:
+            return 0.0
+        return (cost - bucket["tokens"]) / rate
+
+    async def refund(self, key: str, cost: float, capacity: float) -> None:
+        await RateLimitBucket.get_motor_collection().update_one(
+            {"key": key},
+            [{"$set": {"tokens": {"$min": [capacity, {"$add": ["$tokens", cost]}]}}}]
+        )
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests, with a bounded FIFO queue of requests waiting for a slot"""
+
+    def __init__(self, limit: int, max_queued: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        # Moving average of how long a slot is held, for Retry-After estimates
+        self.hold_seconds = 1.0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def is_full(self) -> bool:
+        """Whether a new request would be turned away without waiting"""
+        return self.enabled and self.in_flight >= self.limit and len(self._waiters) >= self.max_queued
+
+    def retry_after(self) -> float:
+        return self.hold_seconds * (len(self._waiters) + 1) / self.limit
+
+    async def acquire(self) -> None:
+        if not self.enabled:
+            return
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queued:
+            raise AdmissionRejected("queue_full", "Summarization is at capacity; retry later", self.retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up on it
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise AdmissionRejected("queue_timeout", "Summarization is at capacity; retry later", self.retry_after())
+            raise
+
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        if held_seconds is not None:
+            self.hold_seconds = 0.9 * self.hold_seconds + 0.1 * held_seconds
+        # The slot passes straight to the longest waiting request
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+class AdmissionTicket:
+    """An admitted request's in-flight slot. Released on leaving the `async with`
+    block, or by release() for responses that outlive the handler."""
+
+    def __init__(self, limiter: ConcurrencyLimiter):
+        self._limiter = limiter
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter.release(time.monotonic() - self._acquired_at)
+
+    async def __aenter__(self) -> "AdmissionTicket":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+class AdmissionControl:
+    """Decides whether an inference request may run now.
+
+    Each request costs its estimated input tokens, taken from the user's token
+    bucket and given back if it never gets to run. It then needs one of a fixed number of in-flight slots, waiting in
+    a bounded queue when all are taken. Requests over the user's rate, or
+    finding the queue full, get 429 with Retry-After at once rather than piling
+    up behind the backend; so do those that wait out the queue timeout.
+    """
+
+    def __init__(
+        self,
+        buckets: Optional[TokenBucketStore],
+        limiter: ConcurrencyLimiter,
+        tokens_per_second: float,
+        burst_tokens: float,
+        min_request_tokens: int
+    ):
+        self.buckets = buckets
+        self.limiter = limiter
+        self.tokens_per_second = tokens_per_second
+        self.burst_tokens = burst_tokens
+        self.min_request_tokens = min_request_tokens
+
+    def cost(self, texts: Iterable[str]) -> int:
+        """Estimated input tokens of a request summarizing these texts"""
+        return sum(estimate_tokens(text) for text in texts)
+
+    async def check_rate(self, user: Principal, tokens: int) -> float:
+        """Take the request's tokens from the user's bucket, or raise 429.
+        Returns the tokens taken."""
+        if self.buckets is None:
+            return 0.0
+        # A request larger than the bucket is allowed once the bucket is full
+        cost = min(self.burst_tokens, max(self.min_request_tokens, tokens))
+        try:
+            wait = await self.buckets.take(str(user.id), cost, self.burst_tokens, self.tokens_per_second)
+        except Exception as e:
+            # Losing the counter store must not take summarization down with it
+            logger.warning(f"Admission rate check failed, admitting: {str(e)}")
+            return 0.0
+        if wait > 0:
+            ADMISSION_DECISIONS.inc("rate_limited")
+            raise AdmissionRejected("rate_limited", "Too many summarization requests; retry later", wait)
+        return cost
+
+    async def refund(self, user: Principal, cost: float) -> None:
+        """Give back tokens charged by check_rate for a request that never ran"""
+        if self.buckets is None or cost <= 0:
+            return
+        try:
+            await self.buckets.refund(str(user.id), cost, self.burst_tokens)
+        except Exception as e:
+            logger.warning(f"Admission refund failed: {str(e)}")
+
+    async def admit(self, user: Principal, tokens: int) -> AdmissionTicket:
+        """Check the user's rate and wait for an in-flight slot. Use the ticket as
+        `async with` around the work, or release() it when the work ends."""
+        if self.limiter.is_full():
+            # Rejected before charging the user's bucket
+            ADMISSION_DECISIONS.inc("queue_full")
+            raise AdmissionRejected("queue_full", "Summarization is at capacity; retry later", self.limiter.retry_after())
+        charged = await self.check_rate(user, tokens)
+
+        start = time.perf_counter()
+        try:
+            with span("admission"):
+                await self.limiter.acquire()
+        except BaseException as e:
+            # Turned away or cancelled while queued: the request never ran
+            await asyncio.shield(self.refund(user, charged))
+            if isinstance(e, AdmissionRejected):
+                ADMISSION_DECISIONS.inc(e.reason)
+            raise
+        ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - start)
+        ADMISSION_DECISIONS.inc("admitted")
+        return AdmissionTicket(self.limiter)
+
+def build_admission_control() -> AdmissionControl:
+    backend_name = settings.ADMISSION_RATE_BACKEND.lower()
+    if backend_name == "memory":
+        buckets = InMemoryTokenBuckets(max_entries=MAX_MEMORY_BUCKETS)
+    elif backend_name == "mongo":
+        buckets = MongoTokenBuckets()
+    elif backend_name == "none":
+        buckets = None
+    else:
+        raise ValueError(f"Unknown ADMISSION_RATE_BACKEND: {settings.ADMISSION_RATE_BACKEND}")
+    return AdmissionControl(
+        buckets,
+        ConcurrencyLimiter(
+            limit=settings.ADMISSION_MAX_IN_FLIGHT,
+            max_queued=settings.ADMISSION_MAX_QUEUED,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        ),
+        tokens_per_second=settings.ADMISSION_USER_TOKENS_PER_SECOND,
+        burst_tokens=settings.ADMISSION_USER_BURST_TOKENS,
+        min_request_tokens=settings.ADMISSION_MIN_REQUEST_TOKENS
+    )
+
+admission_control = build_admission_control()
+
+metrics.callback(
+    "admission_in_flight_requests", "Inference requests holding or waiting for a slot", "gauge",
+    lambda: {("running",): admission_control.limiter.in_flight, ("queued",): admission_control.limiter.queued},
+    ("state",)
+)
@@ -2,7 +2,7 @@ from fastapi import HTTPException, status
 import logging
 from app.models import User
 from app.utils import verify_password, get_password_hash, create_access_token
-from app.crud import get_user_by_email, create_user
+from app.crud import get_user_by_email, create_user, update_user
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +22,7 @@ class AuthService:
                 detail="Email already registered"
             )
         
-        hashed_password = get_password_hash(password)
+        hashed_password = await get_password_hash(password)
         new_user = await create_user(email=email, hashed_password=hashed_password)
         access_token = create_access_token(data={"sub": new_user.email})
         
@@ -31,11 +31,22 @@ class AuthService:
     @staticmethod
     async def authenticate_user(email: str, password: str) -> tuple[User, str]:
         user = await get_user_by_email(email)
-        if not user or not verify_password(password, user.hashed_password):
+        if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password"
             )
+
+        valid, new_hash = await verify_password(password, user.hashed_password)
+        if not valid:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect email or password"
+            )
+        if new_hash:
+            # BCRYPT_ROUNDS changed since this password was stored
+            await update_user(user, {"hashed_password": new_hash})
+            logger.info(f"Rehashed password for {user.email} with the current work factor")
         
         access_token = create_access_token(data={"sub": user.email})
         return user, access_token
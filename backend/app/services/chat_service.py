@@ -1,21 +1,89 @@
 from fastapi import HTTPException, status
 import logging
-from app.models import User, ChatSession, SummaryItem
+from app.models import Principal, SummaryItem, SummaryVersion
 from app.schemas import SummaryParameters
-from app.services.summary_service import SummaryService
+from app.services.summary_service import SummaryService, DocumentSummary, ProgressCallback
+from app.services.meta_summary import MetaSummaryService, combine_summaries
+from app.services.near_duplicates import NearDuplicateIndex, NearDuplicateMatch, TextFingerprint
+from app.services.summary_cache import normalize_text
+from app.services.text_store import text_hash
+from app.services.tracing import span
+from app.services.admission import AdmissionRejected, AdmissionTicket
+from app.config import settings
 from app.crud import (
     add_summary_to_chat,
+    add_summaries_to_chat,
     get_chat_session,
+    get_session_summaries,
+    get_summary_from_chat,
+    get_original_texts,
+    update_summary_in_chat,
     update_chat_meta_summary,
     create_chat_session
 )
-from typing import Dict, Optional
+from beanie import PydanticObjectId
+from pydantic import BaseModel, ValidationError
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
 
 logger = logging.getLogger(__name__)
 
+class BatchItemOutcome(BaseModel):
+    summary_id: Optional[PydanticObjectId] = None
+    result: Optional[DocumentSummary] = None
+    error: Optional[str] = None
+
+def _same_parameters(stored: Dict, requested: SummaryParameters) -> bool:
+    """Whether stored parameters mean the same as requested ones once defaults are filled in"""
+    try:
+        return SummaryParameters(**stored) == requested
+    except ValidationError:
+        return False
+
+def _bounded_history(summary: SummaryItem, exclude_revision: Optional[int] = None) -> List[SummaryVersion]:
+    """The summary's history with its current state appended, trimmed to SUMMARY_MAX_VERSIONS"""
+    if settings.SUMMARY_MAX_VERSIONS <= 0:
+        return []
+    versions = [version for version in summary.versions if version.revision != exclude_revision]
+    versions.append(SummaryVersion(
+        revision=summary.revision,
+        text_hash=summary.text_hash,
+        text_length=summary.text_length,
+        original_text=summary.original_text,
+        summary_text=summary.summary_text,
+        parameters=summary.parameters
+    ))
+    return versions[-settings.SUMMARY_MAX_VERSIONS:]
+
+def _reused_summary(match: NearDuplicateMatch) -> DocumentSummary:
+    return DocumentSummary(
+        summary_text=match.summary.summary_text,
+        chunk_count=0,
+        near_duplicate_of=str(match.summary.id),
+        similarity=match.similarity
+    )
+
 class ChatService:
     @staticmethod
-    async def create_session(user: User, title: str) -> int:
+    async def find_near_duplicate(
+        user: Principal,
+        text: str,
+        parameters: Dict
+    ) -> Optional[NearDuplicateMatch]:
+        """Earlier summary of a nearly identical text with the same parameters, if any"""
+        try:
+            params_obj = SummaryParameters(**parameters)
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid parameters: {str(e)}"
+            )
+        if not NearDuplicateIndex.enabled_for(params_obj):
+            return None
+        return await NearDuplicateIndex.find(user, TextFingerprint(text), params_obj)
+
+    @staticmethod
+    async def create_session(user: Principal, title: str) -> PydanticObjectId:
         try:
             session_id = await create_chat_session(user, title)
             return session_id
@@ -28,11 +96,12 @@ class ChatService:
     
     @staticmethod
     async def add_summary(
-        user: User, 
-        session_id: int, 
+        user: Principal, 
+        session_id: PydanticObjectId, 
         text: str, 
-        parameters: Dict
-    ) -> tuple[int, str]:
+        parameters: Dict,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> tuple[PydanticObjectId, DocumentSummary]:
         """Add a summary to a chat session"""
         session = await get_chat_session(user, session_id)
         if not session:
@@ -51,26 +120,50 @@ class ChatService:
             # Create summary parameters object
             params_obj = SummaryParameters(**parameters)
             
-            # Call HuggingFace API to generate summary
-            summary_text = await SummaryService._call_huggingface_api(text, params_obj)
+            # A nearly identical text summarized earlier with the same parameters
+            # is answered with that summary instead of calling the model
+            match = None
+            with span("near_duplicate_lookup"):
+                fingerprint = TextFingerprint(text)
+                if NearDuplicateIndex.enabled_for(params_obj):
+                    match = await NearDuplicateIndex.find(user, fingerprint, params_obj)
+            
+            if match is not None:
+                result = _reused_summary(match)
+                if on_progress is not None:
+                    await on_progress("near_duplicate", {
+                        "summary_id": result.near_duplicate_of,
+                        "similarity": result.similarity
+                    })
+            else:
+                # Generate summary; long texts go through the chunked map-reduce pipeline
+                with span("summarize"):
+                    result = await SummaryService.summarize_document(text, params_obj, on_progress)
+            if on_progress is not None:
+                await on_progress("summarized", {"summary_text": result.summary_text})
             
             # Add summary to the chat session
-            summary_index = await add_summary_to_chat(
-                user=user,
-                session_id=session_id,
-                original_text=text,
-                summary_text=summary_text,
-                parameters=parameters
-            )
+            with span("store_summary"):
+                summary_id = await add_summary_to_chat(
+                    user=user,
+                    session_id=session_id,
+                    original_text=text,
+                    summary_text=result.summary_text,
+                    parameters=parameters,
+                    lsh_bands=fingerprint.bands
+                )
             
-            if summary_index is None:
+            if summary_id is None:
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail="Failed to add summary to chat"
                 )
                 
-            return summary_index, summary_text
+            return summary_id, result
             
+        except HTTPException:
+            # Inference and input errors keep their status (and Retry-After)
+            raise
         except Exception as e:
             logger.error(f"Error adding summary: {str(e)}")
             raise HTTPException(
@@ -78,10 +171,231 @@ class ChatService:
                 detail=f"Failed to generate summary: {str(e)}"
             )
     
+    @staticmethod
+    async def _get_summary(
+        user: Principal,
+        session_id: PydanticObjectId,
+        summary_id: PydanticObjectId
+    ) -> SummaryItem:
+        summary = await get_summary_from_chat(user, session_id, summary_id)
+        if not summary:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Summary not found"
+            )
+        return summary
+
+    @staticmethod
+    async def _replace_summary(
+        user: Principal,
+        summary: SummaryItem,
+        original_text: str,
+        summary_text: str,
+        parameters: Dict,
+        versions: List[SummaryVersion]
+    ) -> SummaryItem:
+        """Write the new state and history in one update, unless the summary changed
+        since it was read. Returns the summary as stored."""
+        # Summaries from before the text store always move their text into it
+        new_hash = text_hash(original_text)
+        text_changed = new_hash != summary.text_hash
+        with span("store_summary"):
+            success = await update_summary_in_chat(
+                user,
+                summary.session_id,
+                summary.id,
+                original_text=original_text if text_changed else None,
+                summary_text=summary_text,
+                parameters=parameters,
+                expected_revision=summary.revision,
+                versions=versions
+            )
+        if not success:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Summary was modified by another request, please retry"
+            )
+        return summary.copy(update={
+            "text_hash": new_hash,
+            "text_length": len(original_text),
+            "original_text": None,
+            "summary_text": summary_text,
+            "parameters": parameters,
+            "revision": summary.revision + 1,
+            "versions": versions
+        })
+
+    @staticmethod
+    async def regenerate_summary(
+        user: Principal,
+        session_id: PydanticObjectId,
+        summary_id: PydanticObjectId,
+        text: Optional[str] = None,
+        parameters: Optional[Dict] = None,
+        admit: Optional[Callable[[str], Awaitable[AdmissionTicket]]] = None
+    ) -> tuple[SummaryItem, str, Optional[DocumentSummary]]:
+        """Re-summarize a stored summary with new text and/or parameters, keeping its
+        previous state in the version history. Returns the summary as stored, its
+        original text and the generated summary. Nothing is generated or written
+        when the normalized text and the parameters match what is stored; the
+        generated summary is None in that case. admit, if given, is awaited with the
+        text to summarize once it is clear the model will run, and its ticket is
+        held while it does."""
+        summary = await ChatService._get_summary(user, session_id, summary_id)
+        if text is not None and summary.text_hash == text_hash(text):
+            current_text = text
+        else:
+            current_text = (await get_original_texts([summary]))[0]
+        text_to_use = text if text is not None else current_text
+        parameters_to_use = parameters if parameters is not None else summary.parameters
+
+        if len(text_to_use.strip()) < 100:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Text must be at least 100 characters long"
+            )
+        try:
+            params_obj = SummaryParameters(**parameters_to_use)
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid summary parameters: {str(e)}"
+            )
+
+        if (normalize_text(text_to_use) == normalize_text(current_text)
+                and _same_parameters(summary.parameters, params_obj)):
+            return summary, current_text, None
+
+        ticket = await admit(text_to_use) if admit is not None else None
+        try:
+            with span("summarize"):
+                result = await SummaryService.summarize_document(text_to_use, params_obj)
+        except HTTPException:
+            # Inference and input errors keep their status (and Retry-After)
+            raise
+        except Exception as e:
+            logger.error(f"Error regenerating summary: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to generate summary: {str(e)}"
+            )
+        finally:
+            if ticket is not None:
+                ticket.release()
+
+        updated = await ChatService._replace_summary(
+            user,
+            summary,
+            original_text=text_to_use,
+            summary_text=result.summary_text,
+            parameters=parameters_to_use,
+            versions=_bounded_history(summary)
+        )
+        return updated, text_to_use, result
+
+    @staticmethod
+    async def restore_summary_version(
+        user: Principal,
+        session_id: PydanticObjectId,
+        summary_id: PydanticObjectId,
+        revision: int
+    ) -> tuple[SummaryItem, str]:
+        """Make an earlier version current again without calling the model. The
+        state it replaces takes its place in the version history. Returns the
+        summary as stored and its original text."""
+        summary = await ChatService._get_summary(user, session_id, summary_id)
+        version = next((v for v in summary.versions if v.revision == revision), None)
+        if version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Summary version not found"
+            )
+
+        original_text = (await get_original_texts([version]))[0]
+        updated = await ChatService._replace_summary(
+            user,
+            summary,
+            original_text=original_text,
+            summary_text=version.summary_text,
+            parameters=version.parameters,
+            versions=_bounded_history(summary, exclude_revision=revision)
+        )
+        return updated, original_text
+
+    @staticmethod
+    async def add_summaries_batch(
+        user: Principal,
+        session_id: PydanticObjectId,
+        items: List[tuple[str, Dict]],
+        admit: Optional[Callable[[str], Awaitable[AdmissionTicket]]] = None
+    ) -> List[BatchItemOutcome]:
+        """Summarize (text, parameters) pairs concurrently and store the successful
+        ones in a single bulk write. Failures are reported per item instead of
+        aborting the batch. admit, if given, is awaited with each text the model
+        will run on, and its ticket is held while it does; when every item is
+        turned away by it, the first rejection is raised."""
+        session = await get_chat_session(user, session_id)
+        if not session:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat session not found"
+            )
+
+        semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+        rejections: List[AdmissionRejected] = []
+
+        async def summarize_item(text: str, parameters: Dict) -> BatchItemOutcome:
+            if len(text.strip()) < 100:
+                return BatchItemOutcome(error="Text must be at least 100 characters long")
+            try:
+                params_obj = SummaryParameters(**parameters)
+            except ValidationError as e:
+                return BatchItemOutcome(error=f"Invalid parameters: {str(e)}")
+            try:
+                if NearDuplicateIndex.enabled_for(params_obj):
+                    match = await NearDuplicateIndex.find(user, TextFingerprint(text), params_obj)
+                    if match is not None:
+                        return BatchItemOutcome(result=_reused_summary(match))
+                async with semaphore:
+                    ticket = await admit(text) if admit is not None else None
+                    try:
+                        result = await SummaryService.summarize_document(text, params_obj)
+                    finally:
+                        if ticket is not None:
+                            ticket.release()
+                return BatchItemOutcome(result=result)
+            except AdmissionRejected as e:
+                rejections.append(e)
+                return BatchItemOutcome(error=e.detail)
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"Error summarizing batch item: {detail}")
+                return BatchItemOutcome(error=f"Failed to generate summary: {detail}")
+
+        outcomes = await asyncio.gather(*(summarize_item(text, parameters) for text, parameters in items))
+        if rejections and len(rejections) == len(items):
+            raise rejections[0]
+
+        succeeded = [i for i, outcome in enumerate(outcomes) if outcome.result is not None]
+        summary_ids = await add_summaries_to_chat(
+            user,
+            session_id,
+            [(items[i][0], outcomes[i].result.summary_text, items[i][1]) for i in succeeded]
+        )
+        if summary_ids is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat session not found"
+            )
+
+        for i, summary_id in zip(succeeded, summary_ids):
+            outcomes[i].summary_id = summary_id
+        return outcomes
+
     @staticmethod
     async def generate_meta_summary(
-        user: User, 
-        session_id: int, 
+        user: Principal, 
+        session_id: PydanticObjectId, 
         parameters: Optional[Dict] = None
     ) -> str:
         """Generate a meta-summary of all summaries in the chat session"""
@@ -92,24 +406,12 @@ class ChatService:
                 detail="Chat session not found"
             )
             
-        if not session.summaries:
+        if session.summary_count == 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Chat session has no summaries to generate a meta-summary"
             )
             
-        # Combine all summaries into a single text
-        combined_text = "\n\n".join([
-            f"Summary {i+1}: {summary.summary_text}" 
-            for i, summary in enumerate(session.summaries)
-        ])
-        
-        if len(combined_text) < 100:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Not enough content to generate a meta-summary (minimum 100 characters)"
-            )
-            
         try:
             # Use default parameters if none provided
             default_params = {"min_length": 100, "max_length": 300, "do_sample": False}
@@ -117,18 +419,39 @@ class ChatService:
             
             params_obj = SummaryParameters(**summary_params)
             
+            if session.summary_count <= settings.META_GROUP_SIZE:
+                # Small sessions fit in a single reduction
+                summaries = await get_session_summaries(user, session_id)
+                texts = [summary.summary_text for summary in summaries]
+            else:
+                # Reuse the stored group reductions, recomputing only what changed
+                with span("meta_group_reduce"):
+                    texts = await MetaSummaryService.reduce_session(user, session_id)
+            
+            combined_text = combine_summaries(texts)
+            if len(combined_text) < 100:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Not enough content to generate a meta-summary (minimum 100 characters)"
+                )
+            
             # Generate meta-summary
-            meta_summary = await SummaryService._call_huggingface_api(combined_text, params_obj)
+            with span("meta_summarize"):
+                meta_summary = (await SummaryService.summarize_document(combined_text, params_obj)).summary_text
             
-            # Update the chat session with the meta-summary
-            success = await update_chat_meta_summary(user, session_id, meta_summary)
+            # Only store it if the session has not changed since we read its summaries
+            success = await update_chat_meta_summary(
+                user, session_id, meta_summary, expected_revision=session.revision
+            )
             if not success:
                 raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to update chat with meta-summary"
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Chat session changed while generating the meta-summary, please retry"
                 )
             
             return meta_summary
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Meta-summary generation error: {str(e)}")
             raise HTTPException(
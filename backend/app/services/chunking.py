@@ -0,0 +1,97 @@
+import math
+import re
+from typing import List
+
+# Rough BPE ratio for English prose; good enough to stay under the model limit
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its of on or "
+    "she that the their they this to was were which will with you".split()
+)
+
+def estimate_tokens(text: str) -> int:
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+def content_words(sentence: str) -> List[str]:
+    """Lowercased words of a sentence, without stopwords"""
+    return [word for word in _WORD.findall(sentence.lower()) if word not in STOPWORDS]
+
+def split_sentences(text: str) -> List[List[str]]:
+    """Split text into paragraphs, each a list of sentences"""
+    paragraphs = []
+    for paragraph in _PARAGRAPH_SPLIT.split(text):
+        sentences = [s.strip() for s in _SENTENCE_SPLIT.split(paragraph.strip()) if s.strip()]
+        if sentences:
+            paragraphs.append(sentences)
+    return paragraphs
+
+def _split_oversized(sentence: str, max_tokens: int) -> List[str]:
+    # A single "sentence" above the budget (tables, lists, missing punctuation) is cut
+    # on words; a single word above it (URLs, base64, unspaced scripts) on characters
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    pieces, current = [], []
+    for word in sentence.split():
+        if estimate_tokens(word) > max_tokens:
+            if current:
+                pieces.append(" ".join(current))
+                current = []
+            pieces.extend(word[i:i + max_chars] for i in range(0, len(word), max_chars))
+            continue
+        if current and estimate_tokens(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+def chunk_text(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """Pack sentences into windows of at most max_tokens, repeating up to
+    overlap_tokens of trailing sentences at the start of the next window.
+    Paragraph breaks inside a window are preserved."""
+    # (sentence, starts_paragraph) pairs
+    units = []
+    for paragraph in split_sentences(text):
+        for i, sentence in enumerate(paragraph):
+            for j, piece in enumerate(_split_oversized(sentence, max_tokens)):
+                units.append((piece, i == 0 and j == 0))
+
+    chunks: List[str] = []
+    window: List[tuple] = []
+    window_tokens = 0
+
+    def render(items) -> str:
+        out = ""
+        for sentence, starts_paragraph in items:
+            if out:
+                out += "\n\n" if starts_paragraph else " "
+            out += sentence
+        return out
+
+    for unit in units:
+        # Count the joining whitespace too, so rendered windows stay within budget
+        unit_tokens = estimate_tokens(unit[0] + "  ")
+        if window and window_tokens + unit_tokens > max_tokens:
+            chunks.append(render(window))
+
+            # Carry trailing sentences over as context for the next window
+            carried, carried_tokens = [], 0
+            for prev in reversed(window):
+                prev_tokens = estimate_tokens(prev[0] + "  ")
+                if carried_tokens + prev_tokens > overlap_tokens or carried_tokens + prev_tokens + unit_tokens > max_tokens:
+                    break
+                carried.insert(0, prev)
+                carried_tokens += prev_tokens
+            window, window_tokens = carried, carried_tokens
+
+        window.append(unit)
+        window_tokens += unit_tokens
+
+    if window:
+        chunks.append(render(window))
+    return chunks
@@ -0,0 +1,48 @@
+import httpx
+import logging
+from typing import Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared client for the inference endpoint, created on startup and closed on shutdown
+_client: Optional[httpx.AsyncClient] = None
+
+def _build_client() -> httpx.AsyncClient:
+    # All inference traffic goes to a single host, so the pool limits act as per-host limits
+    limits = httpx.Limits(
+        max_connections=settings.HF_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HF_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HF_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(
+        settings.HF_REQUEST_TIMEOUT,
+        connect=settings.HF_CONNECT_TIMEOUT,
+        pool=settings.HF_POOL_TIMEOUT
+    )
+    return httpx.AsyncClient(
+        headers={"Authorization": f"Bearer {settings.HF_TOKEN}"},
+        limits=limits,
+        timeout=timeout
+    )
+
+async def init_inference_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info("Inference HTTP client initialized")
+    return _client
+
+async def close_inference_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Inference HTTP client closed")
+
+def get_inference_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it lazily if startup has not run (e.g. scripts)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
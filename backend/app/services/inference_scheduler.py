@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from app.config import settings
+from app.schemas import SummaryParameters
+from app.services.chunking import estimate_tokens
+from app.services.metrics import Histogram, SIZE_BUCKETS, metrics
+from app.services.resilience import inference_resilience
+from app.services.summarization_backends import SummarizationBackend, summarization_backend
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets; anything larger lands in "+Inf"
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+QUEUE_DELAY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+INFERENCE_SECONDS = metrics.histogram(
+    "inference_call_duration_seconds", "Backend summarization calls (one per batch and attempt)", ("backend",)
+)
+INFERENCE_INPUT_CHARS = metrics.histogram(
+    "inference_input_chars", "Characters per text sent to the backend", ("backend",), SIZE_BUCKETS
+)
+INFERENCE_INPUT_TOKENS = metrics.histogram(
+    "inference_input_tokens", "Estimated tokens per text sent to the backend", ("backend",),
+    (64, 128, 256, 512, 768, 1024, 2048, 4096)
+)
+INFERENCE_ERRORS = metrics.counter(
+    "inference_errors_total", "Failed backend call attempts by error kind", ("backend", "error")
+)
+INFERENCE_BATCH_SIZE = metrics.histogram(
+    "inference_batch_size", "Texts per batched backend call", buckets=BATCH_SIZE_BUCKETS
+)
+INFERENCE_QUEUE_DELAY_MS = metrics.histogram(
+    "inference_queue_delay_ms", "Time a text waited to join a batch, in milliseconds", buckets=QUEUE_DELAY_BUCKETS_MS
+)
+
+async def call_backend(
+    backend: SummarizationBackend,
+    texts: List[str],
+    parameters: SummaryParameters,
+    batched: bool
+) -> List[str]:
+    """Summarize texts with one backend call, retried and guarded by the circuit
+    breaker, recording the latency and errors of each attempt and the input size"""
+    name = type(backend).__name__
+    for text in texts:
+        INFERENCE_INPUT_CHARS.observe(len(text), name)
+        INFERENCE_INPUT_TOKENS.observe(estimate_tokens(text), name)
+
+    async def attempt() -> List[str]:
+        start = time.perf_counter()
+        try:
+            if batched:
+                return await backend.summarize_batch(texts, parameters)
+            return [await backend.summarize(texts[0], parameters)]
+        except Exception as e:
+            INFERENCE_ERRORS.inc(name, getattr(e, "kind", None) or getattr(e, "status_code", None) or type(e).__name__)
+            raise
+        finally:
+            INFERENCE_SECONDS.observe(time.perf_counter() - start, name)
+
+    return await inference_resilience.call(name, attempt)
+
+class _Pending:
+    __slots__ = ("text", "future", "enqueued_at")
+
+    def __init__(self, text: str, future: asyncio.Future):
+        self.text = text
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+class BatchScheduler:
+    """Coalesces concurrent summarize calls with identical parameters into batched
+    backend calls.
+
+    A batch is dispatched when it reaches max_batch_size or when its oldest request
+    has waited max_wait_ms. With max_in_flight set, a dispatched batch keeps taking
+    requests until a slot is free, so batches grow while the backend is saturated.
+    Each parameter set has at most one batch waiting for a slot at a time.
+    """
+
+    def __init__(
+        self,
+        backend: SummarizationBackend,
+        max_batch_size: int,
+        max_wait_ms: float,
+        max_in_flight: int = 0
+    ):
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_in_flight = max_in_flight
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending: Dict[Tuple, List[_Pending]] = {}
+        self._timers: Dict[Tuple, asyncio.TimerHandle] = {}
+        # Keys with a dispatched batch still waiting for a slot
+        self._dispatching: Set[Tuple] = set()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_delays_ms = Histogram(QUEUE_DELAY_BUCKETS_MS)
+        self.failed_batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend.supports_batching and self.max_batch_size > 1
+
+    async def submit(self, text: str, parameters: SummaryParameters) -> str:
+        if not self.enabled:
+            return (await call_backend(self.backend, [text], parameters, batched=False))[0]
+
+        key = (parameters.min_length, parameters.max_length, parameters.do_sample)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(key, []).append(_Pending(text, future))
+        self._schedule(key, parameters)
+        return await future
+
+    def _schedule(self, key: Tuple, parameters: SummaryParameters) -> None:
+        """Dispatch the key's pending requests now if they fill a batch or are due,
+        otherwise once the oldest is due. A batch waiting for a slot takes them
+        itself when it gets one, and schedules what it leaves behind."""
+        pending = self._pending.get(key)
+        if not pending or key in self._dispatching:
+            return
+        delay = self.max_wait - (time.perf_counter() - pending[0].enqueued_at)
+        if len(pending) >= self.max_batch_size or delay <= 0:
+            self._dispatch(key, parameters)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.get_running_loop().call_later(delay, self._dispatch, key, parameters)
+
+    def _take(self, key: Tuple, count: int) -> List[_Pending]:
+        pending = self._pending.get(key, [])
+        taken, rest = pending[:count], pending[count:]
+        if rest:
+            self._pending[key] = rest
+        else:
+            self._pending.pop(key, None)
+        return taken
+
+    def _dispatch(self, key: Tuple, parameters: SummaryParameters) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._take(key, self.max_batch_size)
+        if not batch:
+            return
+        self._dispatching.add(key)
+        asyncio.get_running_loop().create_task(self._run_batch(key, parameters, batch))
+
+    async def _run_batch(self, key: Tuple, parameters: SummaryParameters, batch: List[_Pending]) -> None:
+        try:
+            if self.max_in_flight > 0:
+                if self._slots is None:
+                    self._slots = asyncio.Semaphore(self.max_in_flight)
+                await self._slots.acquire()
+        finally:
+            self._dispatching.discard(key)
+        try:
+            # Requests that arrived while the batch waited join it, up to the limit
+            batch += self._take(key, self.max_batch_size - len(batch))
+            self._schedule(key, parameters)
+            # Callers that gave up (client disconnect) are not sent to the backend
+            batch = [item for item in batch if not item.future.done()]
+            if not batch:
+                return
+
+            now = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for item in batch:
+                self.queue_delays_ms.observe((now - item.enqueued_at) * 1000)
+
+            try:
+                summaries = await call_backend(self.backend, [item.text for item in batch], parameters, batched=True)
+            except Exception as e:
+                self.failed_batches += 1
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                return
+            for item, summary_text in zip(batch, summaries):
+                if not item.future.done():
+                    item.future.set_result(summary_text)
+        finally:
+            if self._slots is not None and self.max_in_flight > 0:
+                self._slots.release()
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": sum(len(pending) for pending in self._pending.values()),
+            "failed_batches": self.failed_batches,
+            "batch_size": self.batch_sizes.stats(),
+            "queue_delay_ms": self.queue_delays_ms.stats()
+        }
+
+def build_inference_scheduler() -> BatchScheduler:
+    return BatchScheduler(
+        summarization_backend,
+        max_batch_size=settings.INFERENCE_BATCH_MAX_ITEMS,
+        max_wait_ms=settings.INFERENCE_BATCH_MAX_WAIT_MS,
+        max_in_flight=summarization_backend.max_in_flight_batches
+    )
+
+inference_scheduler = build_inference_scheduler()
+INFERENCE_BATCH_SIZE.attach(inference_scheduler.batch_sizes)
+INFERENCE_QUEUE_DELAY_MS.attach(inference_scheduler.queue_delays_ms)
@@ -0,0 +1,425 @@
+from fastapi import HTTPException
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+from app.config import settings
+from app.models import SummaryJob, User, Principal
+from app.services.chat_service import ChatService
+from app.services.resilience import InferenceError
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.JOB_RETRY_BACKOFF_SECONDS * (2 ** max(0, attempts - 1)))
+
+def _expires_at(finished_at: datetime) -> datetime:
+    return finished_at + timedelta(hours=settings.JOB_RETENTION_HOURS)
+
+def _lease_expires_at() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+def _cancelled(job: SummaryJob) -> SummaryJob:
+    # The job was removed (with its user) while a worker had it
+    return job.model_copy(update={"status": "failed", "error": "Job was cancelled", "lease_expires_at": None})
+
+class JobStore:
+    async def enqueue(self, job: SummaryJob) -> SummaryJob:
+        raise NotImplementedError
+
+    async def claim(self, worker_id: str) -> Optional[SummaryJob]:
+        """Atomically take the next runnable job: highest priority, then oldest,
+        skipping users that already have JOB_MAX_RUNNING_PER_USER jobs running."""
+        raise NotImplementedError
+
+    async def renew(self, job: SummaryJob) -> bool:
+        """Extend the lease of a job its worker still holds. False once the lease
+        was lost: the job was requeued, taken by another worker, or removed."""
+        raise NotImplementedError
+
+    async def complete(self, job: SummaryJob, summary_id: PydanticObjectId, summary_text: str) -> SummaryJob:
+        """Record the job's result, if its worker still holds the lease. Otherwise
+        the job is left to its new owner and returned as currently stored."""
+        raise NotImplementedError
+
+    async def fail(self, job: SummaryJob, error: str, retryable: bool) -> SummaryJob:
+        """Requeue or fail the job, if its worker still holds the lease (see complete)"""
+        raise NotImplementedError
+
+    async def get(self, job_id: PydanticObjectId, user_id: PydanticObjectId) -> Optional[SummaryJob]:
+        raise NotImplementedError
+
+    async def requeue_expired(self) -> int:
+        """Return running jobs with an expired lease (crashed worker) to the queue"""
+        raise NotImplementedError
+
+class InMemoryJobStore(JobStore):
+    """Single-process queue for tests and local development"""
+
+    def __init__(self):
+        self._jobs: Dict[PydanticObjectId, SummaryJob] = {}
+        self._lock = asyncio.Lock()
+
+    async def enqueue(self, job: SummaryJob) -> SummaryJob:
+        now = datetime.utcnow()
+        for expired in [j.id for j in self._jobs.values() if j.expires_at and j.expires_at <= now]:
+            del self._jobs[expired]
+        job.id = PydanticObjectId()
+        self._jobs[job.id] = job
+        return job
+
+    async def claim(self, worker_id: str) -> Optional[SummaryJob]:
+        async with self._lock:
+            now = datetime.utcnow()
+            running: Dict[PydanticObjectId, int] = {}
+            for job in self._jobs.values():
+                if job.status == "running":
+                    running[job.user_id] = running.get(job.user_id, 0) + 1
+
+            candidates = [
+                job for job in self._jobs.values()
+                if job.status == "queued"
+                and job.available_at <= now
+                and running.get(job.user_id, 0) < settings.JOB_MAX_RUNNING_PER_USER
+            ]
+            if not candidates:
+                return None
+
+            job = min(candidates, key=lambda j: (-j.priority, j.created_at))
+            job.status = "running"
+            job.worker_id = worker_id
+            job.attempts += 1
+            job.started_at = now
+            job.lease_expires_at = _lease_expires_at()
+            return job.model_copy()
+
+    def _held(self, job: SummaryJob) -> Optional[SummaryJob]:
+        stored = self._jobs.get(job.id)
+        if stored is not None and stored.status == "running" and stored.worker_id == job.worker_id:
+            return stored
+        return None
+
+    def _current(self, job: SummaryJob) -> SummaryJob:
+        stored = self._jobs.get(job.id)
+        return stored.model_copy() if stored is not None else _cancelled(job)
+
+    async def renew(self, job: SummaryJob) -> bool:
+        stored = self._held(job)
+        if stored is None:
+            return False
+        stored.lease_expires_at = _lease_expires_at()
+        return True
+
+    async def complete(self, job: SummaryJob, summary_id: PydanticObjectId, summary_text: str) -> SummaryJob:
+        stored = self._held(job)
+        if stored is None:
+            return self._current(job)
+        stored.status = "succeeded"
+        stored.summary_id = summary_id
+        stored.summary_text = summary_text
+        stored.error = None
+        stored.finished_at = datetime.utcnow()
+        stored.expires_at = _expires_at(stored.finished_at)
+        stored.lease_expires_at = None
+        return stored.model_copy()
+
+    async def fail(self, job: SummaryJob, error: str, retryable: bool) -> SummaryJob:
+        stored = self._held(job)
+        if stored is None:
+            return self._current(job)
+        stored.error = error
+        stored.lease_expires_at = None
+        if retryable and stored.attempts < stored.max_attempts:
+            stored.status = "queued"
+            stored.worker_id = None
+            stored.available_at = datetime.utcnow() + _retry_delay(stored.attempts)
+        else:
+            stored.status = "failed"
+            stored.finished_at = datetime.utcnow()
+            stored.expires_at = _expires_at(stored.finished_at)
+        return stored.model_copy()
+
+    async def get(self, job_id: PydanticObjectId, user_id: PydanticObjectId) -> Optional[SummaryJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job.model_copy()
+
+    async def requeue_expired(self) -> int:
+        now = datetime.utcnow()
+        count = 0
+        for job in self._jobs.values():
+            if job.status == "running" and job.lease_expires_at and job.lease_expires_at < now:
+                job.status = "queued"
+                job.worker_id = None
+                job.lease_expires_at = None
+                count += 1
+        return count
+
+class MongoJobStore(JobStore):
+    """Queue shared by all API replicas and worker processes"""
+
+    async def enqueue(self, job: SummaryJob) -> SummaryJob:
+        await job.insert()
+        return job
+
+    async def _saturated_users(self) -> List[PydanticObjectId]:
+        pipeline = [
+            {"$match": {"status": "running"}},
+            {"$group": {"_id": "$user_id", "running": {"$sum": 1}}},
+            {"$match": {"running": {"$gte": settings.JOB_MAX_RUNNING_PER_USER}}}
+        ]
+        rows = await SummaryJob.get_motor_collection().aggregate(pipeline).to_list(None)
+        return [row["_id"] for row in rows]
+
+    async def claim(self, worker_id: str) -> Optional[SummaryJob]:
+        # The per-user cap is best effort: two workers may both pass the check at once
+        now = datetime.utcnow()
+        document = await SummaryJob.get_motor_collection().find_one_and_update(
+            {
+                "status": "queued",
+                "available_at": {"$lte": now},
+                "user_id": {"$nin": await self._saturated_users()}
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "worker_id": worker_id,
+                    "started_at": now,
+                    "lease_expires_at": _lease_expires_at()
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("priority", -1), ("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        return SummaryJob.model_validate(document) if document else None
+
+    @staticmethod
+    def _held(job: SummaryJob) -> Dict:
+        return {"_id": job.id, "worker_id": job.worker_id, "status": "running"}
+
+    async def renew(self, job: SummaryJob) -> bool:
+        result = await SummaryJob.get_motor_collection().update_one(
+            self._held(job), {"$set": {"lease_expires_at": _lease_expires_at()}}
+        )
+        return result.matched_count == 1
+
+    async def _update(self, job: SummaryJob, update: Dict) -> SummaryJob:
+        jobs = SummaryJob.get_motor_collection()
+        document = await jobs.find_one_and_update(self._held(job), update, return_document=ReturnDocument.AFTER)
+        if document is None:
+            # The lease was lost; whoever holds the job now decides its outcome
+            document = await jobs.find_one({"_id": job.id})
+        return SummaryJob.model_validate(document) if document else _cancelled(job)
+
+    async def complete(self, job: SummaryJob, summary_id: PydanticObjectId, summary_text: str) -> SummaryJob:
+        now = datetime.utcnow()
+        return await self._update(job, {"$set": {
+            "status": "succeeded",
+            "summary_id": summary_id,
+            "summary_text": summary_text,
+            "error": None,
+            "finished_at": now,
+            "expires_at": _expires_at(now),
+            "lease_expires_at": None
+        }})
+
+    async def fail(self, job: SummaryJob, error: str, retryable: bool) -> SummaryJob:
+        if retryable and job.attempts < job.max_attempts:
+            update = {
+                "status": "queued",
+                "worker_id": None,
+                "available_at": datetime.utcnow() + _retry_delay(job.attempts)
+            }
+        else:
+            now = datetime.utcnow()
+            update = {"status": "failed", "finished_at": now, "expires_at": _expires_at(now)}
+        update.update({"error": error, "lease_expires_at": None})
+        return await self._update(job, {"$set": update})
+
+    async def get(self, job_id: PydanticObjectId, user_id: PydanticObjectId) -> Optional[SummaryJob]:
+        return await SummaryJob.find_one(SummaryJob.id == job_id, SummaryJob.user_id == user_id)
+
+    async def requeue_expired(self) -> int:
+        result = await SummaryJob.get_motor_collection().update_many(
+            {"status": "running", "lease_expires_at": {"$lt": datetime.utcnow()}},
+            {"$set": {"status": "queued", "worker_id": None, "lease_expires_at": None}}
+        )
+        return result.modified_count
+
+class JobNotifier:
+    """In-process fan-out of job updates to SSE listeners"""
+
+    def __init__(self):
+        self._listeners: Dict[PydanticObjectId, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, job_id: PydanticObjectId) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: PydanticObjectId, queue: asyncio.Queue) -> None:
+        listeners = self._listeners.get(job_id)
+        if listeners is not None:
+            listeners.discard(queue)
+            if not listeners:
+                del self._listeners[job_id]
+
+    def publish(self, job: SummaryJob) -> None:
+        for queue in self._listeners.get(job.id, ()):
+            queue.put_nowait(job)
+
+class JobQueue:
+    def __init__(self, store: JobStore):
+        self.store = store
+        self.notifier = JobNotifier()
+        self._work_available = asyncio.Event()
+        self._workers: List[asyncio.Task] = []
+
+    async def submit(
+        self,
+        user: Principal,
+        session_id: PydanticObjectId,
+        text: str,
+        parameters: Dict,
+        priority: int = 0
+    ) -> SummaryJob:
+        job = await self.store.enqueue(SummaryJob(
+            user_id=user.id,
+            session_id=session_id,
+            text=text,
+            parameters=parameters,
+            priority=priority,
+            max_attempts=settings.JOB_MAX_ATTEMPTS
+        ))
+        self._work_available.set()
+        return job
+
+    async def get(self, job_id: PydanticObjectId, user: Principal) -> Optional[SummaryJob]:
+        return await self.store.get(job_id, user.id)
+
+    async def _process(self, job: SummaryJob) -> SummaryJob:
+        principal = await User.find_one(User.id == job.user_id, projection_model=Principal)
+        if principal is None:
+            return await self.store.fail(job, "User no longer exists", retryable=False)
+
+        try:
+            summary_id, result = await ChatService.add_summary(
+                principal, job.session_id, job.text, job.parameters
+            )
+        except InferenceError as e:
+            # Already retried in place; a later attempt only helps if the upstream may recover
+            return await self.store.fail(job, f"{e.detail} ({e.kind})", retryable=e.retryable)
+        except HTTPException as e:
+            # Client errors (missing session, invalid text) will not succeed on retry
+            return await self.store.fail(job, str(e.detail), retryable=e.status_code >= 500)
+        except Exception as e:
+            return await self.store.fail(job, str(e), retryable=True)
+        return await self.store.complete(job, summary_id, result.summary_text)
+
+    async def _renew_lease(self, job: SummaryJob) -> None:
+        """Keep the job's lease from expiring while its worker is alive, however
+        long the summary takes (long documents, inference retries)"""
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            try:
+                if not await self.store.renew(job):
+                    logger.warning(f"Job {job.id} lease was lost by worker {job.worker_id}")
+                    return
+            except Exception as e:
+                logger.error(f"Failed to renew the lease of job {job.id}: {str(e)}")
+
+    async def _wait_for_work(self, timeout: float) -> None:
+        """Wait until a job is submitted or timeout has passed. asyncio.wait_for would
+        drop a cancellation arriving as the event is set, leaving the worker running
+        after stop_workers; asyncio.wait always passes it on."""
+        waiter = asyncio.ensure_future(self._work_available.wait())
+        try:
+            await asyncio.wait([waiter], timeout=timeout)
+        finally:
+            waiter.cancel()
+
+    async def _run_worker(self, worker_id: str) -> None:
+        while True:
+            try:
+                job = await self.store.claim(worker_id)
+            except Exception as e:
+                logger.error(f"Job worker {worker_id} failed to claim a job: {str(e)}")
+                job = None
+
+            if job is None:
+                # Jobs submitted through other processes are picked up by polling
+                self._work_available.clear()
+                await self._wait_for_work(settings.JOB_POLL_INTERVAL_SECONDS)
+                continue
+
+            self.notifier.publish(job)
+            heartbeat = asyncio.get_running_loop().create_task(self._renew_lease(job))
+            try:
+                job = await self._process(job)
+            except asyncio.CancelledError:
+                try:
+                    await asyncio.shield(self.store.fail(job, "Worker stopped", retryable=True))
+                except Exception as e:
+                    # Its lease will expire and requeue it; the worker still stops
+                    logger.error(f"Failed to requeue job {job.id} of stopped worker {worker_id}: {str(e)}")
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.id} failed: {str(e)}")
+                try:
+                    job = await self.store.fail(job, str(e), retryable=True)
+                except Exception as e:
+                    logger.error(f"Failed to record the failure of job {job.id}: {str(e)}")
+                    continue
+            finally:
+                heartbeat.cancel()
+            self.notifier.publish(job)
+            if job.status == "queued":
+                # Wake a worker once the retry becomes due
+                asyncio.get_running_loop().call_later(
+                    max(0.0, (job.available_at - datetime.utcnow()).total_seconds()),
+                    self._work_available.set
+                )
+
+    async def _reap_expired(self) -> None:
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 2)
+            try:
+                requeued = await self.store.requeue_expired()
+                if requeued:
+                    logger.warning(f"Requeued {requeued} jobs with expired leases")
+                    self._work_available.set()
+            except Exception as e:
+                logger.error(f"Failed to requeue expired jobs: {str(e)}")
+
+    def start_workers(self, count: int) -> None:
+        if count <= 0 or self._workers:
+            return
+        prefix = uuid.uuid4().hex[:8]
+        self._workers = [
+            asyncio.create_task(self._run_worker(f"{prefix}-{i}")) for i in range(count)
+        ]
+        self._workers.append(asyncio.create_task(self._reap_expired()))
+        logger.info(f"Started {count} summarization job workers")
+
+    async def stop_workers(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+def build_job_queue() -> JobQueue:
+    backend_name = settings.JOB_QUEUE_BACKEND.lower()
+    if backend_name == "mongo":
+        return JobQueue(MongoJobStore())
+    if backend_name == "memory":
+        return JobQueue(InMemoryJobStore())
+    raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {settings.JOB_QUEUE_BACKEND}")
+
+job_queue = build_job_queue()
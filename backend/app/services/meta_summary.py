@@ -0,0 +1,123 @@
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional
+from beanie import PydanticObjectId
+from app.config import settings
+from app.models import Principal, MetaSummaryNode
+from app.schemas import SummaryParameters
+from app.services.summary_service import SummaryService
+from app.crud import (
+    assign_meta_groups,
+    get_meta_nodes,
+    get_meta_group_summaries,
+    save_meta_node,
+    delete_meta_nodes
+)
+
+logger = logging.getLogger(__name__)
+
+def combine_summaries(texts: List[str]) -> str:
+    return "\n\n".join(f"Summary {i+1}: {text}" for i, text in enumerate(texts))
+
+def _source_hash(texts: List[str]) -> str:
+    return hashlib.sha256("\x1e".join(texts).encode("utf-8")).hexdigest()
+
+class MetaSummaryService:
+    """Maintains a session's tree of stored group reductions.
+
+    Summaries are reduced META_GROUP_SIZE at a time into level 0 nodes, those
+    nodes into level 1 nodes and so on until at most META_GROUP_SIZE remain.
+    Only level 0 nodes marked dirty by a summary change, and the ancestors whose
+    inputs changed as a result, go back through the model.
+    """
+
+    @staticmethod
+    def _group_parameters() -> SummaryParameters:
+        return SummaryParameters(
+            min_length=settings.META_GROUP_MIN_LENGTH,
+            max_length=settings.META_GROUP_MAX_LENGTH,
+            do_sample=False
+        )
+
+    @staticmethod
+    async def reduce_session(user: Principal, session_id: PydanticObjectId) -> List[str]:
+        """Return the top-level reductions covering every summary in the session,
+        at most META_GROUP_SIZE of them, in summary order."""
+        group_size = settings.META_GROUP_SIZE
+        parameters = MetaSummaryService._group_parameters()
+        semaphore = asyncio.Semaphore(settings.META_MAX_CONCURRENCY)
+        inference_calls = 0
+
+        async def reduce(texts: List[str]) -> str:
+            nonlocal inference_calls
+            async with semaphore:
+                inference_calls += 1
+                result = await SummaryService.summarize_document(combine_summaries(texts), parameters)
+            return result.summary_text
+
+        await assign_meta_groups(user, session_id)
+
+        # Level 0: recompute the dirty groups from their summaries
+        nodes = await get_meta_nodes(session_id, 0)
+        stale = [node for node in nodes if node.dirty or node.summary_text is None]
+        summaries = await get_meta_group_summaries(user, session_id, [node.index for node in stale])
+        texts_by_group: Dict[int, List[str]] = {}
+        for summary in summaries:
+            texts_by_group.setdefault(summary.meta_group, []).append(summary.summary_text)
+
+        async def refresh(node: MetaSummaryNode) -> Optional[str]:
+            texts = texts_by_group.get(node.index)
+            if not texts:
+                # Every summary in the group was deleted
+                await delete_meta_nodes(session_id, 0, [node.index], expected_version=node.version)
+                return None
+            summary_text = await reduce(texts)
+            # A summary changed while reducing: keep the node dirty for the next run
+            await save_meta_node(
+                user, session_id, 0, node.index, summary_text,
+                source_hash=_source_hash(texts), expected_version=node.version
+            )
+            return summary_text
+
+        refreshed = await asyncio.gather(*(refresh(node) for node in stale))
+        stale_indexes = {node.index for node in stale}
+        current = {node.index: node.summary_text for node in nodes if node.index not in stale_indexes}
+        for node, summary_text in zip(stale, refreshed):
+            if summary_text is not None:
+                current[node.index] = summary_text
+
+        # Higher levels: recompute a node only when the texts it reduces changed
+        level = 1
+        while len(current) > group_size:
+            children: Dict[int, List[str]] = {}
+            for index in sorted(current):
+                children.setdefault(index // group_size, []).append(current[index])
+
+            stored = {node.index: node for node in await get_meta_nodes(session_id, level)}
+
+            async def refresh_parent(index: int, texts: List[str]) -> str:
+                source_hash = _source_hash(texts)
+                node = stored.get(index)
+                if node is not None and node.source_hash == source_hash and node.summary_text is not None:
+                    return node.summary_text
+                summary_text = await reduce(texts)
+                await save_meta_node(user, session_id, level, index, summary_text, source_hash=source_hash)
+                return summary_text
+
+            indexes = sorted(children)
+            parents = await asyncio.gather(*(refresh_parent(index, children[index]) for index in indexes))
+            orphaned = [index for index in stored if index not in children]
+            if orphaned:
+                await delete_meta_nodes(session_id, level, orphaned)
+            current = dict(zip(indexes, parents))
+            level += 1
+
+        # Drop levels left over from when the session was larger
+        await delete_meta_nodes(session_id, level)
+
+        logger.info(
+            f"Meta-summary tree for session {session_id}: {inference_calls} reductions, "
+            f"{len(current)} top-level nodes at level {level - 1}"
+        )
+        return [current[index] for index in sorted(current)]
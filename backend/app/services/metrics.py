@@ -0,0 +1,306 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from pymongo import monitoring
+
+# Latency buckets in seconds, from a cached read to a slow model call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def stats(self) -> Dict:
+        labels = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 3) if self.count else 0.0,
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Mongo command events arrive on driver threads
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}" for labels, v in values]
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+class CallbackMetric(_Metric):
+    """Counter or gauge read from existing state when scraped, e.g. cache hit counts"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        callback: Callable[[], Dict[Tuple, float]],
+        labelnames: Tuple[str, ...] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.type = metric_type
+        self.callback = callback
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self.callback().items()
+        ]
+
+class HistogramFamily(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._histograms: Dict[Tuple, Histogram] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            histogram = self._histograms.get(labels)
+            if histogram is None:
+                histogram = self._histograms[labels] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def attach(self, histogram: Histogram, *labels) -> None:
+        """Expose a histogram owned by another component under these labels"""
+        self._histograms[labels] = histogram
+
+    @contextmanager
+    def time(self, *labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            histograms = list(self._histograms.items())
+        lines = []
+        for labels, histogram in histograms:
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(histogram.sum)}")
+            lines.append(f"{self.name}_count{label_text} {histogram.count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        # Modules may be re-imported (scripts, reloads); keep the first instance
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ) -> HistogramFamily:
+        return self._register(HistogramFamily(name, documentation, labelnames, buckets))
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        callback: Callable[[], Dict[Tuple, float]],
+        labelnames: Tuple[str, ...] = ()
+    ) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, metric_type, callback, labelnames))
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# Metrics shared across modules
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "HTTP requests by method, route template and status code", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response is complete", ("method", "route")
+)
+HTTP_IN_PROGRESS = metrics.gauge("http_requests_in_progress", "HTTP requests being served")
+STAGE_SECONDS = metrics.histogram(
+    "request_stage_duration_seconds", "Time spent in each stage of request handling", ("stage",)
+)
+CRUD_SECONDS = metrics.histogram(
+    "crud_operation_duration_seconds", "Duration of data access operations in app.crud", ("operation",)
+)
+MONGO_COMMAND_SECONDS = metrics.histogram(
+    "mongo_command_duration_seconds", "MongoDB command round trips", ("command", "collection")
+)
+MONGO_COMMAND_ERRORS = metrics.counter(
+    "mongo_command_errors_total", "MongoDB commands that failed", ("command", "collection")
+)
+MONGO_COLLECTION_DOCUMENTS = metrics.gauge(
+    "mongo_collection_documents", "Documents per collection", ("collection",)
+)
+MONGO_COLLECTION_BYTES = metrics.gauge(
+    "mongo_collection_size_bytes", "Uncompressed data size per collection", ("collection",)
+)
+MONGO_COLLECTION_AVG_DOCUMENT_BYTES = metrics.gauge(
+    "mongo_collection_avg_document_bytes", "Average document size per collection", ("collection",)
+)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every command the driver sends. Registered on the Mongo client at startup."""
+
+    def __init__(self):
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(key)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name, collection)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name, collection)
+        MONGO_COMMAND_ERRORS.inc(event.command_name, collection)
+
+_collection_stats_refreshed_at: Optional[float] = None
+
+async def refresh_collection_stats(database, ttl_seconds: float) -> None:
+    """Update the per-collection size gauges at most once per ttl_seconds"""
+    global _collection_stats_refreshed_at
+    now = time.monotonic()
+    if _collection_stats_refreshed_at is not None and now - _collection_stats_refreshed_at < ttl_seconds:
+        return
+    _collection_stats_refreshed_at = now
+    for name in await database.list_collection_names():
+        stats = await database[name].aggregate([{"$collStats": {"storageStats": {}}}]).to_list(1)
+        if not stats:
+            continue
+        storage = stats[0].get("storageStats", {})
+        MONGO_COLLECTION_DOCUMENTS.set(storage.get("count", 0), name)
+        MONGO_COLLECTION_BYTES.set(storage.get("size", 0), name)
+        MONGO_COLLECTION_AVG_DOCUMENT_BYTES.set(storage.get("avgObjSize", 0), name)
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them per route template, so
+    /chat/sessions/{session_id} is one series however many sessions exist"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[Callable, str]] = None
+
+    def _route_template(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            self._routes = {
+                getattr(route, "endpoint", None): route.path
+                for route in scope["app"].routes if hasattr(route, "path")
+            }
+        return self._routes.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc(amount=1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.inc(amount=-1)
+            route = self._route_template(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route)
+            HTTP_REQUESTS.inc(scope["method"], route, status_code)
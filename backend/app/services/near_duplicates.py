@@ -0,0 +1,103 @@
+import numpy as np
+import zlib
+from pydantic import BaseModel, ValidationError
+from typing import FrozenSet, List, Optional
+from app.config import settings
+from app.models import Principal, SummaryItem
+from app.schemas import SummaryParameters
+from app.services.text_store import text_store
+
+# Word shingles; short enough that a changed headline or byline only touches a few
+SHINGLE_SIZE = 3
+# 16 bands of 8 rows: pairs above ~0.7 Jaccard almost always share a band.
+# Changing either invalidates stored lsh_bands (rerun scripts.backfill_lsh_bands).
+NUM_PERMUTATIONS = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20240320)
+_A = _rng.randint(1, _PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+def shingles(text: str) -> FrozenSet[int]:
+    """CRC32 hashes of the word n-grams of the case- and whitespace-normalized text"""
+    words = text.lower().split()
+    if len(words) < SHINGLE_SIZE:
+        return frozenset([zlib.crc32(" ".join(words).encode("utf-8"))])
+    return frozenset(
+        zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    )
+
+def minhash_signature(shingle_hashes: FrozenSet[int]) -> np.ndarray:
+    values = np.fromiter(shingle_hashes, dtype=np.uint64, count=len(shingle_hashes)) % _PRIME
+    # (a * x + b) mod p for every permutation and shingle; a, x < 2^31 so nothing overflows
+    return ((np.outer(_A, values) + _B[:, None]) % _PRIME).min(axis=1)
+
+def lsh_bands(shingle_hashes: FrozenSet[int]) -> List[int]:
+    """One key per band: the band number in the high bits, a hash of its rows in the low"""
+    signature = minhash_signature(shingle_hashes).astype(np.uint32)
+    return [
+        (band << 32) | zlib.crc32(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+        for band in range(BANDS)
+    ]
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class TextFingerprint:
+    """Shingles and LSH band keys of a text, computed once per request"""
+
+    def __init__(self, text: str):
+        self.shingles = shingles(text)
+        self.bands = lsh_bands(self.shingles)
+
+class NearDuplicateMatch(BaseModel):
+    summary: SummaryItem
+    similarity: float
+
+def _same_parameters(stored: dict, parameters: SummaryParameters) -> bool:
+    try:
+        return SummaryParameters(**stored) == parameters
+    except (ValidationError, TypeError):
+        return False
+
+class NearDuplicateIndex:
+    """Looks up earlier summaries of nearly the same text through the lsh_bands
+    multikey index on summaries. Adding or deleting a summary updates the index
+    as part of the same write."""
+
+    @staticmethod
+    def enabled_for(parameters: SummaryParameters) -> bool:
+        # Sampled summaries are expected to differ between calls
+        return settings.NEAR_DUP_MODE.lower() != "off" and not parameters.do_sample
+
+    @staticmethod
+    async def find(
+        user: Principal,
+        fingerprint: TextFingerprint,
+        parameters: SummaryParameters
+    ) -> Optional[NearDuplicateMatch]:
+        """Most similar stored summary made with the same parameters whose text has
+        at least NEAR_DUP_THRESHOLD Jaccard similarity, checked exactly on shingles."""
+        criteria = {"lsh_bands": {"$in": fingerprint.bands}}
+        if settings.NEAR_DUP_SCOPE.lower() != "global":
+            criteria["user_id"] = user.id
+        candidates = await SummaryItem.find(criteria).limit(settings.NEAR_DUP_MAX_CANDIDATES).to_list()
+        candidates = [candidate for candidate in candidates if _same_parameters(candidate.parameters, parameters)]
+        texts = await text_store.get_many(
+            candidate.text_hash for candidate in candidates if candidate.original_text is None
+        )
+
+        best: Optional[NearDuplicateMatch] = None
+        for candidate in candidates:
+            text = candidate.original_text if candidate.original_text is not None else texts.get(candidate.text_hash)
+            if text is None:
+                continue
+            similarity = jaccard(fingerprint.shingles, shingles(text))
+            if similarity >= settings.NEAR_DUP_THRESHOLD and (best is None or similarity > best.similarity):
+                best = NearDuplicateMatch(summary=candidate, similarity=round(similarity, 4))
+        return best
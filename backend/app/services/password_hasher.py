@@ -0,0 +1,39 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from app.config import settings
+
+class PasswordHasher:
+    """Runs bcrypt in a fixed-size thread pool. bcrypt releases the GIL while it
+    hashes, so the event loop keeps serving requests during a login burst, and
+    at most `workers` hashes run at once, with the rest waiting in the pool's queue."""
+
+    def __init__(self, rounds: int, workers: int):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _run(self, function, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Whether the password matches, and a new hash when the stored one was made
+        with a different work factor (None otherwise)"""
+        return await self._run(self.context.verify_and_update, password, hashed_password)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+def build_password_hasher() -> PasswordHasher:
+    return PasswordHasher(rounds=settings.BCRYPT_ROUNDS, workers=settings.PASSWORD_HASH_WORKERS)
+
+password_hasher = build_password_hasher()
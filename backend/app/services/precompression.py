@@ -0,0 +1,99 @@
+import math
+import numpy as np
+from pydantic import BaseModel
+from typing import Dict, List, Tuple
+from app.services.chunking import split_sentences, estimate_tokens, content_words
+
+class CompressionResult(BaseModel):
+    text: str
+    original_tokens: int
+    compressed_tokens: int
+    kept_sentences: int
+    total_sentences: int
+
+    @property
+    def ratio(self) -> float:
+        return round(self.compressed_tokens / self.original_tokens, 3)
+
+def _term_matrix(sentences: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Sentence x term counts in coordinate form: (rows, cols, counts, vocabulary size)"""
+    vocabulary: Dict[str, int] = {}
+    rows, cols = [], []
+    for row, sentence in enumerate(sentences):
+        for word in content_words(sentence):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(word, len(vocabulary)))
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), 0
+
+    # Collapse repeated (sentence, term) pairs into counts
+    keys = np.asarray(rows, dtype=np.int64) * len(vocabulary) + np.asarray(cols, dtype=np.int64)
+    unique, counts = np.unique(keys, return_counts=True)
+    return unique // len(vocabulary), unique % len(vocabulary), counts.astype(np.float64), len(vocabulary)
+
+def score_sentences(sentences: List[str]) -> np.ndarray:
+    """TF-IDF cosine similarity of each sentence to the whole document.
+
+    Sentences that share the document's most distinctive vocabulary score
+    highest; sentences made only of rare or stop words score near zero.
+    """
+    n = len(sentences)
+    rows, cols, counts, vocabulary_size = _term_matrix(sentences)
+    if vocabulary_size == 0:
+        return np.zeros(n)
+
+    sentence_lengths = np.bincount(rows, weights=counts, minlength=n)
+    document_frequency = np.bincount(cols, minlength=vocabulary_size)
+    idf = np.log((1 + n) / (1 + document_frequency)) + 1
+    weights = counts / sentence_lengths[rows] * idf[cols]
+
+    centroid = np.bincount(cols, weights=weights, minlength=vocabulary_size)
+    dot = np.bincount(rows, weights=weights * centroid[cols], minlength=n)
+    norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n)) * np.linalg.norm(centroid)
+    return np.divide(dot, norms, out=np.zeros(n), where=norms > 0)
+
+def compress_text(text: str, ratio: float) -> CompressionResult:
+    """Keep the highest scoring sentences, in their original order, within
+    ratio * the text's estimated tokens. At least one sentence is always kept."""
+    paragraphs = split_sentences(text)
+    sentences = [sentence for paragraph in paragraphs for sentence in paragraph]
+    paragraph_of = [i for i, paragraph in enumerate(paragraphs) for _ in paragraph]
+
+    original_tokens = estimate_tokens(text)
+    if len(sentences) <= 1:
+        return CompressionResult(
+            text=text,
+            original_tokens=original_tokens,
+            compressed_tokens=original_tokens,
+            kept_sentences=len(sentences),
+            total_sentences=len(sentences)
+        )
+
+    budget = max(1, math.ceil(original_tokens * ratio))
+    scores = score_sentences(sentences)
+    # Stable sort: ties go to the earlier sentence
+    ranked = np.argsort(-scores, kind="stable")
+
+    kept, used_tokens = [], 0
+    for index in ranked:
+        tokens = estimate_tokens(sentences[index] + " ")
+        if kept and used_tokens + tokens > budget:
+            continue
+        kept.append(int(index))
+        used_tokens += tokens
+
+    compressed, previous = "", None
+    for index in sorted(kept):
+        if previous is not None:
+            compressed += "\n\n" if paragraph_of[index] != paragraph_of[previous] else " "
+        compressed += sentences[index]
+        previous = index
+
+    return CompressionResult(
+        text=compressed,
+        original_tokens=original_tokens,
+        compressed_tokens=estimate_tokens(compressed),
+        kept_sentences=len(kept),
+        total_sentences=len(sentences)
+    )
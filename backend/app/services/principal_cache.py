@@ -0,0 +1,47 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.config import settings
+from app.models import Principal
+
+class PrincipalCache:
+    """Short-lived per-process cache of authenticated principals keyed by token subject.
+
+    Entries are dropped explicitly when the user is updated or deleted through this
+    process; other workers see the change once their entry expires.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+
+    def get(self, subject: str) -> Optional[Principal]:
+        entry = self._entries.get(subject)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            del self._entries[subject]
+            return None
+        self._entries.move_to_end(subject)
+        return principal
+
+    def set(self, subject: str, principal: Principal) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[subject] = (time.monotonic() + self.ttl_seconds, principal)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str) -> None:
+        self._entries.pop(subject, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,114 @@
+import asyncio
+import cProfile
+import io
+import logging
+import marshal
+import pstats
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from beanie import PydanticObjectId
+from starlette.requests import HTTPConnection
+from app.config import settings
+from app.crud import save_request_profile
+from app.models import RequestProfile
+from app.utils import get_admin_subject
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+SUMMARY_FUNCTIONS = 40
+
+def _requesting_admin(scope) -> Optional[str]:
+    """Email of the caller if they are an admin asking for a profile, else None"""
+    connection = HTTPConnection(scope)
+    if connection.headers.get(PROFILE_HEADER) != "1":
+        return None
+    return get_admin_subject(connection.cookies.get("access_token"))
+
+def _render_profile(profiler: cProfile.Profile) -> Tuple[bytes, str]:
+    """(marshalled stats as in a .prof file, top functions by cumulative time)"""
+    profiler.create_stats()
+    # Dump first: pstats.Stats takes the stats over and clears them on the profiler
+    data = marshal.dumps(profiler.stats)
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(SUMMARY_FUNCTIONS)
+    return data, output.getvalue()
+
+class ProfilingMiddleware:
+    """ASGI middleware that runs cProfile around a single request and stores the
+    result as a RequestProfile. Only one request is profiled at a time.
+
+    cProfile records everything the event loop runs while the request is in
+    flight, so work from concurrent requests shows up in the profile too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._active = False
+
+    def _should_profile(self, scope) -> Tuple[Optional[str], Optional[str]]:
+        """(reason, admin email) when this request should be profiled"""
+        if self._active:
+            return None, None
+        admin = _requesting_admin(scope)
+        if admin is not None:
+            return "requested", admin
+        if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+            return "sampled", None
+        return None, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        reason, admin = self._should_profile(scope)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = PydanticObjectId()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER, str(profile_id).encode())
+                ]}
+            await send(message)
+
+        self._active = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            duration_ms = (time.perf_counter() - start) * 1000
+            self._active = False
+
+        try:
+            stats, summary = await asyncio.to_thread(_render_profile, profiler)
+            now = datetime.utcnow()
+            await save_request_profile(RequestProfile(
+                id=profile_id,
+                method=scope["method"],
+                path=scope["path"],
+                status_code=status_code,
+                duration_ms=round(duration_ms, 2),
+                reason=reason,
+                user_email=admin,
+                stats=stats,
+                summary=summary,
+                created_at=now,
+                expires_at=now + timedelta(hours=settings.PROFILE_RETENTION_HOURS)
+            ))
+            logger.info(f"Stored {reason} profile {profile_id} of {scope['method']} {scope['path']}")
+        except Exception as e:
+            logger.warning(f"Failed to store request profile: {str(e)}")
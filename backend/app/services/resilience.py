@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from fastapi import HTTPException, status
+from app.config import settings
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+INFERENCE_RETRIES = metrics.counter(
+    "inference_retries_total", "Backend calls retried, by the error that caused the retry", ("backend", "error")
+)
+INFERENCE_HEDGES = metrics.counter(
+    "inference_hedged_requests_total", "Second requests sent for slow backend calls", ("backend",)
+)
+INFERENCE_HEDGE_WINS = metrics.counter(
+    "inference_hedge_wins_total", "Hedged calls answered first by the second request", ("backend",)
+)
+
+# Error kinds that a later repeat of the same call may not run into
+RETRYABLE_KINDS = {"timeout", "connection", "unavailable", "rate_limited", "model_loading", "circuit_open"}
+# Kinds that say nothing about the upstream's health, so the circuit breaker ignores them
+NEUTRAL_KINDS = {"bad_request", "circuit_open"}
+
+_STATUS_BY_KIND = {
+    "timeout": status.HTTP_504_GATEWAY_TIMEOUT,
+    "bad_request": status.HTTP_502_BAD_GATEWAY,
+    "invalid_response": status.HTTP_502_BAD_GATEWAY
+}
+
+class InferenceError(HTTPException):
+    """A failed backend call, classified by kind so callers can tell whether
+    retrying may help. Answered as 503 (504 for timeouts, 502 when the upstream
+    rejected or garbled the call), with Retry-After when the wait is known."""
+
+    def __init__(self, kind: str, message: str, retry_after: Optional[float] = None):
+        headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if retry_after else None
+        super().__init__(
+            status_code=_STATUS_BY_KIND.get(kind, status.HTTP_503_SERVICE_UNAVAILABLE),
+            detail="Summary service temporarily unavailable",
+            headers=headers
+        )
+        self.kind = kind
+        self.message = message
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind in RETRYABLE_KINDS
+
+    def __str__(self) -> str:
+        return f"{self.kind}: {self.message}"
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _is_upstream_failure(error: Exception) -> bool:
+    if isinstance(error, InferenceError):
+        return error.kind not in NEUTRAL_KINDS
+    if isinstance(error, HTTPException):
+        return error.status_code >= 500
+    return True
+
+class CircuitBreaker:
+    """Fails calls fast while the upstream is unhealthy.
+
+    Closed: calls pass and consecutive upstream failures are counted. After
+    failure_threshold of them the circuit opens and rejects calls for
+    reset_seconds (or longer, if the upstream asked for a longer wait). Then it
+    is half-open: one trial call goes through, and its outcome closes the
+    circuit or opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    STATES = (CLOSED, OPEN, HALF_OPEN)
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.rejections = 0
+        self.transitions: Dict[str, int] = {state: 0 for state in self.STATES}
+        self._trial_in_flight = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"Inference circuit breaker {self.state} -> {state}")
+            self.state = state
+            self.transitions[state] += 1
+
+    def before_call(self) -> None:
+        """Raises InferenceError("circuit_open") if the call may not go through"""
+        if not self.enabled:
+            return
+        if self.state == self.OPEN:
+            remaining = self.open_until - time.monotonic()
+            if remaining > 0:
+                self.rejections += 1
+                raise InferenceError("circuit_open", "Circuit breaker is open", retry_after=remaining)
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                self.rejections += 1
+                raise InferenceError("circuit_open", "Circuit breaker is waiting on a trial call", retry_after=1)
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self._transition(self.CLOSED)
+
+    def record_failure(self, retry_after: Optional[float] = None) -> None:
+        self._trial_in_flight = False
+        self.consecutive_failures += 1
+        if not self.enabled:
+            return
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.open_until = time.monotonic() + max(self.reset_seconds, retry_after or 0)
+            self._transition(self.OPEN)
+
+    def record_neutral(self) -> None:
+        """The call ended without telling anything about upstream health"""
+        self._trial_in_flight = False
+
+class InferenceResilience:
+    """Runs backend calls with retries, optional hedging and a circuit breaker.
+
+    Retryable failures are retried up to max_attempts times in total, with full
+    jitter exponential backoff. When the upstream says how long to wait
+    (Retry-After, or estimated_time while a model loads), the wait is at least
+    that long; if that exceeds max_delay the call fails at once instead, and the
+    error carries the wait as Retry-After. With hedge_after set, a call that has
+    not answered by then is sent a second time and the first answer wins.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        hedge_after_ms: float = 0
+    ):
+        self.breaker = breaker
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after_ms / 1000
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number `attempt` (1-based)"""
+        if retry_after is not None:
+            # A little jitter so callers told the same wait do not return together
+            return retry_after + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def call(self, backend_name: str, function: Callable[[], Awaitable[T]]) -> T:
+        attempt = 1
+        while True:
+            try:
+                return await self._attempt(backend_name, function)
+            except InferenceError as e:
+                if e.kind == "circuit_open" or not e.retryable or attempt >= self.max_attempts:
+                    raise
+                if e.retry_after is not None and e.retry_after > self.max_delay:
+                    logger.warning(f"{backend_name} asked for a {e.retry_after:.1f}s wait, not retrying: {e}")
+                    raise
+                delay = self.backoff(attempt, e.retry_after)
+                INFERENCE_RETRIES.inc(backend_name, e.kind)
+                logger.warning(f"{backend_name} call failed, retry {attempt} in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _attempt(self, backend_name: str, function: Callable[[], Awaitable[T]]) -> T:
+        self.breaker.before_call()
+        try:
+            result = await self._hedged(backend_name, function)
+        except asyncio.CancelledError:
+            self.breaker.record_neutral()
+            raise
+        except Exception as e:
+            if _is_upstream_failure(e):
+                self.breaker.record_failure(getattr(e, "retry_after", None))
+            else:
+                self.breaker.record_neutral()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _hedged(self, backend_name: str, function: Callable[[], Awaitable[T]]) -> T:
+        if self.hedge_after <= 0:
+            return await function()
+
+        primary = asyncio.ensure_future(function())
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                INFERENCE_HEDGES.inc(backend_name)
+                pending.add(asyncio.ensure_future(function()))
+            else:
+                pending = done
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            INFERENCE_HEDGE_WINS.inc(backend_name)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The slower copy, or both if the caller gave up
+            for task in pending:
+                task.cancel()
+
+def build_inference_resilience() -> InferenceResilience:
+    return InferenceResilience(
+        CircuitBreaker(
+            failure_threshold=settings.INFERENCE_BREAKER_FAILURE_THRESHOLD,
+            reset_seconds=settings.INFERENCE_BREAKER_RESET_SECONDS
+        ),
+        max_attempts=settings.INFERENCE_RETRY_MAX_ATTEMPTS,
+        base_delay=settings.INFERENCE_RETRY_BASE_DELAY_SECONDS,
+        max_delay=settings.INFERENCE_RETRY_MAX_DELAY_SECONDS,
+        hedge_after_ms=settings.INFERENCE_HEDGE_AFTER_MS
+    )
+
+inference_resilience = build_inference_resilience()
+
+metrics.callback(
+    "inference_circuit_breaker_state", "1 for the circuit breaker's current state", "gauge",
+    lambda: {
+        (state,): int(inference_resilience.breaker.state == state)
+        for state in CircuitBreaker.STATES
+    },
+    ("state",)
+)
+metrics.callback(
+    "inference_circuit_breaker_transitions_total", "Circuit breaker state changes, by new state", "counter",
+    lambda: {(state,): count for state, count in inference_resilience.breaker.transitions.items()},
+    ("state",)
+)
+metrics.callback(
+    "inference_circuit_breaker_rejections_total", "Calls failed fast by the open circuit breaker", "counter",
+    lambda: {(): inference_resilience.breaker.rejections}
+)
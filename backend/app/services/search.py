@@ -0,0 +1,350 @@
+import asyncio
+import math
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from beanie import PydanticObjectId
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from app.config import settings
+from app.models import ChatSession, Principal, SearchEmbedding, SummaryItem
+from app.services.chunking import content_words
+from app.services.text_store import text_store
+
+SNIPPET_CHARS = 160
+# Texts longer than this are embedded from their beginning only
+EMBEDDING_MAX_CHARS = 20000
+
+class SearchHit(BaseModel):
+    kind: str  # "summary" or "session"
+    session_id: PydanticObjectId
+    summary_id: Optional[PydanticObjectId] = None
+    score: float
+    # Text the snippet is taken from, and which field it came from
+    text: str
+    field: str
+    # Set when the summary's original text is in the text store; it is only
+    # loaded for the hits on the returned page
+    text_hash: Optional[str] = None
+
+def query_terms(query: str) -> List[str]:
+    return content_words(query) or query.lower().split()
+
+def make_snippet(text: str, terms: List[str], width: int = SNIPPET_CHARS) -> str:
+    """A window of about width characters around the first query term in text"""
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    start = max(0, min(positions) - width // 3) if positions else 0
+    end = min(len(text), start + width)
+    # Do not cut words in half
+    if start > 0:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < end else start
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+    snippet = " ".join(text[start:end].split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+
+def _best_field(fields: Dict[str, Optional[str]], terms: List[str]) -> Tuple[str, str]:
+    """The first non-empty field that mentions a query term, else the first non-empty one"""
+    present = [(name, text) for name, text in fields.items() if text]
+    for name, text in present:
+        lowered = text.lower()
+        if any(term in lowered for term in terms):
+            return name, text
+    return present[0] if present else ("", "")
+
+def _stored_text_hash(summary: Dict) -> Optional[str]:
+    return summary.get("text_hash") if summary.get("original_text") is None else None
+
+async def _with_stored_texts(hits: List[SearchHit], terms: List[str]) -> List[SearchHit]:
+    """Pick the snippet field of summary hits again once their stored original
+    texts are loaded"""
+    texts = await text_store.get_many(hit.text_hash for hit in hits if hit.text_hash)
+    updated = []
+    for hit in hits:
+        original_text = texts.get(hit.text_hash) if hit.text_hash else None
+        if original_text is not None and hit.field == "summary_text":
+            field, text = _best_field({"summary_text": hit.text, "original_text": original_text}, terms)
+            hit = hit.copy(update={"field": field, "text": text})
+        updated.append(hit)
+    return updated
+
+# Keyword search
+async def keyword_search(user_id: PydanticObjectId, query: str, limit: int) -> List[SearchHit]:
+    """Top `limit` summaries and sessions by Mongo text score, best first"""
+    terms = query_terms(query)
+    criteria = {"user_id": user_id, "$text": {"$search": query}}
+    score = {"score": {"$meta": "textScore"}}
+
+    summaries_cursor = SummaryItem.get_motor_collection().find(
+        criteria,
+        projection={**score, "session_id": 1, "summary_text": 1, "original_text": 1, "text_hash": 1},
+        sort=[("score", {"$meta": "textScore"})],
+        limit=limit
+    )
+    sessions_cursor = ChatSession.get_motor_collection().find(
+        criteria,
+        projection={**score, "title": 1, "meta_summary": 1},
+        sort=[("score", {"$meta": "textScore"})],
+        limit=limit
+    )
+    summaries, sessions = await asyncio.gather(summaries_cursor.to_list(limit), sessions_cursor.to_list(limit))
+
+    hits = []
+    for raw in summaries:
+        field, text = _best_field(
+            {"summary_text": raw.get("summary_text"), "original_text": raw.get("original_text")}, terms
+        )
+        hits.append(SearchHit(
+            kind="summary", session_id=raw["session_id"], summary_id=raw["_id"],
+            score=raw["score"], text=text, field=field, text_hash=_stored_text_hash(raw)
+        ))
+    for raw in sessions:
+        field, text = _best_field({"title": raw.get("title"), "meta_summary": raw.get("meta_summary")}, terms)
+        hits.append(SearchHit(kind="session", session_id=raw["_id"], score=raw["score"], text=text, field=field))
+    hits.sort(key=lambda hit: -hit.score)
+    return hits[:limit]
+
+# Semantic search
+class HashingEmbedder:
+    """Model-free embedding: signed feature hashing of word unigrams and bigrams
+    with log term frequency, L2-normalized. Close texts share vocabulary, so
+    cosine similarity reflects topical overlap."""
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> np.ndarray:
+        words = content_words(text[:EMBEDDING_MAX_CHARS])
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        counts: Dict[int, float] = {}
+        for feature in features:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            index = digest % self.dimensions
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            counts[index] = counts.get(index, 0.0) + sign
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for index, value in counts.items():
+            vector[index] = math.copysign(1 + math.log(abs(value)), value) if value else 0.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+class _UserMatrix:
+    def __init__(self, stamp: Tuple, vectors: np.ndarray, entries: List[Dict]):
+        self.stamp = stamp
+        self.vectors = vectors
+        self.entries = entries
+
+class EmbeddingIndex:
+    """Stores one float32 vector per summary and session in search_embeddings, and
+    keeps each recently searched user's vectors as one matrix in memory so a query
+    is a single matrix-vector product. A cached matrix is reused while the user's
+    embedding count and latest update time are unchanged."""
+
+    def __init__(self, embedder: HashingEmbedder, max_cached_users: int):
+        self.embedder = embedder
+        self.max_cached_users = max_cached_users
+        self._matrices: "OrderedDict[PydanticObjectId, _UserMatrix]" = OrderedDict()
+
+    async def index(
+        self,
+        user_id: PydanticObjectId,
+        kind: str,
+        ref_id: PydanticObjectId,
+        session_id: PydanticObjectId,
+        text: str
+    ) -> None:
+        vector = self.embedder.embed(text)
+        await SearchEmbedding.get_motor_collection().update_one(
+            {"ref_id": ref_id},
+            {"$set": {
+                "user_id": user_id,
+                "kind": kind,
+                "session_id": session_id,
+                "vector": vector.astype(np.float32).tobytes(),
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    async def remove(self, ref_id: PydanticObjectId) -> None:
+        await SearchEmbedding.get_motor_collection().delete_one({"ref_id": ref_id})
+
+    async def remove_session(self, session_id: PydanticObjectId) -> None:
+        await SearchEmbedding.get_motor_collection().delete_many({"session_id": session_id})
+
+    async def remove_user(self, user_id: PydanticObjectId) -> None:
+        await SearchEmbedding.get_motor_collection().delete_many({"user_id": user_id})
+        self._matrices.pop(user_id, None)
+
+    async def _stamp(self, user_id: PydanticObjectId) -> Tuple:
+        collection = SearchEmbedding.get_motor_collection()
+        count, latest = await asyncio.gather(
+            collection.count_documents({"user_id": user_id}),
+            collection.find_one({"user_id": user_id}, projection={"updated_at": 1}, sort=[("updated_at", -1)])
+        )
+        return count, latest["updated_at"] if latest else None
+
+    async def _matrix(self, user_id: PydanticObjectId) -> _UserMatrix:
+        stamp = await self._stamp(user_id)
+        cached = self._matrices.get(user_id)
+        if cached is not None and cached.stamp == stamp:
+            self._matrices.move_to_end(user_id)
+            return cached
+
+        rows = await SearchEmbedding.get_motor_collection().find(
+            {"user_id": user_id},
+            projection={"kind": 1, "ref_id": 1, "session_id": 1, "vector": 1}
+        ).to_list(None)
+        vectors = np.zeros((len(rows), self.embedder.dimensions), dtype=np.float32)
+        for i, row in enumerate(rows):
+            vectors[i] = np.frombuffer(row["vector"], dtype=np.float32)
+        entries = [{"kind": row["kind"], "ref_id": row["ref_id"], "session_id": row["session_id"]} for row in rows]
+
+        matrix = _UserMatrix(stamp, vectors, entries)
+        self._matrices[user_id] = matrix
+        while len(self._matrices) > self.max_cached_users:
+            self._matrices.popitem(last=False)
+        return matrix
+
+    async def search(self, user_id: PydanticObjectId, query: str, limit: int) -> List[Tuple[Dict, float]]:
+        """(entry, cosine similarity) of the `limit` nearest entries, best first"""
+        matrix = await self._matrix(user_id)
+        if not matrix.entries:
+            return []
+        scores = matrix.vectors @ self.embedder.embed(query)
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(matrix.entries[i], float(scores[i])) for i in top if scores[i] > 0]
+
+async def semantic_search(user_id: PydanticObjectId, query: str, limit: int) -> List[SearchHit]:
+    terms = query_terms(query)
+    nearest = await embedding_index.search(user_id, query, limit)
+    summary_ids = [entry["ref_id"] for entry, _ in nearest if entry["kind"] == "summary"]
+    session_ids = [entry["ref_id"] for entry, _ in nearest if entry["kind"] == "session"]
+
+    summaries, sessions = await asyncio.gather(
+        SummaryItem.get_motor_collection().find(
+            {"_id": {"$in": summary_ids}, "user_id": user_id},
+            projection={"summary_text": 1, "original_text": 1, "text_hash": 1}
+        ).to_list(None),
+        ChatSession.get_motor_collection().find(
+            {"_id": {"$in": session_ids}, "user_id": user_id},
+            projection={"title": 1, "meta_summary": 1}
+        ).to_list(None)
+    )
+    documents = {raw["_id"]: raw for raw in summaries + sessions}
+
+    hits = []
+    for entry, score in nearest:
+        raw = documents.get(entry["ref_id"])
+        if raw is None:
+            continue
+        if entry["kind"] == "summary":
+            field, text = _best_field(
+                {"summary_text": raw.get("summary_text"), "original_text": raw.get("original_text")}, terms
+            )
+            hits.append(SearchHit(
+                kind="summary", session_id=entry["session_id"], summary_id=entry["ref_id"],
+                score=score, text=text, field=field, text_hash=_stored_text_hash(raw)
+            ))
+        else:
+            field, text = _best_field({"title": raw.get("title"), "meta_summary": raw.get("meta_summary")}, terms)
+            hits.append(SearchHit(kind="session", session_id=entry["session_id"], score=score, text=text, field=field))
+    return hits
+
+def fuse_rankings(rankings: List[List[SearchHit]], limit: int, k: int = 60) -> List[SearchHit]:
+    """Reciprocal rank fusion: keyword and cosine scores are not comparable, ranks are"""
+    fused: Dict[Tuple, SearchHit] = {}
+    totals: Dict[Tuple, float] = {}
+    for hits in rankings:
+        for rank, hit in enumerate(hits):
+            key = (hit.kind, hit.summary_id or hit.session_id)
+            fused.setdefault(key, hit)
+            totals[key] = totals.get(key, 0.0) + 1 / (k + rank + 1)
+    ordered = sorted(totals, key=lambda key: -totals[key])[:limit]
+    return [fused[key].copy(update={"score": round(totals[key], 6)}) for key in ordered]
+
+def build_embedding_index() -> Optional[EmbeddingIndex]:
+    if not settings.SEARCH_EMBEDDINGS_ENABLED:
+        return None
+    return EmbeddingIndex(
+        HashingEmbedder(settings.SEARCH_EMBEDDING_DIMENSIONS),
+        max_cached_users=settings.SEARCH_EMBEDDING_CACHE_USERS
+    )
+
+embedding_index = build_embedding_index()
+
+def original_search_terms(original_text: str) -> str:
+    """Distinct words of an original text in order of appearance, at most
+    SEARCH_TERMS_MAX_WORDS, stored on the summary for the keyword text index"""
+    words = dict.fromkeys(content_words(original_text))
+    return " ".join(list(words)[:settings.SEARCH_TERMS_MAX_WORDS])
+
+def summary_search_text(summary_text: str, original_text: str) -> str:
+    return f"{summary_text}\n\n{original_text}"
+
+def session_search_text(title: str, meta_summary: Optional[str]) -> str:
+    return f"{title}\n\n{meta_summary or ''}"
+
+SEARCH_MODES = ("keyword", "semantic", "hybrid")
+
+class SearchPage(BaseModel):
+    hits: List[SearchHit]
+    session_titles: Dict[str, str]
+    terms: List[str]
+    has_more: bool
+
+class SearchService:
+    @staticmethod
+    async def search(user: Principal, query: str, mode: str, limit: int, offset: int) -> SearchPage:
+        """Ranked hits offset..offset+limit over the user's summaries and sessions.
+        Each ranking is computed to depth offset + limit + 1, so paging deeper
+        costs more; depth is capped at SEARCH_MAX_RESULTS."""
+        if mode not in SEARCH_MODES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"mode must be one of {', '.join(SEARCH_MODES)}"
+            )
+        if mode != "keyword" and embedding_index is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Semantic search is disabled on this server"
+            )
+        depth = offset + limit + 1
+        if depth - 1 > settings.SEARCH_MAX_RESULTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"offset + limit may not exceed {settings.SEARCH_MAX_RESULTS}"
+            )
+
+        if mode == "keyword":
+            ranked = await keyword_search(user.id, query, depth)
+        elif mode == "semantic":
+            ranked = await semantic_search(user.id, query, depth)
+        else:
+            rankings = await asyncio.gather(
+                keyword_search(user.id, query, depth),
+                semantic_search(user.id, query, depth)
+            )
+            ranked = fuse_rankings(list(rankings), depth)
+
+        terms = query_terms(query)
+        hits = await _with_stored_texts(ranked[offset:offset + limit], terms)
+        session_ids = list({hit.session_id for hit in hits})
+        sessions = await ChatSession.get_motor_collection().find(
+            {"_id": {"$in": session_ids}, "user_id": user.id},
+            projection={"title": 1}
+        ).to_list(None)
+        return SearchPage(
+            hits=hits,
+            session_titles={str(session["_id"]): session["title"] for session in sessions},
+            terms=terms,
+            has_more=len(ranked) > offset + limit
+        )
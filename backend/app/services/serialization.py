@@ -0,0 +1,223 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from beanie import PydanticObjectId
+from bson import ObjectId
+from app.models import ChatSession, ChatSessionListing, SummaryItem, SummaryJob, SummaryVersion
+from app.services.chat_service import BatchItemOutcome
+from app.services.near_duplicates import NearDuplicateMatch
+from app.services.search import SearchPage, make_snippet
+from app.services.summary_service import DocumentSummary
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+META_SUMMARY_PREVIEW_CHARS = 200
+
+def _default(value: Any) -> Any:
+    # Anything orjson does not know natively: ObjectIds, Pydantic models
+    if isinstance(value, ObjectId):
+        return str(value)
+    return jsonable_encoder(value)
+
+def dumps(content: Any) -> bytes:
+    """JSON-encode response content, with orjson when it is installed. Plain
+    dicts, lists, strings, numbers and datetimes take the fast path."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    encoded = jsonable_encoder(content, custom_encoder={ObjectId: str})
+    return json.dumps(encoded, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded by dumps(). Handlers returning one directly skip
+    FastAPI's response_model validation, so they must build the payload with
+    the converters below, which produce exactly the response schema's shape."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+# Converters from stored models to response payloads. They build plain dicts
+# from already-validated documents instead of constructing response models.
+
+def summary_item(summary: SummaryItem, original_text: str) -> Dict:
+    """A SummaryItemSchema"""
+    return {
+        "id": str(summary.id),
+        "original_text": original_text,
+        "summary_text": summary.summary_text,
+        "parameters": summary.parameters,
+        "created_at": summary.created_at
+    }
+
+def session_detail(session: ChatSession, summaries: List[SummaryItem], original_texts: List[str]) -> Dict:
+    """A ChatSessionResponse"""
+    return {
+        "id": str(session.id),
+        "title": session.title,
+        "summaries": [
+            summary_item(summary, original_text)
+            for summary, original_text in zip(summaries, original_texts)
+        ],
+        "created_at": session.created_at,
+        "updated_at": session.updated_at,
+        "meta_summary": session.meta_summary
+    }
+
+def session_list_item(session: ChatSessionListing) -> Dict:
+    """A ChatSessionListItem"""
+    return {
+        "id": str(session.id),
+        "title": session.title,
+        "summary_count": session.summary_count,
+        "created_at": session.created_at,
+        "updated_at": session.updated_at,
+        "meta_summary_preview": (
+            session.meta_summary[:META_SUMMARY_PREVIEW_CHARS]
+            if session.meta_summary else None
+        )
+    }
+
+def summary_response(
+    session_id: PydanticObjectId,
+    summary_id: PydanticObjectId,
+    original_text: str,
+    summary_text: str,
+    parameters: Dict,
+    created_at: datetime,
+    result: Optional[DocumentSummary] = None
+) -> Dict:
+    """A SummaryResponse; result adds the details of a summary generated by this request"""
+    return {
+        "session_id": str(session_id),
+        "summary_id": str(summary_id),
+        "original_text": original_text,
+        "summary_text": summary_text,
+        "parameters": parameters,
+        "created_at": created_at,
+        "chunk_count": result.chunk_count if result else None,
+        "compression_ratio": result.compression_ratio if result else None,
+        "near_duplicate_of": result.near_duplicate_of if result else None,
+        "similarity": result.similarity if result else None,
+        "timings": result.timings if result else None
+    }
+
+def stored_summary_response(
+    session_id: PydanticObjectId,
+    summary: SummaryItem,
+    original_text: str,
+    result: Optional[DocumentSummary] = None
+) -> Dict:
+    """A SummaryResponse for a stored summary"""
+    return summary_response(
+        session_id, summary.id, original_text, summary.summary_text, summary.parameters, summary.created_at, result
+    )
+
+def summary_versions(
+    session_id: PydanticObjectId,
+    summary: SummaryItem,
+    versions: List[SummaryVersion],
+    original_texts: List[str]
+) -> Dict:
+    """A SummaryVersionList; versions in the order given, newest first"""
+    return {
+        "session_id": str(session_id),
+        "summary_id": str(summary.id),
+        "revision": summary.revision,
+        "versions": [
+            {
+                "revision": version.revision,
+                "original_text": original_text,
+                "summary_text": version.summary_text,
+                "parameters": version.parameters,
+                "replaced_at": version.replaced_at
+            }
+            for version, original_text in zip(versions, original_texts)
+        ]
+    }
+
+def batch_response(session_id: PydanticObjectId, items: List[tuple], outcomes: List[BatchItemOutcome]) -> Dict:
+    """A BatchSummaryResponse for (text, parameters) items and their outcomes"""
+    results = []
+    for index, ((_, parameters), outcome) in enumerate(zip(items, outcomes)):
+        succeeded = outcome.summary_id is not None
+        result = outcome.result if succeeded else None
+        results.append({
+            "index": index,
+            "status": "succeeded" if succeeded else "failed",
+            "summary_id": str(outcome.summary_id) if succeeded else None,
+            "summary_text": result.summary_text if result else None,
+            "parameters": parameters,
+            "chunk_count": result.chunk_count if result else None,
+            "compression_ratio": result.compression_ratio if result else None,
+            "near_duplicate_of": result.near_duplicate_of if result else None,
+            "similarity": result.similarity if result else None,
+            "timings": result.timings if result else None,
+            "error": None if succeeded else outcome.error
+        })
+    succeeded = sum(1 for result in results if result["status"] == "succeeded")
+    return {
+        "session_id": str(session_id),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+def near_duplicate_response(match: Optional[NearDuplicateMatch]) -> Dict:
+    """A NearDuplicateResponse"""
+    if match is None:
+        return {"match": None}
+    return {"match": {
+        "summary_id": str(match.summary.id),
+        "session_id": str(match.summary.session_id),
+        "summary_text": match.summary.summary_text,
+        "similarity": match.similarity
+    }}
+
+def search_response(query: str, mode: str, page: SearchPage, next_offset: Optional[int]) -> Dict:
+    """A SearchResponse"""
+    return {
+        "query": query,
+        "mode": mode,
+        "results": [
+            {
+                "kind": hit.kind,
+                "session_id": str(hit.session_id),
+                "session_title": page.session_titles.get(str(hit.session_id)),
+                "summary_id": str(hit.summary_id) if hit.summary_id else None,
+                "score": round(hit.score, 4),
+                "field": hit.field,
+                "snippet": make_snippet(hit.text, page.terms)
+            }
+            for hit in page.hits
+        ],
+        "next_offset": next_offset
+    }
+
+def summary_job(job: SummaryJob) -> Dict:
+    """A SummaryJobResponse"""
+    return {
+        "job_id": str(job.id),
+        "session_id": str(job.session_id),
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "error": job.error,
+        "summary_id": str(job.summary_id) if job.summary_id else None,
+        "summary_text": job.summary_text,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+def meta_summary_response(session: ChatSession, meta_summary: str, created_at: datetime) -> Dict:
+    """A MetaSummaryResponse"""
+    return {
+        "session_id": str(session.id),
+        "title": session.title,
+        "meta_summary": meta_summary,
+        "created_at": created_at
+    }
@@ -0,0 +1,246 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
+import asyncio
+import httpx
+import logging
+import os
+from app.config import settings
+from app.schemas import SummaryParameters
+from app.services.inference_client import init_inference_client, close_inference_client, get_inference_client
+from app.services.resilience import InferenceError, parse_retry_after
+from app.services.chunking import split_sentences, estimate_tokens, content_words
+
+logger = logging.getLogger(__name__)
+
+class SummarizationBackend:
+    """Turns texts into summaries. SummaryService adds caching and chunking on top."""
+
+    # Identifies the model in summary cache keys
+    model_id: str = ""
+    # Whether a list of inputs costs less than the same number of single calls,
+    # i.e. whether the inference scheduler should coalesce requests
+    supports_batching: bool = False
+    # Batched calls allowed to run at once (0 for no limit)
+    max_in_flight_batches: int = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def summarize(self, text: str, parameters: SummaryParameters) -> str:
+        raise NotImplementedError
+
+    async def summarize_batch(self, texts: List[str], parameters: SummaryParameters) -> List[str]:
+        """Summarize several texts with the same parameters, in order"""
+        return list(await asyncio.gather(*(self.summarize(text, parameters) for text in texts)))
+
+class HuggingFaceAPIBackend(SummarizationBackend):
+    """Remote HuggingFace Inference API (or any endpoint speaking its protocol)"""
+
+    supports_batching = True
+
+    def __init__(self, api_url: str):
+        self.api_url = api_url
+        self.model_id = api_url
+
+    async def start(self) -> None:
+        await init_inference_client()
+
+    async def close(self) -> None:
+        await close_inference_client()
+
+    async def summarize(self, text: str, parameters: SummaryParameters) -> str:
+        return (await self._post(text, parameters))[0]
+
+    async def summarize_batch(self, texts: List[str], parameters: SummaryParameters) -> List[str]:
+        if len(texts) == 1:
+            return await self._post(texts[0], parameters)
+        return await self._post(texts, parameters)
+
+    async def _post(self, inputs: Union[str, List[str]], parameters: SummaryParameters) -> List[str]:
+        # The API accepts one text or a list, and answers with one result per text
+        expected = len(inputs) if isinstance(inputs, list) else 1
+        payload = {
+            "inputs": inputs,
+            "parameters": parameters.generation_parameters()
+        }
+
+        # Shared pooled client; auth header and timeouts are configured on the client
+        client = get_inference_client()
+        try:
+            response = await client.post(self.api_url, json=payload)
+        except httpx.TimeoutException as e:
+            raise InferenceError("timeout", f"HuggingFace API timed out: {type(e).__name__}")
+        except httpx.HTTPError as e:
+            raise InferenceError("connection", f"HuggingFace API request failed: {str(e) or type(e).__name__}")
+        if response.status_code >= 400:
+            raise _response_error(response)
+
+        try:
+            summaries = [result["summary_text"] for result in response.json()]
+        except (ValueError, KeyError, TypeError):
+            raise InferenceError("invalid_response", f"HuggingFace API returned an unexpected body: {response.text[:200]}")
+        if len(summaries) != expected:
+            raise InferenceError(
+                "invalid_response", f"HuggingFace API returned {len(summaries)} results for {expected} inputs"
+            )
+        return summaries
+
+def _response_error(response: httpx.Response) -> InferenceError:
+    """Classify an error response of the HuggingFace API"""
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        body = {}
+    message = f"HuggingFace API returned {response.status_code}: {body.get('error') or response.text[:200]}"
+    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+    if response.status_code == 503 and body.get("estimated_time") is not None:
+        # The model is being loaded; estimated_time is the expected wait in seconds
+        return InferenceError("model_loading", message, retry_after=float(body["estimated_time"]))
+    if response.status_code == 429:
+        return InferenceError("rate_limited", message, retry_after=retry_after)
+    if response.status_code == 408:
+        return InferenceError("timeout", message, retry_after=retry_after)
+    if response.status_code >= 500:
+        return InferenceError("unavailable", message, retry_after=retry_after)
+    return InferenceError("bad_request", message)
+
+# Set in each local engine worker process by _load_local_model
+_local_pipeline = None
+
+def _load_local_model(model_dir: str) -> None:
+    global _local_pipeline
+    # Imported here so the API does not need transformers unless the local engine is used
+    from transformers import pipeline
+    try:
+        import torch
+        # One process per core already; intra-op threads would only oversubscribe the CPU
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    _local_pipeline = pipeline("summarization", model=model_dir, tokenizer=model_dir, device=-1)
+
+def _run_local_batch(texts: List[str], parameters: Dict) -> List[str]:
+    outputs = _local_pipeline(texts, truncation=True, batch_size=len(texts), **parameters)
+    return [output["summary_text"] for output in outputs]
+
+class LocalModelBackend(SummarizationBackend):
+    """Runs a seq2seq model from a local directory in a pool of worker processes,
+    one batched pipeline call per worker at a time. Batches are formed by the
+    inference scheduler."""
+
+    supports_batching = True
+
+    def __init__(self, model_dir: str, workers: int):
+        self.model_dir = model_dir
+        self.model_id = f"local:{os.path.abspath(model_dir)}"
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight_batches = self.workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._start_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._pool is not None:
+                return
+            if not os.path.isdir(self.model_dir):
+                raise RuntimeError(f"LOCAL_MODEL_DIR {self.model_dir!r} is not a directory")
+            try:
+                import transformers  # noqa: F401
+            except ImportError:
+                raise RuntimeError("The local summarization engine needs transformers and torch installed")
+
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_load_local_model,
+                initargs=(self.model_dir,)
+            )
+            if settings.LOCAL_MODEL_WARMUP:
+                await self._warm_up()
+            logger.info(f"Local summarization engine started with {self.workers} workers")
+
+    async def _warm_up(self) -> None:
+        # One call per worker makes every process spawn, load the model and run it once
+        loop = asyncio.get_running_loop()
+        text = "Warm-up sentence for the local summarization engine. " * 8
+        parameters = {"min_length": 5, "max_length": 20, "do_sample": False}
+        await asyncio.gather(*(
+            loop.run_in_executor(self._pool, _run_local_batch, [text], parameters)
+            for _ in range(self.workers)
+        ))
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def summarize(self, text: str, parameters: SummaryParameters) -> str:
+        return (await self.summarize_batch([text], parameters))[0]
+
+    async def summarize_batch(self, texts: List[str], parameters: SummaryParameters) -> List[str]:
+        if self._pool is None:
+            await self.start()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._pool, _run_local_batch, texts, parameters.generation_parameters()
+            )
+        except Exception as e:
+            # Not retried: the same input fails the same way, and a broken pool stays broken
+            raise InferenceError("engine_error", f"Local summarization engine error: {str(e)}")
+
+class ExtractiveBackend(SummarizationBackend):
+    """Deterministic frequency-based sentence extraction, for tests and offline use.
+
+    Sentences are scored by the average document frequency of their content words
+    and the best ones are returned in their original order, until max_length
+    (estimated) tokens are used.
+    """
+
+    model_id = "extractive"
+
+    async def summarize(self, text: str, parameters: SummaryParameters) -> str:
+        sentences = [sentence for paragraph in split_sentences(text) for sentence in paragraph]
+        if not sentences:
+            return ""
+
+        words_per_sentence = [content_words(sentence) for sentence in sentences]
+        frequency: Dict[str, int] = {}
+        for words in words_per_sentence:
+            for word in words:
+                frequency[word] = frequency.get(word, 0) + 1
+
+        scores = [
+            sum(frequency[word] for word in words) / len(words) if words else 0.0
+            for words in words_per_sentence
+        ]
+        ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+
+        selected, used_tokens = [], 0
+        for i in ranked:
+            tokens = estimate_tokens(sentences[i])
+            if selected and used_tokens + tokens > parameters.max_length:
+                if used_tokens >= parameters.min_length:
+                    break
+                continue
+            selected.append(i)
+            used_tokens += tokens
+        return " ".join(sentences[i] for i in sorted(selected))
+
+def build_summarization_backend() -> SummarizationBackend:
+    backend_name = settings.SUMMARY_BACKEND.lower()
+    if backend_name == "huggingface":
+        return HuggingFaceAPIBackend(settings.HUGGINGFACE_API_URL)
+    if backend_name == "local":
+        if not settings.LOCAL_MODEL_DIR:
+            raise ValueError("SUMMARY_BACKEND=local requires LOCAL_MODEL_DIR")
+        return LocalModelBackend(settings.LOCAL_MODEL_DIR, workers=settings.LOCAL_MODEL_WORKERS)
+    if backend_name == "extractive":
+        return ExtractiveBackend()
+    raise ValueError(f"Unknown SUMMARY_BACKEND: {settings.SUMMARY_BACKEND}")
+
+summarization_backend = build_summarization_backend()
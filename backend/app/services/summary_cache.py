@@ -0,0 +1,158 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.models import SummaryCacheEntry
+from app.schemas import SummaryParameters
+from app.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a text share a key"""
+    return " ".join(text.split())
+
+def make_cache_key(text: str, parameters: SummaryParameters, model_url: str) -> str:
+    material = json.dumps(
+        {
+            "text": normalize_text(text),
+            "parameters": parameters.generation_parameters(),
+            "model": model_url
+        },
+        sort_keys=True
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+class CacheBackend:
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, key: str, summary_text: str) -> None:
+        raise NotImplementedError
+
+    def size(self) -> Optional[int]:
+        return None
+
+class InMemoryLRUCache(CacheBackend):
+    """Per-process LRU with size and TTL eviction"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, summary_text = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return summary_text
+
+    async def set(self, key: str, summary_text: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, summary_text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+class MongoSummaryCache(CacheBackend):
+    """Cache shared by all workers, expired by a TTL index on the collection"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = await SummaryCacheEntry.find_one(SummaryCacheEntry.key == key)
+        # The TTL monitor only runs periodically, so check expiry ourselves
+        if entry is None or entry.expires_at < datetime.utcnow():
+            return None
+        return entry.summary_text
+
+    async def set(self, key: str, summary_text: str) -> None:
+        now = datetime.utcnow()
+        await SummaryCacheEntry.get_motor_collection().update_one(
+            {"key": key},
+            {"$set": {
+                "summary_text": summary_text,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds)
+            }},
+            upsert=True
+        )
+
+class SummaryCache:
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def is_cacheable(self, parameters: SummaryParameters) -> bool:
+        # Sampled output is meant to differ between calls
+        return self.enabled and not parameters.do_sample
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            summary_text = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Summary cache lookup failed: {str(e)}")
+            summary_text = None
+
+        if summary_text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return summary_text
+
+    async def set(self, key: str, summary_text: str) -> None:
+        try:
+            await self.backend.set(key, summary_text)
+        except Exception as e:
+            logger.warning(f"Summary cache store failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": settings.SUMMARY_CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.backend.size() if self.backend else None
+        }
+
+def build_summary_cache() -> SummaryCache:
+    backend_name = settings.SUMMARY_CACHE_BACKEND.lower()
+    if backend_name == "memory":
+        backend = InMemoryLRUCache(
+            max_entries=settings.SUMMARY_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SUMMARY_CACHE_TTL_SECONDS
+        )
+    elif backend_name == "mongo":
+        backend = MongoSummaryCache(ttl_seconds=settings.SUMMARY_CACHE_TTL_SECONDS)
+    elif backend_name == "none":
+        backend = None
+    else:
+        raise ValueError(f"Unknown SUMMARY_CACHE_BACKEND: {settings.SUMMARY_CACHE_BACKEND}")
+    return SummaryCache(backend)
+
+summary_cache = build_summary_cache()
+metrics.callback(
+    "summary_cache_lookups_total", "Summary cache lookups by result", "counter",
+    lambda: {("hit",): summary_cache.hits, ("miss",): summary_cache.misses, ("bypassed",): summary_cache.bypassed},
+    ("result",)
+)
@@ -1,15 +1,46 @@
 from fastapi import HTTPException, status
-import requests
+from pydantic import BaseModel, Field
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
 import logging
+import time
 from app.config import settings
-from app.models import User, SummaryItem
+from app.models import User
 from app.schemas import SummaryParameters
+from app.services.summarization_backends import summarization_backend
+from app.services.inference_scheduler import inference_scheduler
+from app.services.summary_cache import summary_cache, make_cache_key
+from app.services.tracing import span
+from app.services.chunking import chunk_text, estimate_tokens
+from app.services.precompression import compress_text
 
 logger = logging.getLogger(__name__)
 
+class DocumentSummary(BaseModel):
+    summary_text: str
+    chunk_count: int = 1
+    reduce_rounds: int = 0
+    # Compressed / original estimated tokens, when extractive pre-compression ran
+    compression_ratio: Optional[float] = None
+    # Set when the summary of a near-duplicate text was reused instead of the model
+    near_duplicate_of: Optional[str] = None
+    similarity: Optional[float] = None
+    # Wall-clock milliseconds per pipeline stage
+    timings: Dict[str, float] = Field(default_factory=dict)
+
+# Receives (event name, event data) as the pipeline advances
+ProgressCallback = Callable[[str, Dict], Awaitable[None]]
+
+async def _report(on_progress: Optional[ProgressCallback], event: str, data: Dict) -> None:
+    if on_progress is not None:
+        await on_progress(event, data)
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
 class SummaryService:
     @staticmethod
-    async def create_summary(user: User, text: str, parameters: SummaryParameters) -> SummaryItem:
+    async def create_summary(user: User, text: str, parameters: SummaryParameters) -> DocumentSummary:
         if len(text.strip()) < 100:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -17,18 +48,11 @@ class SummaryService:
             )
         
         try:
-            # Call HuggingFace API to generate summary
-            summary_text = await SummaryService._call_huggingface_api(text, parameters)
-            
-            # Create and return a summary item (without saving it)
-            summary_item = SummaryItem(
-                original_text=text,
-                summary_text=summary_text,
-                parameters=parameters.dict()
-            )
-            
-            return summary_item
+            # Generate summary (without saving it)
+            return await SummaryService.summarize_document(text, parameters)
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Summary generation error: {str(e)}")
             raise HTTPException(
@@ -37,39 +61,152 @@ class SummaryService:
             )
     
     @staticmethod
-    async def _call_huggingface_api(text: str, parameters: SummaryParameters) -> str:
-        try:
-            # Check if HUGGINGFACE_API_URL is defined in settings
-            if not hasattr(settings, 'HUGGINGFACE_API_URL'):
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="HUGGINGFACE_API_URL not configured"
-                )
-                
-            headers = {
-                "Authorization": f"Bearer {settings.HF_TOKEN}"
-            }
-            
-            payload = {
-                "inputs": text,
-                "parameters": {
-                    "min_length": parameters.min_length,
-                    "max_length": parameters.max_length,
-                    "do_sample": parameters.do_sample
-                }
-            }
-            
-            response = requests.post(
-                settings.HUGGINGFACE_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=30
+    async def summarize_text(text: str, parameters: SummaryParameters) -> str:
+        """Summarize text, serving repeated (text, parameters, model) requests from the cache"""
+        if not summary_cache.is_cacheable(parameters):
+            summary_cache.bypassed += 1
+            with span("inference"):
+                return await inference_scheduler.submit(text, parameters)
+
+        key = make_cache_key(text, parameters, summarization_backend.model_id)
+        cached = await summary_cache.get(key)
+        if cached is not None:
+            return cached
+
+        with span("inference"):
+            summary_text = await inference_scheduler.submit(text, parameters)
+        await summary_cache.set(key, summary_text)
+        return summary_text
+
+    @staticmethod
+    async def _summarize_chunks(
+        chunks: List[str],
+        parameters: SummaryParameters,
+        on_progress: Optional[ProgressCallback] = None,
+        stage: str = "map"
+    ) -> List[str]:
+        # Bounded fan-out so one long document cannot monopolize the inference pool
+        semaphore = asyncio.Semaphore(settings.CHUNK_MAX_CONCURRENCY)
+        completed = 0
+
+        async def summarize_one(index: int, chunk: str) -> str:
+            nonlocal completed
+            async with semaphore:
+                summary_text = await SummaryService.summarize_text(chunk, parameters)
+            completed += 1
+            await _report(on_progress, "chunk", {
+                "stage": stage,
+                "index": index + 1,
+                "completed": completed,
+                "total": len(chunks),
+                "summary_text": summary_text
+            })
+            return summary_text
+
+        return await asyncio.gather(*(summarize_one(i, chunk) for i, chunk in enumerate(chunks)))
+
+    @staticmethod
+    def _partial_parameters(parameters: SummaryParameters) -> SummaryParameters:
+        """Parameters for chunk summaries, short enough that CHUNK_REDUCE_FAN_IN of
+        them fit in one model call whatever max_length was requested"""
+        max_length = max(50, settings.CHUNK_MAX_TOKENS // max(1, settings.CHUNK_REDUCE_FAN_IN))
+        if parameters.max_length <= max_length:
+            return parameters
+        return parameters.copy(update={
+            "max_length": max_length,
+            "min_length": min(parameters.min_length, max_length // 2)
+        })
+
+    @staticmethod
+    async def summarize_document(
+        text: str,
+        parameters: SummaryParameters,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> DocumentSummary:
+        """Summarize text of any length.
+
+        Text within the model's token budget is summarized directly. Longer text is
+        split into overlapping sentence-aligned chunks which are summarized concurrently
+        (map), then the chunk summaries are combined and summarized again (reduce),
+        recursively until they fit in a single call. Chunk summaries are kept short
+        (see _partial_parameters) so every round shrinks the text; if it still does
+        not fit after CHUNK_MAX_REDUCE_ROUNDS rounds the request fails with 422.
+
+        With parameters.compression_ratio set, text of at least PRECOMPRESS_MIN_TOKENS
+        is first cut down to its highest scoring sentences (see precompression).
+
+        on_progress, if given, is awaited with "compressed", "chunked", "chunk" and
+        "reduce" events.
+        """
+        total_start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        compression_ratio = None
+
+        if (parameters.compression_ratio is not None
+                and estimate_tokens(text) >= settings.PRECOMPRESS_MIN_TOKENS):
+            start = time.perf_counter()
+            compressed = compress_text(text, parameters.compression_ratio)
+            timings["compression_ms"] = _elapsed_ms(start)
+            text = compressed.text
+            compression_ratio = compressed.ratio
+            await _report(on_progress, "compressed", {
+                "original_tokens": compressed.original_tokens,
+                "compressed_tokens": compressed.compressed_tokens,
+                "kept_sentences": compressed.kept_sentences,
+                "total_sentences": compressed.total_sentences,
+                "compression_ratio": compression_ratio
+            })
+
+        if estimate_tokens(text) <= settings.CHUNK_MAX_TOKENS:
+            await _report(on_progress, "chunked", {"chunk_count": 1})
+            start = time.perf_counter()
+            summary_text = await SummaryService.summarize_text(text, parameters)
+            timings["inference_ms"] = _elapsed_ms(start)
+            timings["total_ms"] = _elapsed_ms(total_start)
+            return DocumentSummary(
+                summary_text=summary_text,
+                compression_ratio=compression_ratio,
+                timings=timings
             )
-            response.raise_for_status()
-            return response.json()[0]['summary_text']
-        except requests.exceptions.RequestException as e:
-            logger.error(f"HuggingFace API error: {str(e)}")
+
+        start = time.perf_counter()
+        chunks = chunk_text(text, settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS)
+        timings["chunking_ms"] = _elapsed_ms(start)
+        await _report(on_progress, "chunked", {"chunk_count": len(chunks)})
+
+        partial_parameters = SummaryService._partial_parameters(parameters)
+        start = time.perf_counter()
+        partials = await SummaryService._summarize_chunks(chunks, partial_parameters, on_progress)
+        timings["map_ms"] = _elapsed_ms(start)
+
+        start = time.perf_counter()
+        combined = "\n\n".join(partials)
+        reduce_rounds = 0
+        while (estimate_tokens(combined) > settings.CHUNK_MAX_TOKENS
+               and reduce_rounds < settings.CHUNK_MAX_REDUCE_ROUNDS):
+            reduce_rounds += 1
+            reduce_chunks = chunk_text(combined, settings.CHUNK_MAX_TOKENS)
+            await _report(on_progress, "reduce", {"round": reduce_rounds, "chunk_count": len(reduce_chunks)})
+            combined = "\n\n".join(await SummaryService._summarize_chunks(
+                reduce_chunks, partial_parameters, on_progress, stage="reduce"
+            ))
+
+        if estimate_tokens(combined) > settings.CHUNK_MAX_TOKENS:
             raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Summary service temporarily unavailable"
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Text is too long to summarize in {settings.CHUNK_MAX_REDUCE_ROUNDS} reduce rounds"
             )
+
+        await _report(on_progress, "reduce", {"round": reduce_rounds + 1, "chunk_count": 1})
+        summary_text = await SummaryService.summarize_text(combined, parameters)
+        timings["reduce_ms"] = _elapsed_ms(start)
+        timings["total_ms"] = _elapsed_ms(total_start)
+
+        return DocumentSummary(
+            summary_text=summary_text,
+            chunk_count=len(chunks),
+            reduce_rounds=reduce_rounds + 1,
+            compression_ratio=compression_ratio,
+            timings=timings
+        )
+
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import logging
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+from app.config import settings
+from app.models import StoredText
+
+logger = logging.getLogger(__name__)
+
+GRIDFS_BUCKET = "text_blobs"
+# Larger texts are compressed off the event loop
+THREAD_COMPRESSION_BYTES = 64 * 1024
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class TextStore:
+    """Content-addressed store for original texts. Each distinct text is kept once,
+    compressed, with a count of the summaries and versions referencing it.
+
+    Every reference is taken before the document holding it is written and
+    released after that document no longer holds it, so a text is never removed
+    while referenced. A crash in between can only leave a count too high, which
+    scripts.migrate_text_store --recount corrects.
+    """
+
+    def __init__(self, compression_level: int, gridfs_threshold: int):
+        self.compression_level = compression_level
+        self.gridfs_threshold = gridfs_threshold
+
+    @staticmethod
+    def _collection():
+        return StoredText.get_motor_collection()
+
+    def _bucket(self) -> AsyncIOMotorGridFSBucket:
+        return AsyncIOMotorGridFSBucket(self._collection().database, bucket_name=GRIDFS_BUCKET)
+
+    async def put(self, text: str) -> str:
+        """Store the text unless already present, and take one reference to it.
+        Returns its hash."""
+        digest = text_hash(text)
+        texts = self._collection()
+        existing = await texts.find_one_and_update(
+            {"text_hash": digest}, {"$inc": {"refcount": 1}}, projection={"_id": 1}
+        )
+        if existing is not None:
+            return digest
+
+        encoded = text.encode("utf-8")
+        if len(encoded) > THREAD_COMPRESSION_BYTES:
+            data = await asyncio.to_thread(zlib.compress, encoded, self.compression_level)
+        else:
+            data = zlib.compress(encoded, self.compression_level)
+        fields = {"length": len(text), "compressed_size": len(data), "created_at": datetime.utcnow()}
+        gridfs_id = None
+        if len(data) > self.gridfs_threshold:
+            gridfs_id = await self._bucket().upload_from_stream(digest, data)
+            fields["gridfs_id"] = gridfs_id
+        else:
+            fields["data"] = data
+
+        result = await texts.update_one(
+            {"text_hash": digest},
+            {"$inc": {"refcount": 1}, "$setOnInsert": fields},
+            upsert=True
+        )
+        if result.upserted_id is None and gridfs_id is not None:
+            # Another request stored the same text in the meantime
+            await self._bucket().delete(gridfs_id)
+        return digest
+
+    async def adjust(self, deltas: Mapping[str, int]) -> None:
+        """Add or release references by hash; texts left unreferenced are removed"""
+        texts = self._collection()
+        for digest, delta in deltas.items():
+            if not delta:
+                continue
+            updated = await texts.find_one_and_update(
+                {"text_hash": digest},
+                {"$inc": {"refcount": delta}},
+                projection={"refcount": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated is None or updated["refcount"] > 0:
+                continue
+            # Only removed if nobody took a new reference since the decrement
+            removed = await texts.find_one_and_delete(
+                {"text_hash": digest, "refcount": {"$lte": 0}}, projection={"gridfs_id": 1}
+            )
+            if removed is not None and removed.get("gridfs_id") is not None:
+                await self._bucket().delete(removed["gridfs_id"])
+
+    async def release(self, hashes: Iterable[Optional[str]]) -> None:
+        """Release one reference per occurrence of each hash"""
+        counts = Counter(digest for digest in hashes if digest)
+        await self.adjust({digest: -count for digest, count in counts.items()})
+
+    async def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """Texts by hash, fetched in one query; unknown hashes are left out"""
+        wanted = list({digest for digest in hashes if digest})
+        if not wanted:
+            return {}
+        stored = await self._collection().find(
+            {"text_hash": {"$in": wanted}}, projection={"text_hash": 1, "data": 1, "gridfs_id": 1}
+        ).to_list(None)
+
+        texts = {}
+        for raw in stored:
+            data = raw.get("data")
+            if data is None:
+                stream = await self._bucket().open_download_stream(raw["gridfs_id"])
+                data = await stream.read()
+            texts[raw["text_hash"]] = zlib.decompress(data).decode("utf-8")
+        missing = len(wanted) - len(texts)
+        if missing:
+            logger.warning(f"{missing} referenced texts are missing from the text store")
+        return texts
+
+    async def get(self, digest: str) -> Optional[str]:
+        return (await self.get_many([digest])).get(digest)
+
+    async def recount(self, references: Mapping[str, int]) -> Tuple[int, int]:
+        """Set every reference count from a full count of the references held,
+        removing unreferenced texts. Returns (counts corrected, texts removed).
+        Only safe while nothing else writes summaries."""
+        texts = self._collection()
+        corrected = removed = 0
+        async for raw in texts.find({}, projection={"text_hash": 1, "refcount": 1, "gridfs_id": 1}):
+            count = references.get(raw["text_hash"], 0)
+            if count <= 0:
+                await texts.delete_one({"_id": raw["_id"]})
+                if raw.get("gridfs_id") is not None:
+                    await self._bucket().delete(raw["gridfs_id"])
+                removed += 1
+            elif raw["refcount"] != count:
+                await texts.update_one({"_id": raw["_id"]}, {"$set": {"refcount": count}})
+                corrected += 1
+        return corrected, removed
+
+def build_text_store() -> TextStore:
+    return TextStore(
+        compression_level=settings.TEXT_STORE_COMPRESSION_LEVEL,
+        gridfs_threshold=settings.TEXT_STORE_GRIDFS_THRESHOLD_BYTES
+    )
+
+text_store = build_text_store()
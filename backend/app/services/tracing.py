@@ -0,0 +1,138 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional
+from fastapi.routing import APIRoute
+from app.services.metrics import HistogramFamily, STAGE_SECONDS
+
+class Trace:
+    """Span durations of one request, summed per span name"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.spans: Dict[str, List[float]] = {}  # name -> [seconds, count]
+        self.endpoint_finished_at: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            span[0] += seconds
+            span[1] += 1
+
+    def server_timing(self) -> str:
+        """Server-Timing header value; spans may overlap, total is the time so far"""
+        entries = [
+            f'{name};dur={seconds * 1000:.2f}' + (f';desc="{count} calls"' if count > 1 else "")
+            for name, (seconds, count) in self.spans.items()
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.2f}")
+        return ", ".join(entries)
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def start_trace() -> Trace:
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+def record_span(name: str, seconds: float) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a stage of the current request, for its Server-Timing header and the
+    request_stage_duration_seconds histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, name)
+        record_span(name, elapsed)
+
+_READ_PREFIXES = ("get_", "find_")
+
+def traced_operation(histogram: HistogramFamily):
+    """Decorator for data access functions: observes the duration labelled with the
+    function name, and adds it to the request's db_read or db_write span"""
+    def decorator(function):
+        name = function.__name__
+        span_name = "db_read" if name.startswith(_READ_PREFIXES) else "db_write"
+
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                histogram.observe(elapsed, name)
+                record_span(span_name, elapsed)
+        return wrapper
+    return decorator
+
+def _mark_endpoint_finished(endpoint: Callable) -> Callable:
+    # include_router builds the router's routes again from their (wrapped) endpoints
+    if not asyncio.iscoroutinefunction(endpoint) or getattr(endpoint, "_marks_endpoint_finished", False):
+        return endpoint
+
+    # wraps() keeps the signature FastAPI reads parameters and dependencies from
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.endpoint_finished_at = time.perf_counter()
+        return result
+    wrapper._marks_endpoint_finished = True
+    return wrapper
+
+class TracedRoute(APIRoute):
+    """Route class that adds a "serialize" span: the time from the endpoint returning
+    to the response being built (response_model validation, encoding, rendering)"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _mark_endpoint_finished(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def traced_handler(request):
+            response = await handler(request)
+            trace = _current_trace.get()
+            if trace is not None and trace.endpoint_finished_at is not None:
+                trace.add("serialize", time.perf_counter() - trace.endpoint_finished_at)
+            return response
+        return traced_handler
+
+class TracingMiddleware:
+    """ASGI middleware that starts a trace per request and returns its spans in a
+    Server-Timing header. Streaming responses report the spans up to their first byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = start_trace()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
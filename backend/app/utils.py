@@ -1,18 +1,24 @@
-from passlib.context import CryptContext
+from beanie import PydanticObjectId
+from bson.errors import InvalidId
+import base64
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from fastapi import HTTPException, status, Cookie, Request
+from fastapi import HTTPException, status, Cookie, Depends, Request
 from app.config import settings
-from app.models import User
-from typing import Optional
+from app.models import User, Principal
+from app.services.principal_cache import principal_cache
+from app.services.password_hasher import password_hasher
+from app.services.tracing import span
+from typing import Optional, Tuple
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(matches, replacement hash if the stored one uses an outdated work factor)"""
+    with span("password_hash"):
+        return await password_hasher.verify(plain_password, hashed_password)
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    with span("password_hash"):
+        return await password_hasher.hash(password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -24,7 +30,22 @@ def create_access_token(data: dict):
         algorithm=settings.ALGORITHM
     )
 
-async def get_current_user(request: Request, access_token: Optional[str] = Cookie(None)) -> User:
+def encode_cursor(updated_at: datetime, document_id: PydanticObjectId) -> str:
+    raw = f"{updated_at.isoformat()}|{document_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, PydanticObjectId]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        updated_at, document_id = raw.split("|")
+        return datetime.fromisoformat(updated_at), PydanticObjectId(document_id)
+    except (ValueError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _get_token_subject(access_token: Optional[str]) -> str:
     if not access_token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,11 +65,52 @@ async def get_current_user(request: Request, access_token: Optional[str] = Cooki
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
-    
-    user = await User.find_one(User.email == email)
+    return email
+
+async def get_current_user(request: Request, access_token: Optional[str] = Cookie(None)) -> User:
+    """Full user document, for endpoints that modify the user itself"""
+    with span("auth"):
+        email = _get_token_subject(access_token)
+        user = await User.find_one(User.email == email)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-    return user
\ No newline at end of file
+    principal_cache.set(email, Principal(id=user.id, email=user.email, is_active=user.is_active))
+    return user
+
+async def get_current_principal(request: Request, access_token: Optional[str] = Cookie(None)) -> Principal:
+    """Authenticated caller identity, served from the principal cache when possible"""
+    with span("auth"):
+        email = _get_token_subject(access_token)
+        principal = principal_cache.get(email)
+        if principal is None:
+            principal = await User.find_one(User.email == email, projection_model=Principal)
+            if principal is not None:
+                principal_cache.set(email, principal)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    return principal
+
+def is_admin(email: Optional[str]) -> bool:
+    return email is not None and email.lower() in {admin.lower() for admin in settings.ADMIN_EMAILS}
+
+def get_admin_subject(access_token: Optional[str]) -> Optional[str]:
+    """Email of a valid admin token, or None; for middleware, where raising is not an option"""
+    try:
+        email = _get_token_subject(access_token)
+    except HTTPException:
+        return None
+    return email if is_admin(email) else None
+
+async def get_admin_principal(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if not is_admin(principal.email):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return principal
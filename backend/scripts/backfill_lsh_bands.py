@@ -0,0 +1,63 @@
+"""Compute near-duplicate LSH band keys for summaries that lack them.
+
+Summaries stored before near-duplicate detection existed (or after the
+MinHash settings in app/services/near_duplicates.py changed, with --all)
+are fingerprinted so later lookups can find them:
+    python -m scripts.backfill_lsh_bands [--all] [--batch-size 500]
+"""
+import argparse
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+
+from app.database import init_db
+from app.models import SummaryItem
+from app.services.near_duplicates import TextFingerprint
+from app.services.text_store import text_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main(recompute_all: bool, batch_size: int) -> None:
+    await init_db()
+    summaries = SummaryItem.get_motor_collection()
+    criteria = {} if recompute_all else {"lsh_bands": None}
+
+    async def write(batch: list) -> None:
+        # Texts in the text store are fetched once per batch
+        stored = await text_store.get_many(raw.get("text_hash") for raw in batch if raw.get("original_text") is None)
+        operations = []
+        for raw in batch:
+            text = raw.get("original_text")
+            if text is None:
+                text = stored.get(raw.get("text_hash"))
+            if text is not None:
+                operations.append(UpdateOne(
+                    {"_id": raw["_id"]},
+                    {"$set": {"lsh_bands": TextFingerprint(text).bands}}
+                ))
+        if operations:
+            await summaries.bulk_write(operations, ordered=False)
+
+    updated = 0
+    batch = []
+    async for raw in summaries.find(criteria, projection={"original_text": 1, "text_hash": 1}):
+        batch.append(raw)
+        if len(batch) >= batch_size:
+            await write(batch)
+            updated += len(batch)
+            batch = []
+            logger.info(f"Fingerprinted {updated} summaries")
+    if batch:
+        await write(batch)
+        updated += len(batch)
+
+    logger.info(f"Done: fingerprinted {updated} summaries")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="Recompute every summary, not only missing ones")
+    parser.add_argument("--batch-size", type=int, default=500, help="Updates per bulk write")
+    args = parser.parse_args()
+    asyncio.run(main(args.all, args.batch_size))
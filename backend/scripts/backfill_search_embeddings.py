@@ -0,0 +1,65 @@
+"""Compute semantic search vectors for summaries and sessions that lack them.
+
+Data stored before semantic search existed (or every document, with --all,
+after SEARCH_EMBEDDING_DIMENSIONS or the embedder changed) is embedded so
+GET /chat/search?mode=semantic can find it:
+    python -m scripts.backfill_search_embeddings [--all]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.database import init_db
+from app.models import ChatSession, SearchEmbedding, SummaryItem
+from app.services.search import embedding_index, session_search_text, summary_search_text
+from app.services.text_store import text_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main(recompute_all: bool) -> int:
+    if embedding_index is None:
+        logger.error("SEARCH_EMBEDDINGS_ENABLED is off; nothing to do")
+        return 1
+    await init_db()
+
+    existing = set()
+    if not recompute_all:
+        async for raw in SearchEmbedding.get_motor_collection().find({}, projection={"ref_id": 1}):
+            existing.add(raw["ref_id"])
+
+    sessions = 0
+    async for raw in ChatSession.get_motor_collection().find({}, projection={"user_id": 1, "title": 1, "meta_summary": 1}):
+        if raw["_id"] in existing:
+            continue
+        await embedding_index.index(
+            raw["user_id"], "session", raw["_id"], raw["_id"],
+            session_search_text(raw["title"], raw.get("meta_summary"))
+        )
+        sessions += 1
+
+    summaries = 0
+    projection = {"user_id": 1, "session_id": 1, "summary_text": 1, "original_text": 1, "text_hash": 1}
+    async for raw in SummaryItem.get_motor_collection().find({}, projection=projection):
+        if raw["_id"] in existing:
+            continue
+        original_text = raw.get("original_text")
+        if original_text is None:
+            original_text = await text_store.get(raw["text_hash"]) or ""
+        await embedding_index.index(
+            raw["user_id"], "summary", raw["_id"], raw["session_id"],
+            summary_search_text(raw["summary_text"], original_text)
+        )
+        summaries += 1
+        if summaries % 1000 == 0:
+            logger.info(f"Embedded {summaries} summaries")
+
+    logger.info(f"Done: embedded {sessions} sessions and {summaries} summaries")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--all", action="store_true", help="Recompute every vector, not only missing ones")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.all)))
@@ -0,0 +1,124 @@
+"""Measure login throughput and event loop latency under concurrent logins.
+
+A probe task sleeps 5 ms in a loop and records how late it wakes up, while
+--concurrency coroutines verify a bcrypt password --logins times in total.
+Hashing inline (as the API did before the hashing pool) and through the pool
+are compared; with the pool the probe delay should stay near zero.
+
+    python -m scripts.benchmark_logins --logins 200 --concurrency 50 --rounds 12
+
+With --url the same probe runs against GET /health of a running server while
+logins go to POST /auth/login, using an account created with --email/--password:
+
+    python -m scripts.benchmark_logins --url http://localhost:8000 --email a@b.co --password secret123
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from app.services.password_hasher import PasswordHasher
+
+PROBE_INTERVAL = 0.005
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+async def _probe_loop(delays: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        delays.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+async def _probe_http(client: httpx.AsyncClient, delays: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        delays.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(PROBE_INTERVAL)
+
+async def run(
+    name: str,
+    login: Callable[[], Awaitable[None]],
+    probe: Callable[[List[float], asyncio.Event], Awaitable[None]],
+    logins: int,
+    concurrency: int
+) -> Dict:
+    delays: List[float] = []
+    stop = asyncio.Event()
+    remaining = iter(range(logins))
+
+    async def worker():
+        for _ in remaining:
+            await login()
+
+    probe_task = asyncio.create_task(probe(delays, stop))
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    return {
+        "variant": name,
+        "logins": logins,
+        "seconds": round(elapsed, 2),
+        "logins_per_second": round(logins / elapsed, 1),
+        "probe_p50_ms": round(statistics.median(delays), 2) if delays else 0.0,
+        "probe_p99_ms": round(_percentile(delays, 0.99), 2),
+        "probe_max_ms": round(max(delays), 2) if delays else 0.0
+    }
+
+async def main(args) -> int:
+    report = []
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            async def login():
+                response = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+                response.raise_for_status()
+            report.append(await run(
+                "server", login, lambda d, s: _probe_http(client, d, s), args.logins, args.concurrency
+            ))
+    else:
+        hasher = PasswordHasher(rounds=args.rounds, workers=args.workers)
+        stored = hasher.context.hash(args.password)
+
+        async def inline_login():
+            hasher.context.verify_and_update(args.password, stored)
+
+        async def pooled_login():
+            await hasher.verify(args.password, stored)
+
+        report.append(await run("inline", inline_login, _probe_loop, args.logins, args.concurrency))
+        report.append(await run("pool", pooled_login, _probe_loop, args.logins, args.concurrency))
+        hasher.close()
+
+    print(f"{'variant':<8} {'logins':>7} {'seconds':>8} {'logins/s':>9} {'probe p50':>10} {'p99':>8} {'max':>8}")
+    for row in report:
+        print(
+            f"{row['variant']:<8} {row['logins']:>7} {row['seconds']:>8} {row['logins_per_second']:>9} "
+            f"{row['probe_p50_ms']:>10} {row['probe_p99_ms']:>8} {row['probe_max_ms']:>8}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt work factor (in-process mode)")
+    parser.add_argument("--workers", type=int, default=0, help="Hashing threads; 0 for one per CPU core")
+    parser.add_argument("--url", help="Benchmark a running server instead")
+    parser.add_argument("--email", default="benchmark@example.com")
+    parser.add_argument("--password", default="benchmark-password")
+    parser.add_argument("--json", help="Also write the report to this file")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,145 @@
+"""Compare summarization with and without extractive pre-compression.
+
+Every .txt file in the corpus directory is summarized once with the full text
+and once per compression ratio, using the configured SUMMARY_BACKEND with the
+summary cache bypassed. Reports mean latency, mean input tokens and ROUGE-1 /
+ROUGE-L F1. If <name>.summary.txt exists next to <name>.txt it is used as the
+reference; otherwise the uncompressed summary is.
+
+    python -m scripts.benchmark_precompression --corpus ./corpus --ratios 0.3 0.5 0.7
+    python -m scripts.benchmark_precompression --corpus ./corpus --json results.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.config import settings
+from app.schemas import SummaryParameters
+from app.services.chunking import estimate_tokens
+from app.services.precompression import compress_text
+from app.services.summary_cache import summary_cache
+from app.services.summary_service import SummaryService
+from app.services.summarization_backends import summarization_backend
+
+def _tokens(text: str) -> List[str]:
+    return text.lower().split()
+
+def _f1(overlap: int, candidate: int, reference: int) -> float:
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / candidate, overlap / reference
+    return 2 * precision * recall / (precision + recall)
+
+def rouge_1(candidate: str, reference: str) -> float:
+    candidate_tokens, reference_tokens = _tokens(candidate), _tokens(reference)
+    counts: Dict[str, int] = {}
+    for token in reference_tokens:
+        counts[token] = counts.get(token, 0) + 1
+    overlap = 0
+    for token in candidate_tokens:
+        if counts.get(token, 0) > 0:
+            counts[token] -= 1
+            overlap += 1
+    return _f1(overlap, len(candidate_tokens), len(reference_tokens))
+
+def rouge_l(candidate: str, reference: str) -> float:
+    candidate_tokens, reference_tokens = _tokens(candidate), _tokens(reference)
+    # Longest common subsequence, one row at a time
+    previous = [0] * (len(reference_tokens) + 1)
+    for token in candidate_tokens:
+        current = [0]
+        for j, reference_token in enumerate(reference_tokens):
+            current.append(previous[j] + 1 if token == reference_token else max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(candidate_tokens), len(reference_tokens))
+
+def load_corpus(corpus: Path) -> List[Dict]:
+    documents = []
+    for path in sorted(corpus.glob("*.txt")):
+        if path.name.endswith(".summary.txt"):
+            continue
+        reference = path.with_name(f"{path.stem}.summary.txt")
+        documents.append({
+            "name": path.name,
+            "text": path.read_text(encoding="utf-8"),
+            "reference": reference.read_text(encoding="utf-8") if reference.exists() else None
+        })
+    return documents
+
+async def run_variant(documents: List[Dict], ratio: Optional[float], args) -> List[Dict]:
+    parameters = SummaryParameters(
+        min_length=args.min_length,
+        max_length=args.max_length,
+        compression_ratio=ratio
+    )
+    results = []
+    for document in documents:
+        input_tokens = estimate_tokens(document["text"])
+        if ratio is not None and input_tokens >= settings.PRECOMPRESS_MIN_TOKENS:
+            input_tokens = compress_text(document["text"], ratio).compressed_tokens
+        start = time.perf_counter()
+        summary = await SummaryService.summarize_document(document["text"], parameters)
+        results.append({
+            "name": document["name"],
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "input_tokens": input_tokens,
+            "summary_text": summary.summary_text
+        })
+    return results
+
+async def main(args) -> int:
+    documents = load_corpus(Path(args.corpus))
+    if not documents:
+        print(f"No .txt documents found in {args.corpus}")
+        return 1
+
+    # Measure the model, not the cache
+    summary_cache.is_cacheable = lambda parameters: False
+    await summarization_backend.start()
+    try:
+        baseline = await run_variant(documents, None, args)
+        variants = {"full": baseline}
+        for ratio in args.ratios:
+            variants[f"ratio={ratio}"] = await run_variant(documents, ratio, args)
+    finally:
+        await summarization_backend.close()
+
+    report = []
+    for name, results in variants.items():
+        references = [
+            document["reference"] or base["summary_text"]
+            for document, base in zip(documents, baseline)
+        ]
+        report.append({
+            "variant": name,
+            "documents": len(results),
+            "mean_latency_ms": round(statistics.mean(r["latency_ms"] for r in results), 2),
+            "p95_latency_ms": round(sorted(r["latency_ms"] for r in results)[int(0.95 * (len(results) - 1))], 2),
+            "mean_input_tokens": round(statistics.mean(r["input_tokens"] for r in results), 1),
+            "rouge_1": round(statistics.mean(rouge_1(r["summary_text"], ref) for r, ref in zip(results, references)), 4),
+            "rouge_l": round(statistics.mean(rouge_l(r["summary_text"], ref) for r, ref in zip(results, references)), 4)
+        })
+
+    print(f"{'variant':<12} {'docs':>5} {'mean ms':>10} {'p95 ms':>10} {'tokens in':>10} {'ROUGE-1':>8} {'ROUGE-L':>8}")
+    for row in report:
+        print(
+            f"{row['variant']:<12} {row['documents']:>5} {row['mean_latency_ms']:>10} {row['p95_latency_ms']:>10} "
+            f"{row['mean_input_tokens']:>10} {row['rouge_1']:>8} {row['rouge_l']:>8}"
+        )
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", required=True, help="Directory of .txt documents")
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.3, 0.5, 0.7])
+    parser.add_argument("--min-length", type=int, default=50)
+    parser.add_argument("--max-length", type=int, default=250)
+    parser.add_argument("--json", help="Also write the report to this file")
+    sys.exit(asyncio.run(main(parser.parse_args())))
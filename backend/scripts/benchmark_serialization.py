@@ -0,0 +1,137 @@
+"""Compare response serialization throughput for GET /chat/sessions/{id}.
+
+Serves an in-memory session with 10, 100 and 1000 summaries (or --sizes) from
+two in-process routes and requests each for --seconds:
+  models  builds ChatSessionResponse and SummaryItemSchema objects, which
+          FastAPI validates again against response_model and encodes with the
+          stdlib JSON encoder (as the chat router did before)
+  fast    builds the payload with app.services.serialization.session_detail
+          and returns it as a FastJSONResponse (orjson when installed)
+No database or inference backend is needed:
+    python -m scripts.benchmark_serialization --sizes 10 100 1000 --seconds 2
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import httpx
+from beanie import PydanticObjectId
+from fastapi import FastAPI
+
+from app.models import ChatSession, SummaryItem
+from app.schemas.chat import ChatSessionResponse, SummaryItemSchema
+from app.services.serialization import FastJSONResponse, orjson, session_detail
+
+TEXT = "The committee reviewed the quarterly figures and agreed to revisit the budget next month. " * 20
+SUMMARY = "The committee will revisit the budget next month after reviewing the quarterly figures."
+PARAMETERS = {"min_length": 50, "max_length": 250, "do_sample": False}
+
+def make_session(size: int):
+    """A session and its summaries, built without a database"""
+    now = datetime.utcnow()
+    session = ChatSession.model_construct(
+        id=PydanticObjectId(), user_id=PydanticObjectId(), title="Benchmark session",
+        summary_count=size, created_at=now, updated_at=now, meta_summary=SUMMARY
+    )
+    summaries = [
+        SummaryItem.model_construct(
+            id=PydanticObjectId(), user_id=session.user_id, session_id=session.id,
+            summary_text=f"{SUMMARY} ({i})", parameters=dict(PARAMETERS),
+            created_at=now + timedelta(seconds=i)
+        )
+        for i in range(size)
+    ]
+    return session, summaries, [f"{TEXT} ({i})" for i in range(size)]
+
+def build_app(sessions: Dict[int, tuple]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/models/{size}", response_model=ChatSessionResponse)
+    async def models(size: int):
+        session, summaries, original_texts = sessions[size]
+        return ChatSessionResponse(
+            id=str(session.id),
+            title=session.title,
+            summaries=[
+                SummaryItemSchema(
+                    id=str(summary.id),
+                    original_text=original_text,
+                    summary_text=summary.summary_text,
+                    parameters=summary.parameters,
+                    created_at=summary.created_at
+                ) for summary, original_text in zip(summaries, original_texts)
+            ],
+            created_at=session.created_at,
+            updated_at=session.updated_at,
+            meta_summary=session.meta_summary
+        )
+
+    @app.get("/fast/{size}", response_model=ChatSessionResponse)
+    async def fast(size: int):
+        session, summaries, original_texts = sessions[size]
+        return FastJSONResponse(session_detail(session, summaries, original_texts))
+
+    return app
+
+async def measure(client: httpx.AsyncClient, path: str, seconds: float) -> Dict:
+    latencies: List[float] = []
+    body = b""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline or len(latencies) < 5:
+        start = time.perf_counter()
+        response = await client.get(path)
+        latencies.append(time.perf_counter() - start)
+        body = response.content
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / sum(latencies), 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "body_bytes": len(body),
+        "body": body
+    }
+
+async def main(sizes: List[int], seconds: float, json_path: str) -> int:
+    sessions = {size: make_session(size) for size in sizes}
+    transport = httpx.ASGITransport(app=build_app(sessions))
+    report = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for size in sizes:
+            models = await measure(client, f"/models/{size}", seconds)
+            fast = await measure(client, f"/fast/{size}", seconds)
+            if json.loads(models.pop("body")) != json.loads(fast.pop("body")):
+                print(f"FAIL: responses differ for {size} summaries")
+                return 1
+            report.append({
+                "summaries": size,
+                "models": models,
+                "fast": fast,
+                "speedup": round(fast["requests_per_second"] / models["requests_per_second"], 2)
+            })
+
+    print(f"JSON encoder for the fast path: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'summaries':>9} {'variant':<7} {'req/s':>9} {'p50 ms':>9} {'bytes':>10} {'speedup':>8}")
+    for row in report:
+        for variant in ("models", "fast"):
+            result = row[variant]
+            speedup = f"{row['speedup']}x" if variant == "fast" else ""
+            print(
+                f"{row['summaries']:>9} {variant:<7} {result['requests_per_second']:>9} "
+                f"{result['p50_ms']:>9} {result['body_bytes']:>10} {speedup:>8}"
+            )
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Summaries per session")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time spent on each variant and size")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.sizes, args.seconds, args.json)))
@@ -0,0 +1,75 @@
+"""Concurrency check for chat session writes.
+
+Creates a throwaway user and session, fires many add_summary_to_chat calls
+(interleaved with title and meta-summary updates) at that one session in
+parallel, and verifies that no summary was lost and the session counters
+agree. Runs against the database configured in .env:
+    python -m scripts.check_concurrent_writes --writes 500
+"""
+import argparse
+import asyncio
+import sys
+import uuid
+
+from app.database import init_db
+from app.models import ChatSession, SummaryItem
+from app.crud import (
+    create_user,
+    delete_user,
+    create_chat_session,
+    add_summary_to_chat,
+    update_chat_session_title,
+    update_chat_meta_summary
+)
+
+async def main(writes: int) -> int:
+    await init_db()
+    user = await create_user(f"concurrency-{uuid.uuid4().hex}@example.com", "not-a-real-hash")
+    try:
+        session_id = await create_chat_session(user, "concurrency check")
+
+        adds = [
+            add_summary_to_chat(
+                user, session_id,
+                original_text=f"text {i}",
+                summary_text=f"summary {i}",
+                parameters={"min_length": 50, "max_length": 250, "do_sample": False}
+            )
+            for i in range(writes)
+        ]
+        others = [update_chat_session_title(user, session_id, f"title {i}") for i in range(writes // 10)]
+        others += [update_chat_meta_summary(user, session_id, f"meta {i}") for i in range(writes // 10)]
+
+        results = await asyncio.gather(*adds, *others)
+        summary_ids = results[:writes]
+
+        stored = await SummaryItem.find(SummaryItem.session_id == session_id).count()
+        session = await ChatSession.get(session_id)
+        expected_revision = writes + len(others)
+
+        failures = []
+        if any(summary_id is None for summary_id in summary_ids):
+            failures.append("some adds reported failure")
+        if len(set(summary_ids)) != writes:
+            failures.append("duplicate summary ids returned")
+        if stored != writes:
+            failures.append(f"{stored} summaries stored, expected {writes}")
+        if session.summary_count != writes:
+            failures.append(f"summary_count is {session.summary_count}, expected {writes}")
+        if session.revision != expected_revision:
+            failures.append(f"revision is {session.revision}, expected {expected_revision}")
+
+        if failures:
+            for failure in failures:
+                print(f"FAIL: {failure}")
+            return 1
+        print(f"OK: {writes} concurrent adds and {len(others)} concurrent updates, nothing lost")
+        return 0
+    finally:
+        await delete_user(user)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=500, help="Number of parallel summary adds")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.writes)))
@@ -0,0 +1,200 @@
+"""Fault-injection check for inference retries, hedging and the circuit breaker.
+
+Drives scripts.fake_inference_server through its /faults endpoint and calls it
+through HuggingFaceAPIBackend wrapped in InferenceResilience, with delays scaled
+down so the whole run takes a few seconds. Checks that:
+  - transient 500s are retried away
+  - "model is loading" waits are honoured, or fail fast when too long
+  - 429s are retried after Retry-After, and surface with it once retries run out
+  - an outage opens the circuit breaker, which fails fast and closes on recovery
+  - hedging cuts the latency of calls that stall upstream
+
+Start the fake server first; the check changes its faults and restores them after:
+    uvicorn scripts.fake_inference_server:app --port 8001
+    python -m scripts.check_inference_resilience --url http://localhost:8001
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import List, Optional
+
+import httpx
+
+from app.schemas import SummaryParameters
+from app.services.inference_client import close_inference_client
+from app.services.resilience import CircuitBreaker, InferenceError, InferenceResilience
+from app.services.summarization_backends import HuggingFaceAPIBackend
+
+# Retries and breaker transitions are logged as warnings; keep the report readable
+logging.basicConfig(level=logging.ERROR)
+
+TEXT = "The quick brown fox jumps over the lazy dog near the quiet river bank. " * 4
+PARAMETERS = SummaryParameters(min_length=10, max_length=50)
+NO_FAULTS = {
+    "latency_ms": 20, "latency_dist": "constant", "latency_per_input_ms": 0,
+    "error_rate": 0, "loading_rate": 0, "rate_limit_rate": 0, "hang_rate": 0,
+    "loading_for_seconds": 0
+}
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+class Check:
+    def __init__(self, url: str):
+        self.control = httpx.AsyncClient(base_url=url)
+        self.backend = HuggingFaceAPIBackend(f"{url}/models/fake")
+        self.failures: List[str] = []
+        self.original_faults = {}
+
+    async def faults(self, **changes) -> None:
+        response = await self.control.post("/faults", json={**NO_FAULTS, **changes})
+        response.raise_for_status()
+        await self.control.post("/stats/reset")
+
+    async def upstream_requests(self) -> int:
+        return (await self.control.get("/stats")).json()["requests"]
+
+    def resilience(
+        self,
+        attempts: int = 3,
+        max_delay: float = 2.0,
+        hedge_after_ms: float = 0,
+        breaker: Optional[CircuitBreaker] = None
+    ) -> InferenceResilience:
+        return InferenceResilience(
+            breaker or CircuitBreaker(failure_threshold=0, reset_seconds=0),
+            max_attempts=attempts,
+            base_delay=0.02,
+            max_delay=max_delay,
+            hedge_after_ms=hedge_after_ms
+        )
+
+    async def call(self, resilience: InferenceResilience) -> str:
+        return await resilience.call("fake", lambda: self.backend.summarize(TEXT, PARAMETERS))
+
+    async def succeeded(self, resilience: InferenceResilience, calls: int) -> int:
+        results = await asyncio.gather(*(self.call(resilience) for _ in range(calls)), return_exceptions=True)
+        return sum(not isinstance(result, Exception) for result in results)
+
+    def expect(self, condition: bool, message: str) -> None:
+        print(f"{'OK' if condition else 'FAIL'}: {message}")
+        if not condition:
+            self.failures.append(message)
+
+    async def transient_errors(self) -> None:
+        await self.faults(error_rate=0.3)
+        without = await self.succeeded(self.resilience(attempts=1), 100)
+        with_retries = await self.succeeded(self.resilience(attempts=4), 100)
+        self.expect(
+            with_retries >= 97 and with_retries > without,
+            f"30% upstream errors: {without}/100 succeed without retries, {with_retries}/100 with 4 attempts"
+        )
+
+    async def model_loading(self) -> None:
+        await self.faults(loading_for_seconds=1.0)
+        started = time.monotonic()
+        try:
+            await self.call(self.resilience(max_delay=0.5))
+            self.expect(False, "a load longer than the retry limit fails fast")
+        except InferenceError as e:
+            elapsed = time.monotonic() - started
+            self.expect(
+                e.kind == "model_loading" and e.headers.get("Retry-After") == "1" and elapsed < 0.5,
+                f"a load longer than the retry limit fails fast ({elapsed:.2f}s, {e.kind}, "
+                f"Retry-After {e.headers.get('Retry-After')})"
+            )
+
+        await self.faults(loading_for_seconds=1.0)
+        started = time.monotonic()
+        await self.call(self.resilience(max_delay=2.0))
+        elapsed = time.monotonic() - started
+        requests = await self.upstream_requests()
+        self.expect(
+            elapsed >= 1.0 and requests == 2,
+            f"a 1s model load is waited out: answered after {elapsed:.2f}s in {requests} requests"
+        )
+
+    async def rate_limited(self) -> None:
+        await self.faults(rate_limit_rate=1, retry_after=0.3)
+        started = time.monotonic()
+        try:
+            await self.call(self.resilience(attempts=3))
+            self.expect(False, "persistent 429s surface once retries run out")
+        except InferenceError as e:
+            elapsed = time.monotonic() - started
+            requests = await self.upstream_requests()
+            self.expect(
+                e.kind == "rate_limited" and e.status_code == 503 and requests == 3 and elapsed >= 0.6,
+                f"persistent 429s: {requests} requests over {elapsed:.2f}s, then {e.status_code} "
+                f"with Retry-After {e.headers.get('Retry-After')}"
+            )
+
+    async def outage(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=1.0)
+        resilience = self.resilience(attempts=1, breaker=breaker)
+        await self.faults(error_rate=1)
+        kinds = []
+        for _ in range(10):
+            try:
+                await self.call(resilience)
+            except InferenceError as e:
+                kinds.append(e.kind)
+        requests = await self.upstream_requests()
+        self.expect(
+            requests == 3 and kinds.count("circuit_open") == 7 and breaker.state == CircuitBreaker.OPEN,
+            f"outage: circuit opens after {requests} upstream failures and fails "
+            f"{kinds.count('circuit_open')} of 10 calls fast"
+        )
+
+        await self.faults()
+        await asyncio.sleep(1.1)
+        await self.call(resilience)
+        self.expect(
+            breaker.state == CircuitBreaker.CLOSED and breaker.transitions[CircuitBreaker.HALF_OPEN] == 1,
+            f"recovery: trial call after the reset time closes the circuit ({breaker.state})"
+        )
+
+    async def stalled_calls(self) -> None:
+        latencies = {}
+        for hedge_after_ms in (0, 100):
+            await self.faults(hang_rate=0.1, hang_seconds=2.0)
+            resilience = self.resilience(attempts=1, hedge_after_ms=hedge_after_ms)
+            limit = asyncio.Semaphore(10)
+
+            async def timed() -> float:
+                async with limit:
+                    started = time.monotonic()
+                    await self.call(resilience)
+                    return time.monotonic() - started
+
+            latencies[hedge_after_ms] = await asyncio.gather(*(timed() for _ in range(60)))
+        plain = percentile(latencies[0], 0.95)
+        hedged = percentile(latencies[100], 0.95)
+        self.expect(
+            hedged < plain / 2,
+            f"10% stalled calls: p95 {plain * 1000:.0f}ms without hedging, {hedged * 1000:.0f}ms hedged after 100ms"
+        )
+
+async def main(url: str) -> int:
+    check = Check(url.rstrip("/"))
+    check.original_faults = (await check.control.get("/faults")).json()
+    try:
+        await check.transient_errors()
+        await check.model_loading()
+        await check.rate_limited()
+        await check.outage()
+        await check.stalled_calls()
+    finally:
+        await check.control.post("/faults", json=check.original_faults)
+        await check.control.aclose()
+        await close_inference_client()
+    return 1 if check.failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001", help="Base URL of the fake inference server")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.url)))
@@ -0,0 +1,86 @@
+"""Shutdown check for the summarization job workers.
+
+Starts and stops job workers over and over and fails if stop_workers does not
+return within --timeout seconds:
+  idle       workers waiting for work (stopped at random points of the poll)
+  woken      workers woken by a submit just as they are stopped
+  failed     after a job failed because its chat session does not exist
+Runs against the database configured in .env, with a throwaway user:
+    python -m scripts.check_job_worker_shutdown --rounds 50
+"""
+import argparse
+import asyncio
+import random
+import sys
+import uuid
+
+from beanie import PydanticObjectId
+
+from app.config import settings
+from app.crud import create_user, delete_user
+from app.database import init_db
+from app.models import Principal
+from app.services.job_queue import FINISHED_STATUSES, JobQueue, MongoJobStore
+
+TEXT = "The committee reviewed the quarterly figures and agreed to revisit the budget next month. " * 3
+
+async def stop(queue: JobQueue, timeout: float) -> bool:
+    """Whether stop_workers returned in time, with every worker task finished"""
+    tasks = list(queue._workers)
+    try:
+        await asyncio.wait_for(queue.stop_workers(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    return all(task.done() for task in tasks)
+
+async def idle(queue: JobQueue, principal: Principal, timeout: float) -> bool:
+    queue.start_workers(2)
+    await asyncio.sleep(random.uniform(0, 2 * settings.JOB_POLL_INTERVAL_SECONDS))
+    return await stop(queue, timeout)
+
+async def woken(queue: JobQueue, principal: Principal, timeout: float) -> bool:
+    queue.start_workers(2)
+    await asyncio.sleep(random.uniform(0, settings.JOB_POLL_INTERVAL_SECONDS))
+    # Wakes the waiting workers in the same loop iteration as the cancellation
+    queue._work_available.set()
+    return await stop(queue, timeout)
+
+async def failed(queue: JobQueue, principal: Principal, timeout: float) -> bool:
+    queue.start_workers(2)
+    job = await queue.submit(principal, PydanticObjectId(), TEXT, {})
+    for _ in range(int(timeout / 0.05)):
+        current = await queue.get(job.id, principal)
+        if current.status in FINISHED_STATUSES:
+            break
+        await asyncio.sleep(0.05)
+    else:
+        print("FAIL: job on a missing session did not finish")
+        await stop(queue, timeout)
+        return False
+    if current.status != "failed":
+        print(f"FAIL: job on a missing session ended {current.status}")
+    return await stop(queue, timeout) and current.status == "failed"
+
+async def main(rounds: int, timeout: float) -> int:
+    await init_db()
+    user = await create_user(f"shutdown-{uuid.uuid4().hex}@example.com", "not-a-real-hash")
+    principal = Principal(id=user.id, email=user.email)
+    failures = 0
+    try:
+        for scenario in (idle, woken, failed):
+            hung = 0
+            for _ in range(rounds):
+                if not await scenario(JobQueue(MongoJobStore()), principal, timeout):
+                    hung += 1
+            failures += hung
+            print(f"{'FAIL' if hung else 'OK'}: {scenario.__name__}, {hung} of {rounds} shutdowns hung or failed")
+    finally:
+        await delete_user(user)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=50, help="Shutdowns per scenario")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Seconds stop_workers may take")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.rounds, args.timeout)))
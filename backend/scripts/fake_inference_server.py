@@ -0,0 +1,147 @@
+"""Local stand-in for the HuggingFace inference API.
+
+Run with:
+    uvicorn scripts.fake_inference_server:app --port 8001
+
+and point the backend at it:
+    HUGGINGFACE_API_URL=http://localhost:8001/models/fake
+
+Latency and failures are configurable through the environment:
+    FAKE_HF_LATENCY_MS=200            mean latency per request
+    FAKE_HF_LATENCY_DIST=constant     constant, uniform (0..2x mean), exponential or lognormal
+    FAKE_HF_LATENCY_PER_INPUT_MS=0    extra latency per input in a batched request
+    FAKE_HF_ERROR_RATE=0              fraction answered with 500
+    FAKE_HF_LOADING_RATE=0            fraction answered with 503 "model is loading"
+    FAKE_HF_LOADING_ESTIMATED_TIME=20 estimated_time sent with those 503s
+    FAKE_HF_RATE_LIMIT_RATE=0         fraction answered with 429
+    FAKE_HF_RETRY_AFTER=1             Retry-After seconds sent with those 429s
+    FAKE_HF_HANG_RATE=0               fraction that stall FAKE_HF_HANG_SECONDS before answering
+    FAKE_HF_HANG_SECONDS=60
+    FAKE_HF_SEED=                     seed for reproducible runs
+GET /stats returns request and outcome counts; POST /stats/reset clears them.
+GET /faults returns the settings above; POST /faults changes them while running,
+e.g. {"error_rate": 1} for an outage, or {"loading_for_seconds": 5} to answer
+every request with "model is loading" for the next 5 seconds.
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import asyncio
+import math
+import os
+import random
+import time
+
+faults = {
+    "latency_ms": float(os.getenv("FAKE_HF_LATENCY_MS", "200")),
+    "latency_dist": os.getenv("FAKE_HF_LATENCY_DIST", "constant").lower(),
+    "latency_per_input_ms": float(os.getenv("FAKE_HF_LATENCY_PER_INPUT_MS", "0")),
+    "error_rate": float(os.getenv("FAKE_HF_ERROR_RATE", "0")),
+    "loading_rate": float(os.getenv("FAKE_HF_LOADING_RATE", "0")),
+    "loading_estimated_time": float(os.getenv("FAKE_HF_LOADING_ESTIMATED_TIME", "20")),
+    "rate_limit_rate": float(os.getenv("FAKE_HF_RATE_LIMIT_RATE", "0")),
+    "retry_after": float(os.getenv("FAKE_HF_RETRY_AFTER", "1")),
+    "hang_rate": float(os.getenv("FAKE_HF_HANG_RATE", "0")),
+    "hang_seconds": float(os.getenv("FAKE_HF_HANG_SECONDS", "60"))
+}
+# Shape of the lognormal distribution; its mean stays latency_ms
+LOGNORMAL_SIGMA = 0.6
+
+_random = random.Random(os.getenv("FAKE_HF_SEED") or None)
+# Monotonic time until which the model is "loading", set through POST /faults
+_loading_until = 0.0
+
+app = FastAPI(title="Fake Inference API")
+
+stats = {"requests": 0, "inputs": 0, "ok": 0, "errors": 0, "loading": 0, "rate_limited": 0, "hung": 0}
+
+def _latency_ms(inputs: int) -> float:
+    mean = faults["latency_ms"]
+    distribution = faults["latency_dist"]
+    if distribution == "uniform":
+        latency = _random.uniform(0, 2 * mean)
+    elif distribution == "exponential":
+        latency = _random.expovariate(1 / mean) if mean > 0 else 0.0
+    elif distribution == "lognormal":
+        latency = _random.lognormvariate(math.log(mean) - LOGNORMAL_SIGMA ** 2 / 2, LOGNORMAL_SIGMA) if mean > 0 else 0.0
+    else:
+        latency = mean
+    return latency + faults["latency_per_input_ms"] * inputs
+
+def _fake_summary(text: str, max_length: int) -> str:
+    # Deterministic "summary": the leading words of the input
+    words = text.split()
+    return " ".join(words[:max(1, max_length // 5)])
+
+def _loading_response(estimated_time: float) -> JSONResponse:
+    stats["loading"] += 1
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Model fake is currently loading", "estimated_time": round(estimated_time, 3)}
+    )
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+@app.post("/stats/reset")
+async def reset_stats():
+    for key in stats:
+        stats[key] = 0
+    return stats
+
+@app.get("/faults")
+async def get_faults():
+    return {**faults, "loading_for_seconds": max(0.0, _loading_until - time.monotonic())}
+
+@app.post("/faults")
+async def set_faults(request: Request):
+    global _loading_until
+    changes = await request.json()
+    loading_for = changes.pop("loading_for_seconds", None)
+    if loading_for is not None:
+        _loading_until = time.monotonic() + float(loading_for)
+    for key, value in changes.items():
+        if key in faults:
+            faults[key] = value
+    return await get_faults()
+
+@app.post("/models/{model_id:path}")
+async def summarize(model_id: str, request: Request):
+    payload = await request.json()
+    parameters = payload.get("parameters") or {}
+    max_length = parameters.get("max_length", 250)
+    inputs = payload["inputs"]
+    texts = inputs if isinstance(inputs, list) else [inputs]
+    stats["requests"] += 1
+    stats["inputs"] += len(texts)
+
+    loading_for = _loading_until - time.monotonic()
+    if loading_for > 0:
+        return _loading_response(loading_for)
+
+    outcome = _random.random()
+    if outcome < faults["hang_rate"]:
+        stats["hung"] += 1
+        await asyncio.sleep(faults["hang_seconds"])
+    else:
+        await asyncio.sleep(_latency_ms(len(texts)) / 1000)
+
+    outcome = _random.random()
+    threshold = faults["loading_rate"]
+    if outcome < threshold:
+        return _loading_response(faults["loading_estimated_time"])
+    threshold += faults["rate_limit_rate"]
+    if outcome < threshold:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"error": "Rate limit reached"},
+            headers={"Retry-After": str(faults["retry_after"])}
+        )
+    threshold += faults["error_rate"]
+    if outcome < threshold:
+        stats["errors"] += 1
+        return JSONResponse(status_code=500, content={"error": "Internal error"})
+
+    stats["ok"] += 1
+    return [{"summary_text": _fake_summary(text, max_length)} for text in texts]
@@ -0,0 +1,316 @@
+"""Load test the API with scripted user workloads and report latency percentiles.
+
+Every virtual user registers, logs in, creates --sessions sessions, summarizes
+--summaries texts in each, lists its sessions, meta-summarizes each session and
+re-summarizes one summary per session with PATCH. --users virtual users run,
+--concurrency of them at a time.
+
+Targets:
+    --target memory   the app in-process on mongomock-motor (pip install mongomock-motor); no Mongo needed
+    --target mongo    the app in-process on MONGO_URI / DB_NAME from .env; use a throwaway database
+    --url URL         a running server
+
+Inference goes to HUGGINGFACE_API_URL (or SUMMARY_BACKEND). For repeatable
+numbers run scripts.fake_inference_server and point HUGGINGFACE_API_URL at it.
+
+The report gives p50/p95/p99 latency and throughput per operation, and the
+documents and bytes each user added per collection. Save it as JSON and
+compare runs to spot regressions between commits:
+
+    python -m scripts.load_test --users 50 --concurrency 10 --json results/$(git rev-parse --short HEAD).json
+    python -m scripts.load_test --compare results/before.json results/after.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import bson
+import httpx
+
+from app.config import settings
+
+OPERATIONS = ["register", "login", "create_session", "summarize", "list_sessions", "meta_summarize", "patch_resummarize"]
+# Collections whose documents carry user_id
+USER_COLLECTIONS = ["chat_sessions", "summaries", "meta_summary_nodes", "search_embeddings", "summary_jobs"]
+
+VOCABULARY = (
+    "market policy energy climate river harbour council budget research vaccine court election "
+    "transport housing school network satellite farmer drought festival museum engineer bridge "
+    "railway factory export harvest storm coastline league stadium orchestra novel archive "
+    "hospital clinic patient league treaty border currency inflation startup software battery"
+).split()
+
+def make_text(rng: random.Random, words: int) -> str:
+    """Pseudo-random prose: unique per call, so the cache and near-duplicate reuse do not hide inference"""
+    sentences = []
+    remaining = words
+    while remaining > 0:
+        length = min(remaining, rng.randint(8, 20))
+        sentence = " ".join(rng.choice(VOCABULARY) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {operation: [] for operation in OPERATIONS}
+        self.errors: Dict[str, int] = {operation: 0 for operation in OPERATIONS}
+        self.error_samples: List[str] = []
+
+    async def call(self, operation: str, request) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError as e:
+            response, failure = None, f"{operation}: {type(e).__name__}"
+        else:
+            failure = None if response.status_code < 400 else f"{operation}: {response.status_code} {response.text[:200]}"
+        self.latencies[operation].append((time.perf_counter() - start) * 1000)
+        if failure:
+            self.errors[operation] += 1
+            if len(self.error_samples) < 10:
+                self.error_samples.append(failure)
+            return None
+        return response
+
+async def run_user(client: httpx.AsyncClient, recorder: Recorder, index: int, args, run_id: str) -> str:
+    rng = random.Random(f"{args.seed}-{index}")
+    email = f"loadtest-{run_id}-{index}@example.com"
+    password = "load-test-password"
+    parameters = {"min_length": 30, "max_length": 120, "do_sample": False}
+
+    if await recorder.call("register", client.post("/auth/register", json={"email": email, "password": password})) is None:
+        return email
+    client.cookies.clear()
+    if await recorder.call("login", client.post("/auth/login", json={"email": email, "password": password})) is None:
+        return email
+
+    for session_number in range(args.sessions):
+        created = await recorder.call(
+            "create_session", client.post("/chat/sessions", json={"title": f"Load test session {session_number}"})
+        )
+        if created is None:
+            continue
+        session_id = created.json()["session_id"]
+
+        summary_ids = []
+        for _ in range(args.summaries):
+            summarized = await recorder.call("summarize", client.post("/chat/summarize", json={
+                "session_id": session_id,
+                "text": make_text(rng, args.text_words),
+                "parameters": parameters
+            }))
+            if summarized is not None:
+                summary_ids.append(summarized.json()["summary_id"])
+
+        await recorder.call("list_sessions", client.get("/chat/sessions"))
+        await recorder.call("meta_summarize", client.post("/chat/meta-summarize", json={
+            "session_id": session_id,
+            "parameters": {"min_length": 50, "max_length": 200}
+        }))
+        if summary_ids:
+            await recorder.call("patch_resummarize", client.patch(
+                f"/chat/sessions/{session_id}/summaries/{summary_ids[0]}",
+                json={"parameters": {**parameters, "max_length": 150}}
+            ))
+    return email
+
+def _operation_report(latencies: List[float], errors: int, wall_seconds: float) -> Dict:
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(max(latencies), 2) if latencies else 0.0
+    }
+
+async def document_growth(emails: List[str]) -> Dict:
+    """Documents and BSON bytes per load-test user, per collection"""
+    from app.models import User
+    database = User.get_motor_collection().database
+    users = await database["users"].find({"email": {"$in": emails}}).to_list(None)
+    user_ids = [user["_id"] for user in users]
+    growth = {"users": {"documents": len(users), "bytes": sum(len(bson.encode(user)) for user in users)}}
+    for name in USER_COLLECTIONS:
+        documents, size = 0, 0
+        async for raw in database[name].find({"user_id": {"$in": user_ids}}):
+            documents += 1
+            size += len(bson.encode(raw))
+        growth[name] = {"documents": documents, "bytes": size}
+    count = max(1, len(users))
+    return {
+        name: {"documents_per_user": round(totals["documents"] / count, 2), "bytes_per_user": round(totals["bytes"] / count)}
+        for name, totals in growth.items()
+    }
+
+async def api_growth(client_factory, emails: List[str]) -> Dict:
+    """Sessions and summaries per user as seen through the API (for --url runs)"""
+    sessions, summaries = 0, 0
+    for email in emails:
+        async with client_factory() as client:
+            login = await client.post("/auth/login", json={"email": email, "password": "load-test-password"})
+            if login.status_code != 200:
+                continue
+            listing = (await client.get("/chat/sessions", params={"limit": 200})).json()
+            sessions += len(listing["items"])
+            summaries += sum(item["summary_count"] for item in listing["items"])
+    count = max(1, len(emails))
+    return {
+        "chat_sessions": {"documents_per_user": round(sessions / count, 2)},
+        "summaries": {"documents_per_user": round(summaries / count, 2)}
+    }
+
+async def cleanup(client_factory, emails: List[str]) -> None:
+    for email in emails:
+        async with client_factory() as client:
+            login = await client.post("/auth/login", json={"email": email, "password": "load-test-password"})
+            if login.status_code == 200:
+                await client.delete("/auth/me")
+
+async def init_memory_db() -> None:
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("--target memory needs mongomock-motor: pip install mongomock-motor")
+    from beanie import init_beanie
+    from app.database import DOCUMENT_MODELS
+    await init_beanie(database=AsyncMongoMockClient()[settings.DB_NAME], document_models=DOCUMENT_MODELS)
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args) -> Dict:
+    in_process = args.url is None
+    if in_process:
+        import app.main as main
+        if args.target == "memory":
+            main.init_db = init_memory_db
+        await main.app.router.startup()
+        transport = httpx.ASGITransport(app=main.app)
+        client_factory = lambda: httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout)
+    else:
+        client_factory = lambda: httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def user(index: int) -> str:
+        async with semaphore:
+            async with client_factory() as client:
+                return await run_user(client, recorder, index, args, run_id)
+
+    try:
+        start = time.perf_counter()
+        emails = await asyncio.gather(*(user(i) for i in range(args.users)))
+        wall_seconds = time.perf_counter() - start
+
+        growth = await document_growth(list(emails)) if in_process else await api_growth(client_factory, list(emails))
+        if not args.keep_data:
+            await cleanup(client_factory, list(emails))
+    finally:
+        if in_process:
+            await main.app.router.shutdown()
+
+    all_latencies = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_commit": _git_commit(),
+            "target": args.url or args.target,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "sessions_per_user": args.sessions,
+            "summaries_per_session": args.summaries,
+            "text_words": args.text_words,
+            "summary_backend": settings.SUMMARY_BACKEND,
+            "inference_url": settings.HUGGINGFACE_API_URL,
+            "python": platform.python_version()
+        },
+        "wall_seconds": round(wall_seconds, 2),
+        "requests": len(all_latencies),
+        "errors": sum(recorder.errors.values()),
+        "throughput_rps": round(len(all_latencies) / wall_seconds, 2),
+        "operations": {
+            operation: _operation_report(recorder.latencies[operation], recorder.errors[operation], wall_seconds)
+            for operation in OPERATIONS
+        },
+        "document_growth": growth,
+        "error_samples": recorder.error_samples
+    }
+
+def print_report(report: Dict) -> None:
+    print(f"{report['requests']} requests in {report['wall_seconds']} s "
+          f"({report['throughput_rps']} req/s, {report['errors']} errors)")
+    print(f"{'operation':<18} {'count':>6} {'errors':>6} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for operation, row in report["operations"].items():
+        print(f"{operation:<18} {row['count']:>6} {row['errors']:>6} {row['throughput_rps']:>7} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    print("Per-user document growth:")
+    for collection, row in report["document_growth"].items():
+        print(f"  {collection:<20} " + ", ".join(f"{key}={value}" for key, value in row.items()))
+    for sample in report["error_samples"]:
+        print(f"  error: {sample}")
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['meta'].get('git_commit')} -> {after['meta'].get('git_commit')}")
+    print(f"{'operation':<18} {'metric':<7} {'before':>10} {'after':>10} {'change':>8}")
+    for operation, new in after["operations"].items():
+        old = before["operations"].get(operation)
+        if not old:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            change = f"{(new[metric] - old[metric]) / old[metric] * 100:+.1f}%" if old[metric] else "n/a"
+            print(f"{operation:<18} {metric[:3]:<7} {old[metric]:>10} {new[metric]:>10} {change:>8}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--url", help="Load test a running server instead of the in-process app")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5, help="Virtual users running at once")
+    parser.add_argument("--sessions", type=int, default=2, help="Sessions per user")
+    parser.add_argument("--summaries", type=int, default=5, help="Summaries per session")
+    parser.add_argument("--text-words", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--keep-data", action="store_true", help="Do not delete the load-test users afterwards")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        sys.exit(0)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report["errors"] else 0)
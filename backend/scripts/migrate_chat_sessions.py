@@ -0,0 +1,86 @@
+"""Split chat sessions embedded in user documents into their own collections.
+
+Each entry of users.chat_sessions becomes a chat_sessions document and each of
+its summaries a summaries document. The embedded array is removed from the
+user once its data has been copied. Re-running is safe: a user whose embedded
+sessions are still present has any partially migrated documents replaced.
+
+Stop the API before running, then:
+    python -m scripts.migrate_chat_sessions [--dry-run]
+Summaries keep their text inline; run scripts.migrate_text_store afterwards.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+
+from app.database import init_db
+from app.models import User, ChatSession, SummaryItem
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def migrate_user(raw_user: dict, dry_run: bool) -> tuple[int, int]:
+    user_id = raw_user["_id"]
+    embedded_sessions = raw_user.get("chat_sessions") or []
+
+    sessions, summaries = [], []
+    for embedded in embedded_sessions:
+        embedded_summaries = embedded.get("summaries") or []
+        session = ChatSession(
+            user_id=user_id,
+            title=embedded["title"],
+            summary_count=len(embedded_summaries),
+            created_at=embedded.get("created_at") or datetime.utcnow(),
+            updated_at=embedded.get("updated_at") or datetime.utcnow(),
+            meta_summary=embedded.get("meta_summary")
+        )
+        sessions.append((session, embedded_summaries))
+
+    if dry_run:
+        return len(sessions), sum(len(s) for _, s in sessions)
+
+    # Clear anything left behind by an interrupted earlier run for this user
+    await SummaryItem.find(SummaryItem.user_id == user_id).delete()
+    await ChatSession.find(ChatSession.user_id == user_id).delete()
+
+    for session, embedded_summaries in sessions:
+        await session.insert()
+        for embedded in embedded_summaries:
+            summaries.append(SummaryItem(
+                user_id=user_id,
+                session_id=session.id,
+                original_text=embedded["original_text"],
+                summary_text=embedded["summary_text"],
+                parameters=embedded.get("parameters") or {},
+                created_at=embedded.get("created_at") or datetime.utcnow()
+            ))
+    if summaries:
+        await SummaryItem.insert_many(summaries)
+
+    await User.get_motor_collection().update_one(
+        {"_id": user_id},
+        {"$unset": {"chat_sessions": ""}}
+    )
+    return len(sessions), len(summaries)
+
+async def main(dry_run: bool) -> None:
+    await init_db()
+    users = User.get_motor_collection()
+
+    migrated_users = migrated_sessions = migrated_summaries = 0
+    async for raw_user in users.find({"chat_sessions": {"$exists": True}}):
+        session_count, summary_count = await migrate_user(raw_user, dry_run)
+        migrated_users += 1
+        migrated_sessions += session_count
+        migrated_summaries += summary_count
+        logger.info(f"User {raw_user['_id']}: {session_count} sessions, {summary_count} summaries")
+
+    action = "Would migrate" if dry_run else "Migrated"
+    logger.info(f"{action} {migrated_sessions} sessions and {migrated_summaries} summaries for {migrated_users} users")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be migrated without writing")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
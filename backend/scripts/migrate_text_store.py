@@ -0,0 +1,117 @@
+"""Move original texts stored inline on summaries into the text store.
+
+Summaries and summary versions written before the text store existed keep
+their text in original_text. Each such text is stored once, compressed, and
+replaced by its hash. Summaries whose original text is in the store without
+the words keyword search matches it by (search_terms) are given them. With --recount, every reference count is then recomputed
+from the summaries and texts nothing references are removed; stop the API
+first, as texts taken by in-flight requests are not referenced yet:
+    python -m scripts.migrate_text_store [--dry-run] [--recount]
+"""
+import argparse
+import asyncio
+import logging
+from collections import Counter
+
+from app.database import init_db
+from app.models import SummaryItem
+from app.services.search import original_search_terms
+from app.services.text_store import text_store
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INLINE_TEXT = {"$or": [{"original_text": {"$type": "string"}}, {"versions.original_text": {"$type": "string"}}]}
+STORED_WITHOUT_TERMS = {"original_text": None, "text_hash": {"$type": "string"}, "search_terms": None}
+
+async def migrate_summary(raw: dict) -> bool:
+    """Store the summary's inline texts and swap them for hashes. Returns False,
+    keeping the summary as it was, if it changed while being migrated."""
+    taken = []
+    fields = {}
+    if raw.get("original_text") is not None:
+        digest = await text_store.put(raw["original_text"])
+        taken.append(digest)
+        fields.update({
+            "text_hash": digest,
+            "text_length": len(raw["original_text"]),
+            "search_terms": original_search_terms(raw["original_text"])
+        })
+
+    versions = []
+    for version in raw.get("versions") or []:
+        text = version.pop("original_text", None)
+        if text is not None:
+            digest = await text_store.put(text)
+            taken.append(digest)
+            version.update({"text_hash": digest, "text_length": len(text)})
+        versions.append(version)
+    if raw.get("versions"):
+        fields["versions"] = versions
+
+    result = await SummaryItem.get_motor_collection().update_one(
+        {"_id": raw["_id"], "revision": raw.get("revision", 0)},
+        {"$set": fields, "$unset": {"original_text": ""}, "$inc": {"revision": 1}}
+    )
+    if result.modified_count == 0:
+        await text_store.release(taken)
+        return False
+    return True
+
+async def add_search_terms() -> None:
+    summaries = SummaryItem.get_motor_collection()
+    updated = 0
+    async for raw in summaries.find(STORED_WITHOUT_TERMS, projection={"text_hash": 1}):
+        original_text = await text_store.get(raw["text_hash"])
+        if original_text is None:
+            continue
+        # A summary whose text changed meanwhile already has its new terms
+        result = await summaries.update_one(
+            {"_id": raw["_id"], "text_hash": raw["text_hash"], "search_terms": None},
+            {"$set": {"search_terms": original_search_terms(original_text)}}
+        )
+        updated += result.modified_count
+    logger.info(f"Added search terms to {updated} summaries")
+
+async def recount() -> None:
+    references = Counter()
+    projection = {"text_hash": 1, "versions.text_hash": 1}
+    async for raw in SummaryItem.get_motor_collection().find({}, projection=projection):
+        hashes = [raw.get("text_hash")] + [version.get("text_hash") for version in raw.get("versions") or []]
+        references.update(digest for digest in hashes if digest)
+    corrected, removed = await text_store.recount(references)
+    logger.info(f"Recounted {len(references)} referenced texts: corrected {corrected}, removed {removed} unreferenced")
+
+async def main(dry_run: bool, run_recount: bool) -> None:
+    await init_db()
+    summaries = SummaryItem.get_motor_collection()
+
+    if dry_run:
+        count = await summaries.count_documents(INLINE_TEXT)
+        without_terms = await summaries.count_documents(STORED_WITHOUT_TERMS)
+        logger.info(f"Would migrate {count} summaries and add search terms to {without_terms} more")
+        return
+
+    migrated = skipped = 0
+    projection = {"original_text": 1, "versions": 1, "revision": 1}
+    async for raw in summaries.find(INLINE_TEXT, projection=projection):
+        if await migrate_summary(raw):
+            migrated += 1
+        else:
+            skipped += 1
+        if migrated and migrated % 1000 == 0:
+            logger.info(f"Migrated {migrated} summaries")
+
+    logger.info(f"Done: migrated {migrated} summaries")
+    if skipped:
+        logger.warning(f"{skipped} summaries changed during migration; run again to migrate them")
+    await add_search_terms()
+    if run_recount:
+        await recount()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report how many summaries would be migrated")
+    parser.add_argument("--recount", action="store_true", help="Recompute reference counts and remove unreferenced texts")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run, args.recount))
@@ -0,0 +1,40 @@
+"""Run summarization job workers outside the API process.
+
+Workers claim jobs from the shared Mongo queue, so they can be scaled
+independently of the API replicas. Set JOB_WORKERS=0 on the API to leave
+all processing to these workers, then:
+    python -m scripts.run_job_workers --workers 4
+"""
+import argparse
+import asyncio
+import logging
+
+from app.config import settings
+from app.database import init_db
+from app.services.summarization_backends import summarization_backend
+from app.services.job_queue import job_queue
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def main(workers: int) -> None:
+    if settings.JOB_QUEUE_BACKEND.lower() != "mongo":
+        raise SystemExit("Standalone workers need JOB_QUEUE_BACKEND=mongo")
+
+    await init_db()
+    await summarization_backend.start()
+    job_queue.start_workers(workers)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await job_queue.stop_workers()
+        await summarization_backend.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.JOB_WORKERS, help="Number of concurrent workers")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.workers))
+    except KeyboardInterrupt:
+        logger.info("Job workers stopped")
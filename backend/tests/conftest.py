@@ -0,0 +1,32 @@
+"""Shared fixtures. Tests run against mongomock-motor, with a fresh database per
+test, so they need neither MongoDB nor an inference backend:
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+import os
+import uuid
+
+# Settings are read on import and these two have no default
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("HF_TOKEN", "test-token")
+
+import pytest
+
+from app.crud import create_chat_session, create_user
+from scripts.load_test import init_memory_db
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def db(anyio_backend):
+    await init_memory_db()
+
+@pytest.fixture
+async def user(db):
+    return await create_user(f"test-{uuid.uuid4().hex}@example.com", "not-a-real-hash")
+
+@pytest.fixture
+async def session_id(user):
+    return await create_chat_session(user, "test session")
@@ -0,0 +1,116 @@
+"""AdmissionControl: rate charges are refunded for requests that never get a
+slot, and batch items are admitted one by one"""
+import asyncio
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.config import settings
+from app.models import Principal
+from app.services.admission import AdmissionControl, AdmissionRejected, ConcurrencyLimiter, InMemoryTokenBuckets
+from app.services.chat_service import ChatService
+from app.services.summary_service import DocumentSummary, SummaryService
+
+pytestmark = pytest.mark.anyio
+
+USER = Principal(id=PydanticObjectId(), email="user@example.com")
+
+def make_admission(limit=1, max_queued=1, queue_timeout=0.05) -> AdmissionControl:
+    return AdmissionControl(
+        InMemoryTokenBuckets(max_entries=100),
+        ConcurrencyLimiter(limit=limit, max_queued=max_queued, queue_timeout=queue_timeout),
+        tokens_per_second=0.001, burst_tokens=100, min_request_tokens=10
+    )
+
+def tokens_left(admission: AdmissionControl) -> float:
+    return admission.buckets._buckets[str(USER.id)][0]
+
+async def test_admitted_requests_are_charged():
+    admission = make_admission()
+    async with await admission.admit(USER, 40):
+        pass
+    assert tokens_left(admission) == pytest.approx(60, abs=0.01)
+
+async def test_queue_timeout_refunds_the_charge():
+    admission = make_admission()
+    held = await admission.admit(USER, 40)
+
+    with pytest.raises(AdmissionRejected) as raised:
+        await admission.admit(USER, 30)
+    assert raised.value.reason == "queue_timeout"
+    assert tokens_left(admission) == pytest.approx(60, abs=0.01)
+    held.release()
+
+async def test_full_queue_is_rejected_without_charging():
+    admission = make_admission(max_queued=0)
+    held = await admission.admit(USER, 40)
+
+    with pytest.raises(AdmissionRejected) as raised:
+        await admission.admit(USER, 30)
+    assert raised.value.reason == "queue_full"
+    assert tokens_left(admission) == pytest.approx(60, abs=0.01)
+    held.release()
+
+async def test_cancelled_wait_refunds_the_charge():
+    admission = make_admission(queue_timeout=10)
+    held = await admission.admit(USER, 40)
+
+    waiting = asyncio.ensure_future(admission.admit(USER, 30))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert tokens_left(admission) == pytest.approx(60, abs=0.01)
+    assert admission.limiter.queued == 0
+    held.release()
+
+async def test_rate_limited_requests_do_not_queue():
+    admission = make_admission()
+    async with await admission.admit(USER, 100):
+        pass
+    with pytest.raises(AdmissionRejected) as raised:
+        await admission.admit(USER, 10)
+    assert raised.value.reason == "rate_limited"
+    assert admission.limiter.in_flight == 0
+
+TEXT = "The committee reviewed the quarterly figures and agreed to revisit the budget next month. " * 3
+
+@pytest.fixture
+def fake_inference(monkeypatch):
+    running = {"now": 0, "max": 0}
+
+    async def summarize_document(text, parameters):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return DocumentSummary(summary_text="summary", chunk_count=1)
+    monkeypatch.setattr(SummaryService, "summarize_document", summarize_document)
+    monkeypatch.setattr(settings, "NEAR_DUP_MODE", "off")
+    return running
+
+async def test_batch_items_take_one_slot_each(user, session_id, fake_inference):
+    admission = make_admission(limit=2, max_queued=10, queue_timeout=5)
+    admission.burst_tokens = 10000
+    principal = Principal(id=user.id, email=user.email)
+    items = [(f"{i} {TEXT}", {}) for i in range(6)]
+
+    outcomes = await ChatService.add_summaries_batch(
+        principal, session_id, items, admit=lambda text: admission.admit(principal, admission.cost([text]))
+    )
+
+    assert all(outcome.summary_id is not None for outcome in outcomes)
+    assert fake_inference["max"] == 2
+    assert admission.limiter.in_flight == 0
+
+async def test_batch_turned_away_entirely_is_rejected(user, session_id, fake_inference):
+    admission = make_admission(max_queued=0)
+    principal = Principal(id=user.id, email=user.email)
+    held = await admission.admit(principal, 10)
+
+    with pytest.raises(AdmissionRejected):
+        await ChatService.add_summaries_batch(
+            principal, session_id, [(TEXT, {}), (TEXT, {})],
+            admit=lambda text: admission.admit(principal, admission.cost([text]))
+        )
+    held.release()
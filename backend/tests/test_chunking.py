@@ -0,0 +1,52 @@
+"""chunk_text: token budget, sentence order, overlap and paragraph breaks"""
+import pytest
+
+from app.services.chunking import chunk_text, estimate_tokens
+
+def sentences(count: int, words: int = 8):
+    return [" ".join([f"s{i}"] + ["word"] * (words - 1)) + "." for i in range(count)]
+
+def sentence_ids(chunk: str):
+    return [token for token in chunk.replace("\n", " ").split() if token.startswith("s")]
+
+@pytest.mark.parametrize("max_tokens", [20, 50, 200])
+def test_chunks_stay_within_the_budget(max_tokens):
+    chunks = chunk_text(" ".join(sentences(40)), max_tokens, overlap_tokens=max_tokens // 4)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= max_tokens for chunk in chunks)
+
+def test_short_text_is_one_chunk():
+    text = " ".join(sentences(3))
+    assert chunk_text(text, 1000) == [text]
+
+def test_without_overlap_every_sentence_appears_once_in_order():
+    chunks = chunk_text(" ".join(sentences(30)), 40)
+    ids = [sentence for chunk in chunks for sentence in sentence_ids(chunk)]
+    assert ids == [f"s{i}" for i in range(30)]
+
+def test_overlap_repeats_trailing_sentences():
+    chunks = chunk_text(" ".join(sentences(30)), 40, overlap_tokens=12)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert sentence_ids(current)[0] == sentence_ids(previous)[-1]
+    ids = [sentence for chunk in chunks for sentence in sentence_ids(chunk)]
+    assert sorted(set(ids), key=lambda s: int(s[1:])) == [f"s{i}" for i in range(30)]
+
+def test_paragraph_breaks_are_kept_inside_a_chunk():
+    first, second = sentences(2)
+    assert chunk_text(f"{first}\n\n  \n{second}", 1000) == [f"{first}\n\n{second}"]
+
+def test_sentence_over_the_budget_is_cut_on_words():
+    text = " ".join(f"w{i}" for i in range(200))
+    chunks = chunk_text(text, 30)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+def test_word_over_the_budget_is_cut_on_characters():
+    token = "x" * 1000
+    chunks = chunk_text(f"Before the blob. {token} After the blob.", 50, overlap_tokens=10)
+
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert chunks[0] == "Before the blob." and chunks[-1] == "After the blob."
+    assert "".join(chunks[1:-1]) == token
@@ -0,0 +1,172 @@
+"""Concurrent session writes: counters, optimistic revisions, text store
+reference counts and meta-summary group dirtying"""
+import asyncio
+from collections import Counter
+
+import pytest
+from fastapi import HTTPException
+
+from app import crud
+from app.config import settings
+from app.models import ChatSession, MetaSummaryNode, StoredText, SummaryItem
+from app.services.chat_service import ChatService, _bounded_history
+
+pytestmark = pytest.mark.anyio
+
+PARAMETERS = {"min_length": 50, "max_length": 250, "do_sample": False}
+
+def text(i) -> str:
+    return f"Original text number {i} about the quarterly budget review."
+
+async def add(user, session_id, i, original_text=None):
+    return await crud.add_summary_to_chat(
+        user, session_id, original_text or text(i), f"summary {i}", dict(PARAMETERS)
+    )
+
+async def assert_refcounts_conserved():
+    """Every stored text is referenced exactly refcount times, and none is orphaned"""
+    references = Counter()
+    async for raw in SummaryItem.get_motor_collection().find({}):
+        references.update(crud._text_references(raw))
+    stored = {text.text_hash: text.refcount for text in await StoredText.find_all().to_list()}
+    assert stored == dict(references)
+
+async def meta_node(session_id, group) -> MetaSummaryNode:
+    return await MetaSummaryNode.find_one(
+        MetaSummaryNode.session_id == session_id, MetaSummaryNode.level == 0, MetaSummaryNode.index == group
+    )
+
+async def test_concurrent_adds_keep_session_counters(user, session_id):
+    writes, renames = 60, 6
+    results = await asyncio.gather(
+        *[add(user, session_id, i) for i in range(writes)],
+        *[crud.update_chat_session_title(user, session_id, f"title {i}") for i in range(renames)]
+    )
+    summary_ids = results[:writes]
+
+    assert None not in summary_ids and len(set(summary_ids)) == writes
+    session = await ChatSession.get(session_id)
+    assert session.summary_count == writes
+    assert session.summary_seq == writes
+    assert session.revision == writes + renames
+    assert await SummaryItem.find(SummaryItem.session_id == session_id).count() == writes
+
+    # Sequence numbers are unique, so groups fill up one after another
+    groups = Counter(summary.meta_group for summary in await crud.get_session_summaries(user, session_id))
+    assert all(count <= settings.META_GROUP_SIZE for count in groups.values())
+    assert sorted(groups) == list(range(-(-writes // settings.META_GROUP_SIZE)))
+    await assert_refcounts_conserved()
+
+async def test_bulk_add_shares_repeated_texts(user, session_id):
+    items = [(text(i % 3), f"summary {i}", dict(PARAMETERS)) for i in range(10)]
+    summary_ids = await crud.add_summaries_to_chat(user, session_id, items)
+
+    assert len(summary_ids) == 10
+    assert await StoredText.count() == 3
+    session = await ChatSession.get(session_id)
+    assert session.summary_count == 10 and session.summary_seq == 10
+    await assert_refcounts_conserved()
+
+async def test_concurrent_adds_and_deletes(user, session_id):
+    first = [await add(user, session_id, i) for i in range(30)]
+    await asyncio.gather(
+        *[crud.delete_summary_from_chat(user, session_id, summary_id) for summary_id in first[:15]],
+        *[add(user, session_id, i, original_text=text(i % 5)) for i in range(30, 45)]
+    )
+
+    session = await ChatSession.get(session_id)
+    stored = await SummaryItem.find(SummaryItem.session_id == session_id).count()
+    assert stored == 30
+    assert session.summary_count == stored
+    await assert_refcounts_conserved()
+
+async def test_failed_insert_leaves_counters_and_texts(user, session_id, monkeypatch):
+    async def failing_insert(*args, **kwargs):
+        raise RuntimeError("insert failed")
+    monkeypatch.setattr(SummaryItem, "insert", failing_insert)
+
+    with pytest.raises(RuntimeError):
+        await add(user, session_id, 0)
+
+    session = await ChatSession.get(session_id)
+    assert session.summary_count == 0
+    assert await StoredText.count() == 0
+
+async def test_stale_revision_update_is_rejected(user, session_id):
+    summary_id = await add(user, session_id, 0)
+    results = await asyncio.gather(*[
+        crud.update_summary_in_chat(
+            user, session_id, summary_id, original_text=text(i), summary_text=f"rewrite {i}", expected_revision=0
+        )
+        for i in range(1, 6)
+    ])
+
+    assert results.count(True) == 1
+    summary = await crud.get_summary_from_chat(user, session_id, summary_id)
+    assert summary.revision == 1
+    # The losers' texts were released again
+    await assert_refcounts_conserved()
+    assert await StoredText.count() == 1
+
+async def test_replace_of_a_changed_summary_is_a_conflict(user, session_id):
+    summary_id = await add(user, session_id, 0)
+    stale = await crud.get_summary_from_chat(user, session_id, summary_id)
+    assert await crud.update_summary_in_chat(user, session_id, summary_id, summary_text="edited elsewhere")
+
+    with pytest.raises(HTTPException) as raised:
+        await ChatService._replace_summary(
+            user, stale, text(1), "regenerated", dict(PARAMETERS), _bounded_history(stale)
+        )
+    assert raised.value.status_code == 409
+    current = await crud.get_summary_from_chat(user, session_id, summary_id)
+    assert current.summary_text == "edited elsewhere"
+    await assert_refcounts_conserved()
+
+async def test_refcounts_follow_versions_and_deletes(user, session_id):
+    other_session = await crud.create_chat_session(user, "other")
+    shared = text("shared")
+    first = await add(user, session_id, 0, original_text=shared)
+    await add(user, other_session, 1, original_text=shared)
+
+    # Regenerating moves the old text into the version history
+    summary = await crud.get_summary_from_chat(user, session_id, first)
+    await ChatService._replace_summary(
+        user, summary, text(2), "regenerated", dict(PARAMETERS), _bounded_history(summary)
+    )
+    await assert_refcounts_conserved()
+
+    await crud.delete_chat_session(user, other_session)
+    await assert_refcounts_conserved()
+    await crud.delete_summary_from_chat(user, session_id, first)
+    await assert_refcounts_conserved()
+    assert await StoredText.count() == 0
+
+async def test_deleting_the_user_releases_every_text(user, session_id):
+    await asyncio.gather(*[add(user, session_id, i % 4) for i in range(12)])
+    await crud.delete_user(user)
+
+    assert await SummaryItem.count() == 0
+    assert await StoredText.count() == 0
+
+async def test_summary_changes_mark_their_group_dirty(user, session_id):
+    summary_id = await add(user, session_id, 0)
+    node = await meta_node(session_id, 0)
+    assert node.dirty
+
+    assert await crud.save_meta_node(user, session_id, 0, 0, "reduced", expected_version=node.version)
+    assert not (await meta_node(session_id, 0)).dirty
+
+    # Parameters are not part of the reduction; the summary text is
+    await crud.update_summary_in_chat(user, session_id, summary_id, parameters={"min_length": 10})
+    assert not (await meta_node(session_id, 0)).dirty
+    await crud.update_summary_in_chat(user, session_id, summary_id, summary_text="changed")
+    changed = await meta_node(session_id, 0)
+    assert changed.dirty and changed.version == node.version + 1
+
+    # A reduction computed before the change is not stored as clean
+    assert not await crud.save_meta_node(user, session_id, 0, 0, "stale", expected_version=node.version)
+    assert (await meta_node(session_id, 0)).dirty
+
+    await crud.save_meta_node(user, session_id, 0, 0, "reduced", expected_version=changed.version)
+    await crud.delete_summary_from_chat(user, session_id, summary_id)
+    assert (await meta_node(session_id, 0)).dirty
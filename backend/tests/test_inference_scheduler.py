@@ -0,0 +1,131 @@
+"""BatchScheduler: size and deadline flushes, per-parameter batches, growth
+while the backend is saturated, and failure and cancellation handling"""
+import asyncio
+import time
+
+import pytest
+
+from app.schemas import SummaryParameters
+from app.services import inference_scheduler
+from app.services.inference_scheduler import BatchScheduler
+from app.services.resilience import CircuitBreaker, InferenceResilience
+
+pytestmark = pytest.mark.anyio
+
+SHORT = SummaryParameters(min_length=20, max_length=60)
+LONG = SummaryParameters(min_length=50, max_length=250)
+
+class FakeBackend:
+    supports_batching = True
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    async def summarize_batch(self, texts, parameters):
+        self.calls.append((list(texts), parameters))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return [f"summary of {text}" for text in texts]
+
+    async def summarize(self, text, parameters):
+        return (await self.summarize_batch([text], parameters))[0]
+
+@pytest.fixture(autouse=True)
+def no_retries(monkeypatch):
+    # Failures in one test must not open the shared circuit breaker for the next
+    monkeypatch.setattr(inference_scheduler, "inference_resilience", InferenceResilience(
+        CircuitBreaker(failure_threshold=0, reset_seconds=0), max_attempts=1, base_delay=0, max_delay=0
+    ))
+
+async def submit_all(scheduler, texts, parameters=SHORT):
+    return await asyncio.gather(*[scheduler.submit(text, parameters) for text in texts])
+
+async def test_full_batch_is_sent_without_waiting():
+    backend = FakeBackend()
+    scheduler = BatchScheduler(backend, max_batch_size=4, max_wait_ms=10000)
+
+    results = await asyncio.wait_for(submit_all(scheduler, ["a", "b", "c", "d"]), 1)
+
+    assert results == ["summary of a", "summary of b", "summary of c", "summary of d"]
+    assert [texts for texts, _ in backend.calls] == [["a", "b", "c", "d"]]
+
+async def test_partial_batch_is_sent_at_the_deadline():
+    backend = FakeBackend()
+    scheduler = BatchScheduler(backend, max_batch_size=8, max_wait_ms=30)
+
+    start = time.perf_counter()
+    await submit_all(scheduler, ["a", "b", "c"])
+
+    assert time.perf_counter() - start >= 0.025
+    assert [texts for texts, _ in backend.calls] == [["a", "b", "c"]]
+    assert scheduler.batch_sizes.stats()["count"] == 1
+
+async def test_requests_are_batched_per_parameter_set():
+    backend = FakeBackend()
+    scheduler = BatchScheduler(backend, max_batch_size=8, max_wait_ms=10)
+
+    results = await asyncio.gather(*[
+        scheduler.submit(f"text {i}", SHORT if i % 2 else LONG) for i in range(6)
+    ])
+
+    assert results == [f"summary of text {i}" for i in range(6)]
+    batches = {parameters.max_length: texts for texts, parameters in backend.calls}
+    assert batches == {60: ["text 1", "text 3", "text 5"], 250: ["text 0", "text 2", "text 4"]}
+
+async def test_overflow_beyond_a_full_batch_goes_in_the_next():
+    backend = FakeBackend()
+    scheduler = BatchScheduler(backend, max_batch_size=4, max_wait_ms=10)
+
+    await submit_all(scheduler, [str(i) for i in range(10)])
+
+    assert sorted(len(texts) for texts, _ in backend.calls) == [2, 4, 4]
+    assert scheduler._pending == {} and scheduler._dispatching == set()
+
+async def test_batches_grow_while_the_backend_is_saturated():
+    backend = FakeBackend(delay=0.05)
+    scheduler = BatchScheduler(backend, max_batch_size=8, max_wait_ms=1, max_in_flight=1)
+
+    first = asyncio.ensure_future(scheduler.submit("first", SHORT))
+    await asyncio.sleep(0.01)
+    # The only slot is busy: these wait behind a single dispatched batch
+    rest = await submit_all(scheduler, [str(i) for i in range(10)])
+    await first
+
+    assert rest == [f"summary of {i}" for i in range(10)]
+    assert [len(texts) for texts, _ in backend.calls] == [1, 8, 2]
+    assert scheduler._pending == {} and scheduler._dispatching == set()
+
+async def test_a_failed_batch_fails_each_caller():
+    backend = FakeBackend(error=RuntimeError("backend down"))
+    scheduler = BatchScheduler(backend, max_batch_size=3, max_wait_ms=10)
+
+    results = await asyncio.gather(
+        *[scheduler.submit(text, SHORT) for text in "abc"], return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(backend.calls) == 1 and scheduler.failed_batches == 1
+
+async def test_callers_that_gave_up_are_not_sent():
+    backend = FakeBackend()
+    scheduler = BatchScheduler(backend, max_batch_size=8, max_wait_ms=30)
+
+    kept = asyncio.ensure_future(scheduler.submit("kept", SHORT))
+    abandoned = asyncio.ensure_future(scheduler.submit("abandoned", SHORT))
+    await asyncio.sleep(0)
+    abandoned.cancel()
+
+    assert await kept == "summary of kept"
+    assert [texts for texts, _ in backend.calls] == [["kept"]]
+
+async def test_backends_without_batching_are_called_per_text():
+    backend = FakeBackend()
+    backend.supports_batching = False
+    scheduler = BatchScheduler(backend, max_batch_size=8, max_wait_ms=10000)
+
+    assert not scheduler.enabled
+    await asyncio.wait_for(submit_all(scheduler, ["a", "b"]), 1)
+    assert [texts for texts, _ in backend.calls] == [["a"], ["b"]]
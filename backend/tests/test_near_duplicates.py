@@ -0,0 +1,65 @@
+"""MinHash/LSH fingerprints and near-duplicate lookup of earlier summaries"""
+import pytest
+
+from app import crud
+from app.models import Principal
+from app.schemas import SummaryParameters
+from app.services.near_duplicates import NearDuplicateIndex, TextFingerprint, jaccard
+
+PARAMETERS = SummaryParameters(min_length=50, max_length=250)
+
+ARTICLE = (
+    "The city council met on Tuesday evening to debate the proposed budget for the coming year. "
+    "Members argued over funding for road repairs, the public library and a new community pool. "
+    "After three hours of discussion the council voted to postpone a final decision until March, "
+    "citing the need for updated revenue forecasts from the finance department. "
+    "Residents who attended the meeting urged members to protect library opening hours."
+)
+# Same article with a byline added
+NEAR_COPY = "By Staff Reporter. " + ARTICLE
+UNRELATED = (
+    "Researchers at the university have developed a battery chemistry that charges in minutes. "
+    "The prototype cells survived thousands of cycles in the lab without noticeable wear, "
+    "and the team hopes to partner with manufacturers to test larger packs next year."
+)
+
+def principal(user) -> Principal:
+    return Principal(id=user.id, email=user.email)
+
+def test_identical_texts_share_every_band():
+    assert TextFingerprint(ARTICLE).bands == TextFingerprint(" ".join(ARTICLE.upper().split())).bands
+
+def test_near_copies_share_a_band():
+    original, copy = TextFingerprint(ARTICLE), TextFingerprint(NEAR_COPY)
+    assert jaccard(original.shingles, copy.shingles) >= 0.9
+    assert set(original.bands) & set(copy.bands)
+
+def test_unrelated_texts_share_no_band():
+    original, other = TextFingerprint(ARTICLE), TextFingerprint(UNRELATED)
+    assert jaccard(original.shingles, other.shingles) == 0
+    assert not set(original.bands) & set(other.bands)
+
+@pytest.mark.anyio
+async def test_find_matches_near_copies_with_the_same_parameters(user, session_id):
+    summary_id = await crud.add_summary_to_chat(user, session_id, ARTICLE, "summary", PARAMETERS.dict())
+    await crud.add_summary_to_chat(user, session_id, UNRELATED, "other summary", PARAMETERS.dict())
+
+    match = await NearDuplicateIndex.find(principal(user), TextFingerprint(NEAR_COPY), PARAMETERS)
+    assert match is not None and match.summary.id == summary_id
+    assert 0.9 <= match.similarity < 1
+
+    other_parameters = SummaryParameters(min_length=20, max_length=60)
+    assert await NearDuplicateIndex.find(principal(user), TextFingerprint(NEAR_COPY), other_parameters) is None
+    assert await NearDuplicateIndex.find(principal(user), TextFingerprint(UNRELATED + " Extra."), other_parameters) is None
+
+@pytest.mark.anyio
+async def test_find_is_scoped_to_the_user(user, session_id):
+    await crud.add_summary_to_chat(user, session_id, ARTICLE, "summary", PARAMETERS.dict())
+    other = await crud.create_user("someone-else@example.com", "not-a-real-hash")
+
+    assert await NearDuplicateIndex.find(principal(other), TextFingerprint(ARTICLE), PARAMETERS) is None
+    assert await NearDuplicateIndex.find(principal(user), TextFingerprint(ARTICLE), PARAMETERS) is not None
+
+def test_sampled_summaries_are_not_reused():
+    assert NearDuplicateIndex.enabled_for(PARAMETERS)
+    assert not NearDuplicateIndex.enabled_for(SummaryParameters(min_length=50, max_length=250, do_sample=True))
@@ -0,0 +1,179 @@
+"""CircuitBreaker state machine, and InferenceResilience retries and hedging"""
+import asyncio
+
+import pytest
+
+from app.services import resilience
+from app.services.resilience import CircuitBreaker, InferenceError, InferenceResilience
+
+pytestmark = pytest.mark.anyio
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+def make_resilience(breaker=None, max_attempts=3, max_delay=10.0, hedge_after_ms=0) -> InferenceResilience:
+    return InferenceResilience(
+        breaker or CircuitBreaker(failure_threshold=0, reset_seconds=0),
+        max_attempts=max_attempts, base_delay=0, max_delay=max_delay, hedge_after_ms=hedge_after_ms
+    )
+
+class Script:
+    """A backend call answering with the next scripted outcome each time"""
+
+    def __init__(self, *outcomes, delays=None):
+        self.outcomes = list(outcomes)
+        self.delays = list(delays or [0] * len(outcomes))
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        index = self.calls
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delays[index])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        outcome = self.outcomes[index]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+# Circuit breaker
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(InferenceError) as raised:
+        breaker.before_call()
+    assert raised.value.kind == "circuit_open" and raised.value.retry_after == 30
+    assert breaker.rejections == 1
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(InferenceError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+def test_failed_trial_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+
+    # Upstream asked for a longer wait than the reset period
+    breaker.record_failure(retry_after=60)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 30
+    with pytest.raises(InferenceError):
+        breaker.before_call()
+    clock.now += 30
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+def test_neutral_trial_frees_the_slot_without_closing(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_neutral()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+
+# Retries
+async def test_retryable_errors_are_retried():
+    call = Script(InferenceError("unavailable", "503"), InferenceError("timeout", "slow"), "done")
+    assert await make_resilience().call("fake", call) == "done"
+    assert call.calls == 3
+
+async def test_retries_stop_after_max_attempts():
+    call = Script(*[InferenceError("unavailable", "503")] * 3)
+    with pytest.raises(InferenceError):
+        await make_resilience(max_attempts=2).call("fake", call)
+    assert call.calls == 2
+
+async def test_non_retryable_errors_fail_at_once():
+    call = Script(InferenceError("bad_request", "400"), "unused")
+    with pytest.raises(InferenceError) as raised:
+        await make_resilience().call("fake", call)
+    assert raised.value.kind == "bad_request" and call.calls == 1
+
+async def test_waits_longer_than_max_delay_fail_with_retry_after():
+    call = Script(InferenceError("model_loading", "loading", retry_after=120), "unused")
+    with pytest.raises(InferenceError) as raised:
+        await make_resilience(max_delay=20).call("fake", call)
+    assert raised.value.headers["Retry-After"] == "120" and call.calls == 1
+
+async def test_bad_requests_do_not_trip_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    with pytest.raises(InferenceError):
+        await make_resilience(breaker).call("fake", Script(InferenceError("bad_request", "400")))
+    assert breaker.state == CircuitBreaker.CLOSED
+
+async def test_open_circuit_fails_fast_without_calling(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    call = Script("unused")
+    with pytest.raises(InferenceError) as raised:
+        await make_resilience(breaker).call("fake", call)
+    assert raised.value.kind == "circuit_open" and call.calls == 0
+
+# Hedging
+async def test_slow_call_is_hedged_and_the_faster_copy_wins():
+    call = Script("slow", "fast", delays=[1.0, 0.0])
+    result = await asyncio.wait_for(make_resilience(hedge_after_ms=20).call("fake", call), 0.5)
+
+    assert result == "fast"
+    assert call.calls == 2 and call.cancelled == 1
+
+async def test_fast_call_is_not_hedged():
+    call = Script("fast", "unused", delays=[0.0, 0.0])
+    assert await make_resilience(hedge_after_ms=50).call("fake", call) == "fast"
+    assert call.calls == 1
+
+async def test_hedge_answers_after_the_first_copy_fails():
+    call = Script(InferenceError("bad_request", "400"), "second", delays=[0.05, 0.1])
+    assert await make_resilience(hedge_after_ms=20).call("fake", call) == "second"
+
+async def test_giving_up_cancels_both_copies():
+    call = Script("slow", "slower", delays=[1.0, 1.0])
+    task = asyncio.ensure_future(make_resilience(hedge_after_ms=20).call("fake", call))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(0)
+    assert call.calls == 2 and call.cancelled == 2
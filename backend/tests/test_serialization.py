@@ -0,0 +1,84 @@
+"""The response converters build exactly the shape of the response schemas
+their endpoints declare, since FastJSONResponse skips response_model validation"""
+from datetime import datetime
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.models import ChatSession, SummaryItem, SummaryJob, SummaryVersion
+from app.schemas.chat import (
+    BatchSummaryResponse,
+    MetaSummaryResponse,
+    NearDuplicateResponse,
+    SearchResponse,
+    SummaryJobResponse,
+    SummaryVersionList
+)
+from app.services import serialization
+from app.services.chat_service import BatchItemOutcome
+from app.services.near_duplicates import NearDuplicateMatch
+from app.services.search import SearchHit, SearchPage
+from app.services.summary_service import DocumentSummary
+
+# Documents can only be built once Beanie is initialized
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("db")]
+
+SESSION_ID = PydanticObjectId()
+PARAMETERS = {"min_length": 50, "max_length": 250, "do_sample": False}
+
+def assert_matches(schema, payload):
+    assert schema(**payload).dict() == payload
+
+def stored_summary() -> SummaryItem:
+    return SummaryItem(
+        id=PydanticObjectId(), user_id=PydanticObjectId(), session_id=SESSION_ID,
+        text_hash="0" * 64, summary_text="summary", parameters=PARAMETERS
+    )
+
+async def test_summary_versions():
+    summary = stored_summary()
+    versions = [SummaryVersion(revision=1, summary_text="older", parameters=PARAMETERS)]
+    assert_matches(SummaryVersionList, serialization.summary_versions(SESSION_ID, summary, versions, ["text"]))
+
+async def test_batch_response():
+    outcomes = [
+        BatchItemOutcome(summary_id=PydanticObjectId(), result=DocumentSummary(summary_text="summary", timings={"total_ms": 1.5})),
+        BatchItemOutcome(error="Text must be at least 100 characters long")
+    ]
+    payload = serialization.batch_response(SESSION_ID, [("text", PARAMETERS)] * 2, outcomes)
+
+    assert_matches(BatchSummaryResponse, payload)
+    assert (payload["succeeded"], payload["failed"]) == (1, 1)
+    assert [result["status"] for result in payload["results"]] == ["succeeded", "failed"]
+
+async def test_near_duplicate_response():
+    assert_matches(NearDuplicateResponse, serialization.near_duplicate_response(None))
+    match = NearDuplicateMatch(summary=stored_summary(), similarity=0.95)
+    assert_matches(NearDuplicateResponse, serialization.near_duplicate_response(match))
+
+async def test_search_response():
+    page = SearchPage(
+        hits=[
+            SearchHit(kind="summary", session_id=SESSION_ID, summary_id=PydanticObjectId(), score=1.23456,
+                      text="The budget was approved.", field="summary_text"),
+            SearchHit(kind="session", session_id=SESSION_ID, score=0.5, text="Budget", field="title")
+        ],
+        session_titles={str(SESSION_ID): "Budget"},
+        terms=["budget"],
+        has_more=True
+    )
+    payload = serialization.search_response("budget", "keyword", page, 20)
+
+    assert_matches(SearchResponse, payload)
+    assert payload["results"][0]["score"] == 1.2346
+
+async def test_summary_job():
+    job = SummaryJob(
+        id=PydanticObjectId(), user_id=PydanticObjectId(), session_id=SESSION_ID,
+        text="text", parameters=PARAMETERS, summary_id=PydanticObjectId()
+    )
+    assert_matches(SummaryJobResponse, serialization.summary_job(job))
+
+async def test_meta_summary_response():
+    session = ChatSession(id=SESSION_ID, user_id=PydanticObjectId(), title="Budget")
+    assert_matches(MetaSummaryResponse, serialization.meta_summary_response(session, "meta", datetime.utcnow()))
@@ -83,7 +83,7 @@ export function ChatSessionDetail({ session, onUpdate, onNewSummary, onDelete }:
 
   const handleDeleteSummary = async (index: number) => {
     try {
-      await api.chat.deleteSummary(session.id, index);
+      await api.chat.deleteSummary(session.id, session.summaries[index].id);
       onUpdate();
       setShowDeleteSummaryModal(null);
     } catch (error) {
@@ -113,7 +113,7 @@ export function ChatSessionDetail({ session, onUpdate, onNewSummary, onDelete }:
 
   const handleUpdateSummary = async (index: number, data: PartialSummaryUpdate) => {
     try {
-      await api.chat.updateSummary(session.id, index, data);
+      await api.chat.updateSummary(session.id, session.summaries[index].id, data);
       onUpdate();
       setEditingSummary(null);
     } catch (error) {
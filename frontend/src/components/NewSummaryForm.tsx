@@ -2,7 +2,7 @@ import { useState } from 'react';
 import { api } from '@/lib/api';
 
 interface NewSummaryFormProps {
-  sessionId: number;
+  sessionId: string;
   onSuccess: () => void;
   onCancel: () => void;
 }
@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react';
-import { ChatSession } from '@/lib/api';
+import { ChatSessionListItem } from '@/lib/api';
 import { api } from '@/lib/api';
 import { PlusIcon, ChatBubbleLeftIcon } from '@heroicons/react/24/outline';
 
@@ -11,7 +11,8 @@ interface SidebarProps {
 }
 
 export function Sidebar({ currentSessionId, onSessionSelect, onNewSession, onSessionsChange }: SidebarProps) {
-  const [sessions, setSessions] = useState<ChatSession[]>([]);
+  const [sessions, setSessions] = useState<ChatSessionListItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -21,8 +22,9 @@ export function Sidebar({ currentSessionId, onSessionSelect, onNewSession, onSes
   const loadSessions = async () => {
     try {
       setLoading(true);
-      const response = await api.chat.getSessions();
-      setSessions(response);
+      const page = await api.chat.getSessions();
+      setSessions(page.items);
+      setNextCursor(page.next_cursor);
     } catch (error) {
       console.error('Failed to load sessions:', error);
     } finally {
@@ -30,6 +32,17 @@ export function Sidebar({ currentSessionId, onSessionSelect, onNewSession, onSes
     }
   };
 
+  const loadMoreSessions = async () => {
+    if (!nextCursor) return;
+    try {
+      const page = await api.chat.getSessions(nextCursor);
+      setSessions(prev => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error('Failed to load more sessions:', error);
+    }
+  };
+
   return (
     <div className="w-64 h-screen bg-gray-50 dark:bg-gray-800 border-r border-gray-200 dark:border-gray-700 flex flex-col">
       <div className="p-4">
@@ -64,10 +77,18 @@ export function Sidebar({ currentSessionId, onSessionSelect, onNewSession, onSes
                   {session.title}
                 </div>
                 <div className="ml-2 text-xs text-gray-500 dark:text-gray-400">
-                  {session.summaries.length}
+                  {session.summary_count}
                 </div>
               </button>
             ))}
+            {nextCursor && (
+              <button
+                onClick={loadMoreSessions}
+                className="w-full px-3 py-2 text-sm text-blue-600 dark:text-blue-400 hover:underline"
+              >
+                Load more
+              </button>
+            )}
           </nav>
         )}
       </div>
@@ -8,6 +8,7 @@ export type SummaryParameters = {
 };
 
 export type Summary = {
+  id: string;
   original_text: string;
   summary_text: string;
   parameters: SummaryParameters;
@@ -32,6 +33,20 @@ export type ChatSession = {
   updated_at: string;
 };
 
+export type ChatSessionListItem = {
+  id: string;
+  title: string;
+  summary_count: number;
+  meta_summary_preview: string | null;
+  created_at: string;
+  updated_at: string;
+};
+
+export type ChatSessionPage = {
+  items: ChatSessionListItem[];
+  next_cursor: string | null;
+};
+
 export interface ApiErrorResponse {
   detail?: string;
   message?: string;
@@ -132,10 +147,10 @@ export const api = {
         body: JSON.stringify({ title }),
       }).then((res) => handleResponse<{ session_id: string }>(res)),
 
-    getSessions: () =>
-      fetch(`${API_BASE_URL}/chat/sessions`, {
+    getSessions: (cursor?: string) =>
+      fetch(`${API_BASE_URL}/chat/sessions${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`, {
         credentials: 'include',
-      }).then((res) => handleResponse<ChatSession[]>(res)),
+      }).then((res) => handleResponse<ChatSessionPage>(res)),
 
     deleteSession: (sessionId: string) =>
       fetch(`${API_BASE_URL}/chat/sessions/${sessionId}`, {
@@ -180,13 +195,13 @@ export const api = {
         }),
       }).then((res) => handleResponse<ChatSession>(res)),
 
-    deleteSummary: (sessionId: string, summaryIndex: number) =>
-      fetch(`${API_BASE_URL}/chat/sessions/${sessionId}/summaries/${summaryIndex}`, {
+    deleteSummary: (sessionId: string, summaryId: string) =>
+      fetch(`${API_BASE_URL}/chat/sessions/${sessionId}/summaries/${summaryId}`, {
         method: 'DELETE',
         credentials: 'include',
       }).then((res) => handleResponse<void>(res)),
 
-    createSummary: async (sessionId: number, text: string, parameters?: SummarizationParameters) => {
+    createSummary: async (sessionId: string, text: string, parameters?: SummarizationParameters) => {
       const response = await fetch(`${API_BASE_URL}/chat/summarize`, {
         method: 'POST',
         headers: {
@@ -207,8 +222,8 @@ export const api = {
       return handleResponse<Summary>(response);
     },
 
-    updateSummary: (sessionId: string, summaryIndex: number, data: PartialSummaryUpdate) =>
-      fetch(`${API_BASE_URL}/chat/sessions/${sessionId}/summaries/${summaryIndex}`, {
+    updateSummary: (sessionId: string, summaryId: string, data: PartialSummaryUpdate) =>
+      fetch(`${API_BASE_URL}/chat/sessions/${sessionId}/summaries/${summaryId}`, {
         method: 'PATCH',
         credentials: 'include',
         headers: { 'Content-Type': 'application/json' },